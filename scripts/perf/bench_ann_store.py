@@ -0,0 +1,143 @@
+"""Compare IVF approximate search against the brute-force NumPy store."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.core_ext.memory import (  # noqa: E402
+    EmbeddingRecord,
+    EmbeddingStore,
+    IVFEmbeddingStore,
+    NumpyEmbeddingStore,
+)
+
+
+def build_vectors(count: int, dimension: int, *, topics: int = 32, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors, closer to real embeddings than uniform noise."""
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dimension))
+    labels = rng.integers(0, topics, size=count)
+    return (centers[labels] + 0.35 * rng.normal(size=(count, dimension))).astype(np.float32)
+
+
+async def _fill(store: EmbeddingStore, vectors: np.ndarray) -> None:
+    for index, vector in enumerate(vectors):
+        await store.save_embedding(
+            EmbeddingRecord(
+                id=f"emb-{index}",
+                message_id=f"msg-{index}",
+                conversation_id=f"conv-{index % 97}",
+                embedding=vector.tolist(),
+                model="bench",
+            )
+        )
+
+
+async def _query(
+    store: EmbeddingStore, queries: np.ndarray, k: int
+) -> tuple[list[list[str]], float]:
+    results: list[list[str]] = []
+    start = perf_counter()
+    for query in queries:
+        found = await store.search_similar(query.tolist(), limit=k, threshold=-1.0)
+        results.append([record.message_id for record in found])
+    elapsed_ms = (perf_counter() - start) * 1000.0
+    return results, elapsed_ms / max(1, len(queries))
+
+
+def _recall(expected: Sequence[Sequence[str]], actual: Sequence[Sequence[str]]) -> float:
+    hits = sum(len(set(want) & set(got)) for want, got in zip(expected, actual))
+    total = sum(len(want) for want in expected)
+    return hits / total if total else 1.0
+
+
+async def _run(
+    count: int, dimension: int, queries: int, k: int, n_lists: int, probes: Sequence[int]
+) -> dict[str, Any]:
+    vectors = build_vectors(count, dimension)
+    query_vectors = build_vectors(queries, dimension, seed=1)
+
+    brute = NumpyEmbeddingStore()
+    await _fill(brute, vectors)
+    ivf = IVFEmbeddingStore(n_lists=n_lists)
+    start = perf_counter()
+    await _fill(ivf, vectors)
+    build_ms = (perf_counter() - start) * 1000.0
+
+    expected, brute_ms = await _query(brute, query_vectors, k)
+    runs = []
+    for n_probe in probes:
+        ivf.n_probe = n_probe
+        actual, latency_ms = await _query(ivf, query_vectors, k)
+        runs.append(
+            {
+                "n_probe": n_probe,
+                "recall": round(_recall(expected, actual), 4),
+                "latency_ms": round(latency_ms, 4),
+                "speedup": round(brute_ms / latency_ms, 2) if latency_ms else None,
+            }
+        )
+    return {
+        "vectors": count,
+        "dimension": dimension,
+        "queries": queries,
+        "k": k,
+        "n_lists": n_lists,
+        "ivf_build_ms": round(build_ms, 3),
+        "brute_force_latency_ms": round(brute_ms, 4),
+        "ivf": runs,
+    }
+
+
+def run_benchmark(
+    count: int,
+    dimension: int,
+    *,
+    queries: int = 100,
+    k: int = 10,
+    n_lists: int = 64,
+    probes: Sequence[int] = (1, 4, 8, 16),
+) -> dict[str, Any]:
+    return asyncio.run(_run(count, dimension, queries, k, n_lists, probes))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark IVF recall and latency.")
+    parser.add_argument("--vectors", type=int, default=50_000, help="Stored vectors")
+    parser.add_argument("--dimension", type=int, default=256, help="Vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Query count")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--lists", type=int, default=128, help="IVF lists (n_lists)")
+    parser.add_argument(
+        "--probes", default="1,4,8,16,32", help="Comma separated n_probe values to sweep"
+    )
+    args = parser.parse_args(argv)
+
+    probes = [int(value) for value in args.probes.split(",") if value.strip()]
+    result = run_benchmark(
+        args.vectors,
+        args.dimension,
+        queries=args.queries,
+        k=args.k,
+        n_lists=args.lists,
+        probes=probes,
+    )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entrypoint
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+"""Compare the memory footprint of full and compact memory record types."""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, TypeVar
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.core_ext.memory import (  # noqa: E402
+    CompactEmbedding,
+    CompactMessage,
+    ConversationMessage,
+    EmbeddingRecord,
+    MessageType,
+)
+
+T = TypeVar("T")
+
+
+def _traced_bytes(build: Callable[..., list[T]], *args: Any) -> tuple[list[T], int]:
+    """Bytes newly allocated by ``build(*args)`` (inputs it only references are not counted)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        items = build(*args)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return items, current
+
+
+def _compact_messages(messages: list[ConversationMessage]) -> list[CompactMessage]:
+    return [CompactMessage.from_message(message) for message in messages]
+
+
+def _compact_embeddings(records: list[EmbeddingRecord]) -> list[CompactEmbedding]:
+    return [CompactEmbedding.from_record(record) for record in records]
+
+
+def _per_item(total: int, count: int) -> float:
+    return round(total / count, 1) if count else 0.0
+
+
+def run_benchmark(
+    messages: int,
+    *,
+    conversations: int = 1000,
+    embeddings: int = 1000,
+    dimension: int = 256,
+) -> dict[str, Any]:
+    # Ids and content are shared by both variants, so they are built up front
+    # and the traced numbers are the per-record overhead on top of them.
+    ids = [f"msg-{index}" for index in range(messages)]
+    conversation_ids = [f"conv-{index}" for index in range(max(1, conversations))]
+    contents = [f"message {index} " * 4 for index in range(messages)]
+    base = datetime(2025, 1, 1)
+    roles = (MessageType.USER, MessageType.ASSISTANT)
+
+    full, full_bytes = _traced_bytes(
+        lambda: [
+            ConversationMessage(
+                id=ids[index],
+                conversation_id=conversation_ids[index % len(conversation_ids)],
+                role=roles[index % 2],
+                content=contents[index],
+                created_at=base + timedelta(seconds=index),
+            )
+            for index in range(messages)
+        ]
+    )
+    compact, compact_bytes = _traced_bytes(_compact_messages, full)
+    round_trip = all(c.to_message() == m for c, m in zip(compact[:100], full[:100]))
+    del full, compact
+
+    matrix = np.random.default_rng(0).normal(size=(embeddings, dimension)).astype(np.float32)
+    record_ids = [f"emb-{index}" for index in range(embeddings)]
+    message_ids = [f"msg-{index}" for index in range(embeddings)]
+    records, record_bytes = _traced_bytes(
+        lambda: [
+            EmbeddingRecord(
+                id=record_ids[index],
+                message_id=message_ids[index],
+                conversation_id=conversation_ids[index % len(conversation_ids)],
+                embedding=row.tolist(),
+                model="bench",
+                created_at=base,
+            )
+            for index, row in enumerate(matrix)
+        ]
+    )
+    packed, packed_bytes = _traced_bytes(_compact_embeddings, records)
+    del records, packed
+
+    return {
+        "messages": messages,
+        "dataclass_bytes_per_message": _per_item(full_bytes, messages),
+        "compact_bytes_per_message": _per_item(compact_bytes, messages),
+        "message_saving_ratio": round(1 - compact_bytes / full_bytes, 3) if full_bytes else 0.0,
+        "message_round_trip": round_trip,
+        "embeddings": embeddings,
+        "dimension": dimension,
+        "dataclass_bytes_per_embedding": _per_item(record_bytes, embeddings),
+        "compact_bytes_per_embedding": _per_item(packed_bytes, embeddings),
+        "embedding_saving_ratio": round(1 - packed_bytes / record_bytes, 3) if record_bytes else 0.0,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark memory use of compact record types.")
+    parser.add_argument("--messages", type=int, default=1_000_000, help="Messages to hold")
+    parser.add_argument("--conversations", type=int, default=1000, help="Distinct conversations")
+    parser.add_argument("--embeddings", type=int, default=10_000, help="Embeddings to hold")
+    parser.add_argument("--dimension", type=int, default=256, help="Embedding dimension")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(
+        args.messages,
+        conversations=args.conversations,
+        embeddings=args.embeddings,
+        dimension=args.dimension,
+    )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entrypoint
+    raise SystemExit(main())
@@ -0,0 +1,116 @@
+"""Compare the binary record codec with the JSON ``to_dict`` path."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Sequence, TypeVar
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.core_ext.memory import (  # noqa: E402
+    ConversationMessage,
+    EmbeddingRecord,
+    MessageType,
+)
+from src.core_ext.memory import codec  # noqa: E402
+
+T = TypeVar("T")
+
+
+def _rate(count: int, elapsed: float) -> float:
+    return round(count / elapsed, 1) if elapsed > 0 else 0.0
+
+
+def _measure(
+    records: Sequence[T],
+    encode: Callable[[T], bytes],
+    decode: Callable[[bytes], T],
+) -> dict[str, float]:
+    start = perf_counter()
+    payloads = [encode(record) for record in records]
+    encode_s = perf_counter() - start
+    start = perf_counter()
+    for payload in payloads:
+        decode(payload)
+    decode_s = perf_counter() - start
+    size = sum(len(payload) for payload in payloads)
+    return {
+        "encode_per_s": _rate(len(records), encode_s),
+        "decode_per_s": _rate(len(records), decode_s),
+        "bytes_per_record": round(size / len(records), 1) if records else 0.0,
+    }
+
+
+def _json_encode(record: Any) -> bytes:
+    return json.dumps(record.to_dict(), ensure_ascii=False).encode("utf-8")
+
+
+def run_benchmark(messages: int, embeddings: int, *, dimension: int = 1536) -> dict[str, Any]:
+    base = datetime(2025, 1, 1)
+    message_records = [
+        ConversationMessage(
+            id=f"msg-{index}",
+            conversation_id=f"conv-{index % 100}",
+            role=MessageType.USER if index % 2 == 0 else MessageType.ASSISTANT,
+            content=f"message {index} " * 16,
+            created_at=base + timedelta(seconds=index),
+            metadata={"turn": index} if index % 4 == 0 else {},
+        )
+        for index in range(messages)
+    ]
+    matrix = np.random.default_rng(0).normal(size=(embeddings, dimension)).astype(np.float32)
+    embedding_records = [
+        EmbeddingRecord(
+            id=f"emb-{index}",
+            message_id=f"msg-{index}",
+            conversation_id=f"conv-{index % 100}",
+            embedding=row.tolist(),
+            model="bench",
+        )
+        for index, row in enumerate(matrix)
+    ]
+
+    return {
+        "messages": messages,
+        "embeddings": embeddings,
+        "dimension": dimension,
+        "message_json": _measure(
+            message_records,
+            _json_encode,
+            lambda payload: ConversationMessage.from_dict(json.loads(payload)),
+        ),
+        "message_binary": _measure(message_records, codec.encode_message, codec.decode_message),
+        "embedding_json": _measure(
+            embedding_records,
+            _json_encode,
+            lambda payload: EmbeddingRecord.from_dict(json.loads(payload)),
+        ),
+        "embedding_binary": _measure(
+            embedding_records, codec.encode_embedding, codec.decode_embedding
+        ),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark binary vs JSON record encoding.")
+    parser.add_argument("--messages", type=int, default=100_000, help="Messages to encode")
+    parser.add_argument("--embeddings", type=int, default=10_000, help="Embeddings to encode")
+    parser.add_argument("--dimension", type=int, default=1536, help="Embedding dimension")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.messages, args.embeddings, dimension=args.dimension)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entrypoint
+    raise SystemExit(main())
@@ -0,0 +1,145 @@
+"""Measure insert and fetch throughput of the SQLite memory backend."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.core_ext.memory import (  # noqa: E402
+    ConversationMessage,
+    EmbeddingRecord,
+    MessageType,
+    SQLiteDatabase,
+    SQLiteEmbeddingStore,
+    SQLiteMessageStore,
+)
+
+
+def _messages(conversations: int, per_conversation: int, prefix: str) -> list[ConversationMessage]:
+    return [
+        ConversationMessage(
+            id=f"{prefix}-{conv}-{index}",
+            conversation_id=f"{prefix}-conv-{conv}",
+            role=MessageType.USER if index % 2 == 0 else MessageType.ASSISTANT,
+            content=f"message {index} of conversation {conv} " * 8,
+        )
+        for conv in range(conversations)
+        for index in range(per_conversation)
+    ]
+
+
+def _rate(count: int, elapsed: float) -> float:
+    return round(count / elapsed, 1) if elapsed > 0 else 0.0
+
+
+async def _run(
+    path: Path, conversations: int, per_conversation: int, embeddings: int, dimension: int
+) -> dict[str, Any]:
+    database = SQLiteDatabase(path)
+    messages = SQLiteMessageStore(database)
+    vectors = SQLiteEmbeddingStore(database)
+
+    single = _messages(conversations, per_conversation, "single")
+    start = perf_counter()
+    for message in single:
+        await messages.save_message(message)
+    single_s = perf_counter() - start
+
+    batched = _messages(conversations, per_conversation, "batch")
+    start = perf_counter()
+    for conv in range(conversations):
+        chunk = batched[conv * per_conversation : (conv + 1) * per_conversation]
+        await messages.save_messages(chunk)
+    batch_s = perf_counter() - start
+
+    start = perf_counter()
+    fetched = 0
+    for conv in range(conversations):
+        fetched += len(await messages.get_messages(f"batch-conv-{conv}"))
+    fetch_s = perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(embeddings, dimension)).astype(np.float32)
+    start = perf_counter()
+    for index, row in enumerate(matrix):
+        await vectors.save_embedding(
+            EmbeddingRecord(
+                id=f"emb-{index}",
+                message_id=f"msg-{index}",
+                conversation_id=f"conv-{index % 97}",
+                embedding=row.tolist(),
+                model="bench",
+            )
+        )
+    embed_s = perf_counter() - start
+
+    start = perf_counter()
+    queries = 20
+    for row in matrix[:queries]:
+        await vectors.search_similar(row.tolist(), limit=10, threshold=0.0)
+    search_ms = (perf_counter() - start) * 1000.0 / queries
+    journal_mode = database.journal_mode
+    database.close()
+
+    return {
+        "journal_mode": journal_mode,
+        "messages": len(single),
+        "insert_single_per_s": _rate(len(single), single_s),
+        "insert_batched_per_s": _rate(len(batched), batch_s),
+        "fetch_messages_per_s": _rate(fetched, fetch_s),
+        "embeddings": embeddings,
+        "dimension": dimension,
+        "insert_embeddings_per_s": _rate(embeddings, embed_s),
+        "search_latency_ms": round(search_ms, 3),
+    }
+
+
+def run_benchmark(
+    conversations: int,
+    per_conversation: int,
+    *,
+    embeddings: int = 1000,
+    dimension: int = 256,
+    path: str | Path | None = None,
+) -> dict[str, Any]:
+    if path is not None:
+        return asyncio.run(_run(Path(path), conversations, per_conversation, embeddings, dimension))
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / "bench.sqlite"
+        return asyncio.run(_run(target, conversations, per_conversation, embeddings, dimension))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite memory backend.")
+    parser.add_argument("--conversations", type=int, default=200, help="Conversations to write")
+    parser.add_argument("--messages", type=int, default=50, help="Messages per conversation")
+    parser.add_argument("--embeddings", type=int, default=5000, help="Embeddings to write")
+    parser.add_argument("--dimension", type=int, default=256, help="Embedding dimension")
+    parser.add_argument("--path", default=None, help="Database file (default: temporary)")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(
+        args.conversations,
+        args.messages,
+        embeddings=args.embeddings,
+        dimension=args.dimension,
+        path=args.path,
+    )
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entrypoint
+    raise SystemExit(main())
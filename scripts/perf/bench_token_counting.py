@@ -0,0 +1,82 @@
+"""Compare per-message and batched token counting on long histories."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.core_ext.context_trimmer import (  # noqa: E402
+    BATCH_ENCODE_THREADS,
+    BATCH_ENCODE_THRESHOLD,
+    _TokenCounter,
+)
+
+_WORDS = (
+    "katamari", "prince", "cousin", "roll", "stardust", "cosmos", "king",
+    "trim", "token", "budget", "retention", "persona", "chain", "reflect",
+)
+
+
+def build_history(count: int, *, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 120)))
+        for _ in range(count)
+    ]
+
+
+def run_benchmark(count: int, model: str, *, repeat: int = 3) -> dict[str, Any]:
+    texts = build_history(count)
+    counter = _TokenCounter(model)
+
+    def _best(fn: Any) -> float:
+        timings = []
+        for _ in range(max(1, repeat)):
+            start = perf_counter()
+            fn()
+            timings.append(perf_counter() - start)
+        return min(timings) * 1000.0
+
+    sequential_ms = _best(lambda: [counter.count(text) for text in texts])
+    batched_ms = _best(lambda: counter.count_many(texts))
+    sequential_total = sum(counter.count(text) for text in texts)
+    batched_total = sum(counter.count_many(texts))
+    if sequential_total != batched_total:
+        raise RuntimeError("batched token count diverged from sequential count")
+
+    return {
+        "messages": count,
+        "model": model,
+        "token_counter": counter.describe(),
+        "batch_threads": BATCH_ENCODE_THREADS,
+        "batch_threshold": BATCH_ENCODE_THRESHOLD,
+        "total_tokens": sequential_total,
+        "sequential_ms": round(sequential_ms, 3),
+        "batched_ms": round(batched_ms, 3),
+        "speedup": round(sequential_ms / batched_ms, 2) if batched_ms else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark trimmer token counting.")
+    parser.add_argument("--messages", type=int, default=10_000, help="History length")
+    parser.add_argument("--model", default="gpt-5-main", help="Model used to pick the encoding")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode (best is kept)")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.messages, args.model, repeat=args.repeat)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entrypoint
+    raise SystemExit(main())
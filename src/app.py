@@ -14,10 +14,13 @@ import math
 import numbers
 import os
 import re
+import uuid
+from datetime import datetime
+from functools import partial
 from pathlib import Path
 from threading import Lock
 from time import perf_counter
-from typing import Annotated, Any, Dict, List, Mapping, Sequence, cast, Literal
+from typing import Annotated, Any, Coroutine, Dict, List, Mapping, Sequence, Set, cast, Literal
 
 import chainlit as cl
 from fastapi import APIRouter, Depends, Header, HTTPException, status
@@ -28,8 +31,37 @@ from starlette.datastructures import Headers
 
 from core_ext.logging import InferenceLogRecord, StepLatency, StructuredLogger
 from core_ext.persona_compiler import compile_persona_yaml
-from core_ext.context_trimmer import ChatMessage as TrimMessage, trim_messages
-from core_ext.retention import compute_semantic_retention
+from core_ext.context_trimmer import (
+    ChatMessage as TrimMessage,
+    TokenCountCache,
+    TrimStrategy,
+    trim_messages,
+    warm_encodings,
+)
+from core_ext.retention import (
+    DEFAULT_RETENTION_QUEUE_SIZE,
+    RetentionQueue,
+    compute_semantic_retention_async,
+    embedding_cache_stats,
+    get_async_batch_embedder,
+    get_embedder,
+)
+from core_ext.memory import (
+    ConversationMessage,
+    ConversationMetadata,
+    MemoryStore,
+    MessageType,
+    SweepResult,
+    close_postgres_databases,
+    create_memory_store,
+    create_retention_sweeper,
+    create_write_behind_buffer,
+)
+from core_ext.trim_strategies import (
+    MemoryHybridStrategy,
+    SemanticClusteringStrategy,
+    recall_messages,
+)
 from core_ext.prethought import analyze_intent
 from core_ext.multistep import get_chain_steps, system_hint_for_step
 from core_ext.evolve import evolve_prompts, EvolutionResult
@@ -40,33 +72,57 @@ DEFAULT_MODEL = "gpt-5-main"
 DEFAULT_CHAIN = "single"
 DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant named Katamari."
 
+_TRIM_LOGGER = logging.getLogger("katamari.trim")
+
 _REASONING_DEFAULT: Dict[str, Any] = {"effort": "medium", "parallel": True}
 _DEFAULT_PARALLEL_MODELS: frozenset[str] = frozenset(
     {"gpt-5-thinking", "gpt-5-thinking-pro"}
 )
 
 
-def _load_parallel_reasoning_models() -> frozenset[str]:
+def _load_model_registry() -> List[Mapping[str, Any]] | None:
     registry_path = Path(__file__).resolve().parents[1] / "config" / "model_registry.json"
     try:
         raw_registry = json.loads(registry_path.read_text(encoding="utf-8"))
     except (OSError, ValueError, TypeError):
+        return None
+    if not isinstance(raw_registry, list):
+        return []
+    return [entry for entry in raw_registry if isinstance(entry, Mapping)]
+
+
+def _load_parallel_reasoning_models() -> frozenset[str]:
+    registry = _load_model_registry()
+    if registry is None:
         return _DEFAULT_PARALLEL_MODELS
 
     model_ids: set[str] = set()
-    if isinstance(raw_registry, list):
-        for entry in raw_registry:
-            if not isinstance(entry, Mapping):
-                continue
-            if entry.get("parallel") is True:
-                model_id = entry.get("id")
-                if isinstance(model_id, str):
-                    model_ids.add(model_id.lower())
+    for entry in registry:
+        if entry.get("parallel") is True:
+            model_id = entry.get("id")
+            if isinstance(model_id, str):
+                model_ids.add(model_id.lower())
 
     return frozenset(model_ids) or _DEFAULT_PARALLEL_MODELS
 
 
+def _warm_token_encodings() -> None:
+    """Load tokenizer encodings for every registered model once per process."""
+
+    model_ids = [
+        entry["id"]
+        for entry in _load_model_registry() or []
+        if isinstance(entry.get("id"), str)
+    ]
+    model_ids.append(os.getenv("DEFAULT_MODEL", DEFAULT_MODEL))
+    try:
+        warm_encodings(model_ids)
+    except Exception:  # noqa: BLE001 - warm-up must never block startup
+        _TRIM_LOGGER.exception("token encoding warm-up failed")
+
+
 _THINKING_PARALLEL_MODELS: frozenset[str] = _load_parallel_reasoning_models()
+_warm_token_encodings()
 
 ChatMessage = TrimMessage
 ChatHistory = List[ChatMessage]
@@ -150,6 +206,14 @@ def _chat_message(role: str, content: Any) -> ChatMessage:
     return {"role": role, "content": content}
 
 
+def _session_token_cache() -> TokenCountCache:
+    cache = _session_get("token_cache")
+    if not isinstance(cache, TokenCountCache):
+        cache = TokenCountCache()
+        _session_set("token_cache", cache)
+    return cache
+
+
 def _prepare_provider_options(model_id: str, base: Mapping[str, Any]) -> Dict[str, Any]:
     opts = dict(base)
     model_key = model_id.lower()
@@ -189,6 +253,22 @@ class MetricsRegistry:
         self._evolution_success_total: int = 0
         self._evolution_failure_total: int = 0
         self._evolution_latency_ms: float = 0.0
+        # Token count cache metrics
+        self._token_cache_hits_total: int = 0
+        self._token_cache_misses_total: int = 0
+        # Retention embedding cache metrics (process-wide totals)
+        self._embedding_cache_hits_total: int = 0
+        self._embedding_cache_misses_total: int = 0
+        # Chat memory write-behind buffer metrics
+        self._memory_write_queue_depth: int = 0
+        self._memory_write_flushes_total: int = 0
+        self._memory_write_failures_total: int = 0
+        self._memory_write_flush_latency_ms: float = 0.0
+        # Chat memory retention sweeper metrics
+        self._memory_retention_sweeps_total: int = 0
+        self._memory_retention_conversations_deleted_total: int = 0
+        self._memory_retention_embeddings_deleted_total: int = 0
+        self._memory_retention_sweep_duration_ms: float = 0.0
 
     def observe_trim(
         self, *, compress_ratio: float, semantic_retention: float | None = None
@@ -202,6 +282,18 @@ class MetricsRegistry:
             self._compress_ratio = float(compress_ratio)
             self._semantic_retention = retention
 
+    def observe_compress_ratio(self, compress_ratio: float) -> None:
+        """Record the latest compress ratio while retention is still pending."""
+        with self._lock:
+            self._compress_ratio = float(compress_ratio)
+
+    def observe_semantic_retention(self, semantic_retention: float | None) -> None:
+        """Record a semantic retention score computed in the background."""
+        with self._lock:
+            self._semantic_retention = (
+                float(semantic_retention) if semantic_retention is not None else None
+            )
+
     def observe_evolution(
         self, *, success: bool, latency_ms: float
     ) -> None:
@@ -213,6 +305,38 @@ class MetricsRegistry:
                 self._evolution_failure_total += 1
             self._evolution_latency_ms = latency_ms
 
+    def observe_token_cache(self, *, hits: int, misses: int) -> None:
+        """Accumulate token count cache lookups from a trim pass."""
+        with self._lock:
+            self._token_cache_hits_total += max(0, int(hits))
+            self._token_cache_misses_total += max(0, int(misses))
+
+    def observe_embedding_cache(self, *, hits: int, misses: int) -> None:
+        """Record the cumulative retention embedding cache counters."""
+        with self._lock:
+            self._embedding_cache_hits_total = max(0, int(hits))
+            self._embedding_cache_misses_total = max(0, int(misses))
+
+    def observe_memory_writes(
+        self, *, queue_depth: int, flushes: int, failures: int, flush_latency_ms: float
+    ) -> None:
+        """Record the chat memory write-behind buffer state."""
+        with self._lock:
+            self._memory_write_queue_depth = max(0, int(queue_depth))
+            self._memory_write_flushes_total = max(0, int(flushes))
+            self._memory_write_failures_total = max(0, int(failures))
+            self._memory_write_flush_latency_ms = float(flush_latency_ms)
+
+    def observe_retention_sweep(
+        self, *, conversations_deleted: int, embeddings_deleted: int, duration_ms: float
+    ) -> None:
+        """Accumulate one retention sweep pass."""
+        with self._lock:
+            self._memory_retention_sweeps_total += 1
+            self._memory_retention_conversations_deleted_total += max(0, int(conversations_deleted))
+            self._memory_retention_embeddings_deleted_total += max(0, int(embeddings_deleted))
+            self._memory_retention_sweep_duration_ms = float(duration_ms)
+
     def snapshot(self) -> Dict[str, float | None]:
         with self._lock:
             return {
@@ -221,11 +345,31 @@ class MetricsRegistry:
                 "evolution_success_total": self._evolution_success_total,
                 "evolution_failure_total": self._evolution_failure_total,
                 "evolution_latency_ms": self._evolution_latency_ms,
+                "token_cache_hits_total": self._token_cache_hits_total,
+                "token_cache_misses_total": self._token_cache_misses_total,
+                "embedding_cache_hits_total": self._embedding_cache_hits_total,
+                "embedding_cache_misses_total": self._embedding_cache_misses_total,
+                "memory_write_queue_depth": self._memory_write_queue_depth,
+                "memory_write_flushes_total": self._memory_write_flushes_total,
+                "memory_write_failures_total": self._memory_write_failures_total,
+                "memory_write_flush_latency_ms": self._memory_write_flush_latency_ms,
+                "memory_retention_sweeps_total": self._memory_retention_sweeps_total,
+                "memory_retention_conversations_deleted_total": (
+                    self._memory_retention_conversations_deleted_total
+                ),
+                "memory_retention_embeddings_deleted_total": (
+                    self._memory_retention_embeddings_deleted_total
+                ),
+                "memory_retention_sweep_duration_ms": self._memory_retention_sweep_duration_ms,
             }
 
     def export_prometheus(self) -> str:
         metrics = self.snapshot()
         retention = metrics["semantic_retention"]
+        embedding_hits = int(metrics["embedding_cache_hits_total"] or 0)
+        embedding_misses = int(metrics["embedding_cache_misses_total"] or 0)
+        embedding_lookups = embedding_hits + embedding_misses
+        embedding_ratio = embedding_hits / embedding_lookups if embedding_lookups else math.nan
 
         def _format(value: float | None) -> str:
             if value is None:
@@ -260,6 +404,48 @@ class MetricsRegistry:
             "# HELP evolution_latency_ms Latency of the last evolution run in milliseconds.",
             "# TYPE evolution_latency_ms gauge",
             f"evolution_latency_ms {_format(metrics['evolution_latency_ms'])}",
+            "# HELP token_cache_hits_total Total token count cache hits during trimming.",
+            "# TYPE token_cache_hits_total counter",
+            f"token_cache_hits_total {int(metrics['token_cache_hits_total'] or 0)}",
+            "# HELP token_cache_misses_total Total token count cache misses during trimming.",
+            "# TYPE token_cache_misses_total counter",
+            f"token_cache_misses_total {int(metrics['token_cache_misses_total'] or 0)}",
+            "# HELP embedding_cache_hits_total Total retention embedding cache hits.",
+            "# TYPE embedding_cache_hits_total counter",
+            f"embedding_cache_hits_total {embedding_hits}",
+            "# HELP embedding_cache_misses_total Total retention embedding cache misses.",
+            "# TYPE embedding_cache_misses_total counter",
+            f"embedding_cache_misses_total {embedding_misses}",
+            "# HELP embedding_cache_hit_ratio Share of retention embeddings served from cache.",
+            "# TYPE embedding_cache_hit_ratio gauge",
+            f"embedding_cache_hit_ratio {_format(embedding_ratio)}",
+            "# HELP memory_write_queue_depth Chat memory writes buffered but not yet stored.",
+            "# TYPE memory_write_queue_depth gauge",
+            f"memory_write_queue_depth {int(metrics['memory_write_queue_depth'] or 0)}",
+            "# HELP memory_write_flushes_total Total write-behind batches stored.",
+            "# TYPE memory_write_flushes_total counter",
+            f"memory_write_flushes_total {int(metrics['memory_write_flushes_total'] or 0)}",
+            "# HELP memory_write_failures_total Total write-behind batches that failed to store.",
+            "# TYPE memory_write_failures_total counter",
+            f"memory_write_failures_total {int(metrics['memory_write_failures_total'] or 0)}",
+            "# HELP memory_write_flush_latency_ms Latency of the last write-behind flush in milliseconds.",
+            "# TYPE memory_write_flush_latency_ms gauge",
+            f"memory_write_flush_latency_ms {_format(metrics['memory_write_flush_latency_ms'])}",
+            "# HELP memory_retention_sweeps_total Total retention sweep passes completed.",
+            "# TYPE memory_retention_sweeps_total counter",
+            f"memory_retention_sweeps_total {int(metrics['memory_retention_sweeps_total'] or 0)}",
+            "# HELP memory_retention_conversations_deleted_total Total conversations deleted by retention.",
+            "# TYPE memory_retention_conversations_deleted_total counter",
+            "memory_retention_conversations_deleted_total "
+            f"{int(metrics['memory_retention_conversations_deleted_total'] or 0)}",
+            "# HELP memory_retention_embeddings_deleted_total Total embeddings deleted by retention.",
+            "# TYPE memory_retention_embeddings_deleted_total counter",
+            "memory_retention_embeddings_deleted_total "
+            f"{int(metrics['memory_retention_embeddings_deleted_total'] or 0)}",
+            "# HELP memory_retention_sweep_duration_ms Duration of the last retention sweep in milliseconds.",
+            "# TYPE memory_retention_sweep_duration_ms gauge",
+            "memory_retention_sweep_duration_ms "
+            f"{_format(metrics['memory_retention_sweep_duration_ms'])}",
         ]
         return "\n".join(lines) + "\n"
 
@@ -431,6 +617,120 @@ def _resolve_retryable(exc: BaseException) -> bool | None:
     return None
 
 
+def _embedding_cache_counters() -> Dict[str, int]:
+    stats = embedding_cache_stats()
+    return {"hits": stats["hits"], "misses": stats["misses"]}
+
+
+def _coerce_retention(result: Any) -> float | None:
+    if result is None:
+        return None
+    try:
+        numeric = float(result)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(numeric):
+        return None
+    return numeric
+
+
+def _retention_queue_size() -> int:
+    size = _to_int(os.getenv("SEMANTIC_RETENTION_QUEUE_SIZE"))
+    return size if size > 0 else DEFAULT_RETENTION_QUEUE_SIZE
+
+
+def _retention_shutdown_timeout() -> float:
+    timeout = _to_float(os.getenv("SEMANTIC_RETENTION_SHUTDOWN_TIMEOUT_SECONDS"), default=5.0)
+    return timeout if timeout > 0 else 5.0
+
+
+_RETENTION_QUEUE = RetentionQueue(_retention_queue_size())
+
+
+def _retention_mode_is_async() -> bool:
+    return os.getenv("SEMANTIC_RETENTION_MODE", "").strip().lower() == "async"
+
+
+class _DeferredRetention:
+    """Join a finished request with its background retention result.
+
+    Whichever side finishes last emits the ``InferenceLogRecord``, so the log
+    line always carries the retention score when one was computed.
+    """
+
+    def __init__(self, metrics: MetricsPayload) -> None:
+        self._metrics = metrics
+        self._record: InferenceLogRecord | None = None
+        self.pending = True
+        self.value: float | None = None
+        _PENDING_RETENTION.add(self)
+
+    def resolve(self, result: float | None) -> None:
+        _PENDING_RETENTION.discard(self)
+        self.value = _coerce_retention(result)
+        self.pending = False
+        self._metrics["semantic_retention"] = self.value
+        METRICS_REGISTRY.observe_semantic_retention(self.value)
+        METRICS_REGISTRY.observe_embedding_cache(**_embedding_cache_counters())
+        if self._record is not None:
+            self.emit(self._record)
+
+    def drop(self) -> None:
+        _PENDING_RETENTION.discard(self)
+        self.pending = False
+        if self._record is not None:
+            self.emit(self._record)
+
+    def emit(self, record: InferenceLogRecord) -> None:
+        if self.pending:
+            self._record = record
+            return
+        self._record = None
+        record.semantic_retention = self.value
+        REQUEST_LOGGER.emit(record)
+
+
+_PENDING_RETENTION: Set[_DeferredRetention] = set()
+
+
+async def _shutdown_retention_queue() -> None:
+    """Let queued retention jobs finish, then log any leftovers without a score."""
+
+    try:
+        await asyncio.wait_for(_RETENTION_QUEUE.drain(), timeout=_retention_shutdown_timeout())
+    except asyncio.TimeoutError:
+        _RETENTION_LOGGER.warning(
+            "semantic retention queue did not drain before shutdown; %d turns logged without it",
+            len(_PENDING_RETENTION),
+        )
+    await _RETENTION_QUEUE.close()
+    for deferred in list(_PENDING_RETENTION):
+        deferred.drop()
+
+
+def _schedule_semantic_retention(
+    before: Sequence[ChatMessage],
+    after: Sequence[ChatMessage],
+    metrics: MetricsPayload,
+) -> _DeferredRetention | None:
+    """Queue retention in the background; ``None`` means fall back to inline handling."""
+
+    if metrics.get("semantic_retention") is not None:
+        return None
+    provider = os.getenv("SEMANTIC_RETENTION_PROVIDER", "").strip().lower()
+    if provider in _DISABLED_RETENTION_VALUES:
+        return None
+
+    deferred = _DeferredRetention(metrics)
+    metrics["semantic_retention"] = None
+    # Copy both histories: ``after`` keeps growing while the chain streams.
+    job = partial(compute_semantic_retention_async, list(before), list(after))
+    if not _RETENTION_QUEUE.submit(job, deferred.resolve):
+        _RETENTION_LOGGER.warning("semantic retention queue full; skipping this turn")
+        deferred.drop()
+    return deferred
+
+
 async def _ensure_semantic_retention(
     before: Sequence[ChatMessage],
     after: Sequence[ChatMessage],
@@ -454,31 +754,252 @@ async def _ensure_semantic_retention(
         return None
 
     try:
-        result = await asyncio.to_thread(
-            compute_semantic_retention,
-            before,
-            after,
-        )
+        result = await compute_semantic_retention_async(before, after)
     except Exception:  # noqa: BLE001 - intentional broad catch for fallback
         _RETENTION_LOGGER.exception("semantic retention computation failed")
         metrics["semantic_retention"] = None
         return None
-    if result is None:
-        metrics["semantic_retention"] = None
+    finally:
+        METRICS_REGISTRY.observe_embedding_cache(**_embedding_cache_counters())
+    numeric = _coerce_retention(result)
+    metrics["semantic_retention"] = numeric
+    return numeric
+
+_SLIDING_WINDOW_STRATEGY_VALUES = {"", "sliding_window", "window"}
+_TRIM_STRATEGY_CACHE: Dict[str, tuple[Any, TrimStrategy]] = {}
+
+
+def _resolve_trim_strategy() -> TrimStrategy | None:
+    """Return the configured non-default trim strategy, or ``None`` for the sliding window."""
+
+    name = os.getenv("TRIM_STRATEGY", "").strip().lower()
+    if name in _SLIDING_WINDOW_STRATEGY_VALUES or name == MemoryHybridStrategy.name:
+        # ``memory_hybrid`` needs a per-turn recall; see ``_resolve_memory_strategy``.
+        return None
+    if name != SemanticClusteringStrategy.name:
+        _TRIM_LOGGER.warning("unknown TRIM_STRATEGY %r; using sliding window", name)
+        return None
+
+    provider = os.getenv("SEMANTIC_RETENTION_PROVIDER", "").strip().lower()
+    if provider in _DISABLED_RETENTION_VALUES:
+        return None
+    embedder = get_embedder(provider)
+    if embedder is None:
+        return None
+    cached = _TRIM_STRATEGY_CACHE.get(name)
+    if cached is not None and cached[0] is embedder:
+        return cached[1]
+    strategy = SemanticClusteringStrategy(embedder)
+    _TRIM_STRATEGY_CACHE[name] = (embedder, strategy)
+    return strategy
+
+
+_MEMORY_LOGGER = logging.getLogger("katamari.memory")
+DEFAULT_REHYDRATE_MESSAGES = 50
+
+
+class _ChatMemory:
+    """Process-wide chat persistence enabled by ``MEMORY_PERSIST_CHAT``.
+
+    Turns go through a write-behind buffer so ``on_message`` never awaits the
+    store; embeddings for recall are written by tracked background tasks.
+    """
+
+    def __init__(self, store: MemoryStore) -> None:
+        self.store = store
+        self.buffer = create_write_behind_buffer(store)
+        self.sweeper = create_retention_sweeper(store, on_sweep=self._observe_sweep)
+        self._tasks: Set[asyncio.Task[Any]] = set()
+        if self.sweeper is not None:
+            self.sweeper.start()
+
+    def spawn(self, job: Coroutine[Any, Any, Any]) -> None:
+        task = asyncio.get_running_loop().create_task(job)
+        self._tasks.add(task)
+        task.add_done_callback(self._finish_task)
+
+    def _finish_task(self, task: asyncio.Task[Any]) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            _MEMORY_LOGGER.error("background memory task failed", exc_info=task.exception())
+
+    @staticmethod
+    def _observe_sweep(result: SweepResult) -> None:
+        METRICS_REGISTRY.observe_retention_sweep(
+            conversations_deleted=result.conversations_deleted,
+            embeddings_deleted=result.embeddings_deleted,
+            duration_ms=result.duration_seconds * 1000.0,
+        )
+
+    def observe(self) -> None:
+        buffer = self.buffer
+        METRICS_REGISTRY.observe_memory_writes(
+            queue_depth=buffer.pending,
+            flushes=buffer.flushes,
+            failures=buffer.failures,
+            flush_latency_ms=buffer.last_flush_latency * 1000.0,
+        )
+
+    async def close(self) -> None:
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        await self.buffer.close()
+        if self.sweeper is not None:
+            await self.sweeper.stop()
+        self.observe()
+
+
+_CHAT_MEMORY: _ChatMemory | None = None
+_CHAT_MEMORY_REFUSED = False
+
+
+def _chat_memory() -> _ChatMemory | None:
+    """Return the shared chat memory, creating it on first use; ``None`` when disabled.
+
+    Persistence is opt-in (``MEMORY_PERSIST_CHAT``) and refuses the in-process
+    ``memory`` backend, which would keep every turn of every session in RAM.
+    """
+
+    global _CHAT_MEMORY, _CHAT_MEMORY_REFUSED
+    if _CHAT_MEMORY is not None:
+        return _CHAT_MEMORY
+    if not _coerce_bool(os.getenv("MEMORY_PERSIST_CHAT")):
+        return None
+    backend = (os.getenv("MEMORY_STORAGE_BACKEND") or "memory").strip().lower()
+    if backend == "memory":
+        if not _CHAT_MEMORY_REFUSED:
+            _CHAT_MEMORY_REFUSED = True
+            _MEMORY_LOGGER.warning(
+                "MEMORY_PERSIST_CHAT needs a durable MEMORY_STORAGE_BACKEND (sqlite/postgres); "
+                "chat persistence disabled"
+            )
+        return None
+    try:
+        store = create_memory_store()
+    except Exception:  # noqa: BLE001 - a broken backend must not take chat down
+        _MEMORY_LOGGER.exception("memory store unavailable; chat persistence disabled")
         return None
+    _CHAT_MEMORY = _ChatMemory(store)
+    return _CHAT_MEMORY
 
+
+def _conversation_id() -> str | None:
     try:
-        numeric = float(result)
-    except (TypeError, ValueError):
-        metrics["semantic_retention"] = None
+        thread_id = cl.context.session.thread_id
+    except Exception:  # noqa: BLE001 - no Chainlit context outside a websocket session
         return None
+    return thread_id if isinstance(thread_id, str) and thread_id else None
+
+
+def _conversation_metadata(
+    conversation_id: str, *, model: str, chain: str, metrics: MetricsPayload
+) -> ConversationMetadata:
+    now = datetime.utcnow()
+    created_at = _session_get("memory_created_at")
+    if not isinstance(created_at, datetime):
+        created_at = now
+        _session_set("memory_created_at", created_at)
+    # Merge so turns without fresh trim metrics keep the last stored values.
+    previous = _session_get("memory_metrics")
+    merged: MetricsPayload = dict(previous) if isinstance(previous, dict) else {}
+    merged.update({key: value for key, value in metrics.items() if value is not None})
+    _session_set("memory_metrics", merged)
+    retention = merged.get("semantic_retention")
+    return ConversationMetadata(
+        id=conversation_id,
+        user_id=getattr(_session_get("user"), "identifier", None),
+        model=model,
+        chain=chain,
+        created_at=created_at,
+        updated_at=now,
+        token_count=_to_int(merged.get("output_tokens")),
+        compress_ratio=_to_float(merged.get("compress_ratio"), default=1.0),
+        semantic_retention=retention if isinstance(retention, float) else None,
+    )
 
-    if math.isnan(numeric):
-        metrics["semantic_retention"] = None
+
+def _persist_turn(
+    memory: _ChatMemory, conversation: ConversationMetadata, role: MessageType, content: str
+) -> None:
+    """Buffer one turn (never awaits the store) and embed it for recall when enabled."""
+
+    message = ConversationMessage(
+        id=uuid.uuid4().hex, conversation_id=conversation.id, role=role, content=content
+    )
+    memory.buffer.enqueue(conversation, [message])
+    memory.observe()
+    if memory.store.embeddings is None or not _coerce_bool(
+        os.getenv("MEMORY_EMBEDDING_ENABLED")
+    ):
+        return
+    provider = os.getenv("SEMANTIC_RETENTION_PROVIDER", "").strip().lower()
+    embed = None if provider in _DISABLED_RETENTION_VALUES else get_async_batch_embedder(provider)
+    if embed is None:
+        return
+    model = os.getenv("MEMORY_EMBEDDING_MODEL", "").strip() or provider
+    memory.spawn(memory.store.save_message_embeddings([message], embed, model))
+
+
+def _rehydrate_limit() -> int:
+    limit = _to_int(os.getenv("MEMORY_REHYDRATE_MESSAGES"))
+    return limit if limit > 0 else DEFAULT_REHYDRATE_MESSAGES
+
+
+async def _rehydrate_history(memory: _ChatMemory, conversation_id: str) -> ChatHistory:
+    """Rebuild the recent turns of ``conversation_id`` from the store and the write buffer."""
+
+    limit = _rehydrate_limit()
+    conversation, stored = await asyncio.gather(
+        memory.store.metadata.get_conversation(conversation_id),
+        memory.store.messages.get_recent_messages(conversation_id, limit),
+    )
+    if conversation is not None:
+        _session_set("memory_created_at", conversation.created_at)
+        _session_set(
+            "memory_metrics",
+            {
+                "output_tokens": conversation.token_count,
+                "compress_ratio": conversation.compress_ratio,
+                "semantic_retention": conversation.semantic_retention,
+            },
+        )
+    seen = {message.id for message in stored}
+    buffered = [
+        message
+        for message in memory.buffer.pending_messages(conversation_id)
+        if message.id not in seen
+    ]
+    return [
+        _chat_message(message.role.value, message.content)
+        for message in (stored + buffered)[-limit:]
+    ]
+
+
+async def _resolve_memory_strategy(
+    memory: _ChatMemory | None, conversation_id: str | None, query: str
+) -> TrimStrategy | None:
+    """Build ``MemoryHybridStrategy`` from turns recalled for ``query``; ``None`` to skip."""
+
+    if os.getenv("TRIM_STRATEGY", "").strip().lower() != MemoryHybridStrategy.name:
+        return None
+    if memory is None or conversation_id is None or memory.store.embeddings is None:
         return None
+    provider = os.getenv("SEMANTIC_RETENTION_PROVIDER", "").strip().lower()
+    if provider in _DISABLED_RETENTION_VALUES:
+        return None
+    embed = get_async_batch_embedder(provider)
+    if embed is None:
+        return None
+    try:
+        vectors = await embed([query])
+        recalled = await recall_messages(
+            memory.store, vectors[0], conversation_id=conversation_id
+        )
+    except Exception:  # noqa: BLE001 - recall is best effort; fall back to the window
+        _TRIM_LOGGER.exception("memory recall failed; using sliding window")
+        return None
+    return MemoryHybridStrategy(recalled)
 
-    metrics["semantic_retention"] = numeric
-    return numeric
 
 ops_router = APIRouter()
 
@@ -494,6 +1015,8 @@ async def healthz() -> Dict[str, str]:
 async def metrics() -> PlainTextResponse:
     """Expose runtime metrics in Prometheus text format."""
 
+    if _CHAT_MEMORY is not None:
+        _CHAT_MEMORY.observe()
     payload = METRICS_REGISTRY.export_prometheus()
     return PlainTextResponse(
         payload,
@@ -721,6 +1244,40 @@ async def on_start() -> None:
 
     await apply_settings(cast(Mapping[str, Any], settings_payload))
 
+
+@cl.on_chat_resume
+async def on_chat_resume(thread: Mapping[str, Any]) -> None:
+    """Restore settings; the working window is reloaded from memory on the next message."""
+
+    await on_start()
+    _session_set("memory_rehydrate", True)
+
+
+@cl.on_chat_end
+async def on_chat_end() -> None:
+    """Flush the ending session's buffered turns."""
+
+    conversation_id = _conversation_id()
+    if _CHAT_MEMORY is None or conversation_id is None:
+        return
+    try:
+        await _CHAT_MEMORY.buffer.flush(conversation_id)
+    except Exception:  # noqa: BLE001 - retryable batches stay buffered for the timer
+        _MEMORY_LOGGER.exception("flushing conversation %s at session end failed", conversation_id)
+    _CHAT_MEMORY.observe()
+
+
+@cl.on_app_shutdown
+async def on_app_shutdown() -> None:
+    """Finish background retention, flush every buffered turn and release storage connections."""
+
+    global _CHAT_MEMORY
+    await _shutdown_retention_queue()
+    memory, _CHAT_MEMORY = _CHAT_MEMORY, None
+    if memory is not None:
+        await memory.close()
+    await close_postgres_databases()
+
 @cl.on_settings_update
 async def on_settings_update(settings: Mapping[str, Any]) -> None:
     await apply_settings(settings)
@@ -800,6 +1357,19 @@ async def on_message(message: cl.Message) -> None:
         if potential_intent:
             intent = potential_intent
 
+    # 1) Restore the working window after a resume
+    system = str(_session_get("system") or DEFAULT_SYSTEM_PROMPT)
+    conversation_id = _conversation_id()
+    memory = _chat_memory() if conversation_id is not None else None
+    if memory is not None and conversation_id is not None and _session_get("memory_rehydrate"):
+        try:
+            restored = await _rehydrate_history(memory, conversation_id)
+        except Exception:  # noqa: BLE001 - retry on the next message
+            _MEMORY_LOGGER.exception("rehydrating conversation %s failed", conversation_id)
+        else:
+            _session_set("history", [_chat_message("system", system)] + restored)
+            _session_set("memory_rehydrate", False)
+
     # 2) Build/trim history
     hist_data = _session_get("history") or []
     hist: ChatHistory = []
@@ -809,10 +1379,16 @@ async def on_message(message: cl.Message) -> None:
             for entry in hist_data
             if isinstance(entry, dict)
         ]
-    system = str(_session_get("system") or DEFAULT_SYSTEM_PROMPT)
     if not hist or hist[0].get("role") != "system":
         hist.insert(0, _chat_message("system", system))
     hist.append(_chat_message("user", message.content))
+    if memory is not None and conversation_id is not None:
+        _persist_turn(
+            memory,
+            _conversation_metadata(conversation_id, model=model, chain=chain_id, metrics={}),
+            MessageType.USER,
+            message.content,
+        )
 
     trimmed: ChatHistory = []
     metrics: MetricsPayload = {}
@@ -824,18 +1400,45 @@ async def on_message(message: cl.Message) -> None:
     token_out = 0
     compress_ratio = 1.0
     semantic_retention: float | None = None
+    deferred_retention: _DeferredRetention | None = None
     overall_start = perf_counter()
 
     try:
-        trimmed_raw, metrics_raw = trim_messages(
-            hist,
-            target_tokens,
-            model,
-            min_turns=min_turns,
+        trim_strategy = _resolve_trim_strategy() or await _resolve_memory_strategy(
+            memory, conversation_id, message.content
         )
+        if trim_strategy is None:
+            trimmed_raw, metrics_raw = trim_messages(
+                hist,
+                target_tokens,
+                model,
+                min_turns=min_turns,
+                token_cache=_session_token_cache(),
+            )
+        else:
+            # Strategies that embed turns make network calls; keep them off the loop.
+            trimmed_raw, metrics_raw = await asyncio.to_thread(
+                trim_messages,
+                hist,
+                target_tokens,
+                model,
+                min_turns=min_turns,
+                token_cache=_session_token_cache(),
+                strategy=trim_strategy,
+            )
         trimmed = cast(ChatHistory, list(trimmed_raw))
         metrics = dict(metrics_raw)
-        semantic_retention_raw = await _ensure_semantic_retention(hist, trimmed, metrics)
+        METRICS_REGISTRY.observe_token_cache(
+            hits=_to_int(metrics.get("token_cache_hits")),
+            misses=_to_int(metrics.get("token_cache_misses")),
+        )
+        if _retention_mode_is_async():
+            deferred_retention = _schedule_semantic_retention(hist, trimmed, metrics)
+        semantic_retention_raw = (
+            await _ensure_semantic_retention(hist, trimmed, metrics)
+            if deferred_retention is None
+            else None
+        )
         token_in = _to_int(metrics.get("input_tokens"))
         token_out = _to_int(metrics.get("output_tokens"))
         compress_ratio = _to_float(metrics.get("compress_ratio"), default=1.0)
@@ -847,10 +1450,13 @@ async def on_message(message: cl.Message) -> None:
         if isinstance(semantic_retention, float) and math.isnan(semantic_retention):
             semantic_retention = None
         metrics["semantic_retention"] = semantic_retention
-        METRICS_REGISTRY.observe_trim(
-            compress_ratio=compress_ratio,
-            semantic_retention=semantic_retention,
-        )
+        if deferred_retention is None:
+            METRICS_REGISTRY.observe_trim(
+                compress_ratio=compress_ratio,
+                semantic_retention=semantic_retention,
+            )
+        else:
+            METRICS_REGISTRY.observe_compress_ratio(compress_ratio)
         _session_set("history", trimmed)
         _session_set("trim_metrics", metrics)
         trim_message = _format_trim_message(
@@ -913,6 +1519,15 @@ async def on_message(message: cl.Message) -> None:
                     step.output = output
                     trimmed.append(_chat_message("assistant", output))
                     _session_set("history", trimmed)
+                    if memory is not None and conversation_id is not None:
+                        _persist_turn(
+                            memory,
+                            _conversation_metadata(
+                                conversation_id, model=model, chain=chain_id, metrics=metrics
+                            ),
+                            MessageType.ASSISTANT,
+                            output,
+                        )
             finally:
                 elapsed_ms = (perf_counter() - step_start) * 1000.0
                 step_timings.append({"step": step_label, "latency_ms": elapsed_ms})
@@ -924,21 +1539,23 @@ async def on_message(message: cl.Message) -> None:
         raise
     finally:
         total_latency_ms = (perf_counter() - overall_start) * 1000.0
-        REQUEST_LOGGER.emit(
-            InferenceLogRecord(
-                status=status,
-                model=model,
-                chain=chain_id,
-                token_in=token_in,
-                token_out=token_out,
-                compress_ratio=compress_ratio,
-                semantic_retention=semantic_retention,
-                step_latency_ms=step_timings,
-                latency_ms=total_latency_ms,
-                retryable=retryable,
-                error=error_message,
-            )
+        record = InferenceLogRecord(
+            status=status,
+            model=model,
+            chain=chain_id,
+            token_in=token_in,
+            token_out=token_out,
+            compress_ratio=compress_ratio,
+            semantic_retention=semantic_retention,
+            step_latency_ms=step_timings,
+            latency_ms=total_latency_ms,
+            retryable=retryable,
+            error=error_message,
         )
+        if deferred_retention is None:
+            REQUEST_LOGGER.emit(record)
+        else:
+            deferred_retention.emit(record)
 
     # Mirror last output as normal message
     if trimmed and trimmed[-1]["role"] == "assistant":
@@ -1,6 +1,14 @@
 from __future__ import annotations
 
+import hashlib
+import operator
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
 from importlib import import_module
+from threading import Lock
 from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TypedDict, cast
 
 tiktoken: Any
@@ -35,7 +43,7 @@ class ChatMessage(TypedDict, total=False):
     content: str
 
 
-TrimMetricValue = float | int | None | Dict[str, str]
+TrimMetricValue = float | int | str | None | Dict[str, str]
 TrimMetrics = Dict[str, TrimMetricValue]
 
 _MessageSeq = Sequence[ChatMessage]
@@ -48,6 +56,18 @@ _MODEL_PREFIX_ENCODINGS: Tuple[Tuple[str, str], ...] = (
     ("gpt-3.5", "cl100k_base"),
 )
 
+_EncodingEntry = Tuple[Optional[str], Optional[Any]]
+
+_ENCODING_REGISTRY: Dict[str, _EncodingEntry] = {}
+_ENCODING_REGISTRY_LOCK = Lock()
+
+_HEURISTIC_CACHE_NAMESPACE = "heuristic"
+DEFAULT_TOKEN_CACHE_SIZE = 4096
+# Below this many uncached texts (or on a single core) the thread fan-out of
+# encode_batch costs more than it saves, so counting stays sequential.
+BATCH_ENCODE_THRESHOLD = 64
+BATCH_ENCODE_THREADS = min(8, os.cpu_count() or 1)
+
 
 def _register_ascii_encoding(name: str) -> Optional[Any]:
     if _registry is None or _Encoding is None:
@@ -66,6 +86,63 @@ def _register_ascii_encoding(name: str) -> Optional[Any]:
     return encoding
 
 
+def _resolve_encoding_name(model: str) -> Optional[str]:
+    if tiktoken is None:
+        return None
+    normalized = model.lower()
+    for prefix, encoding in _MODEL_PREFIX_ENCODINGS:
+        if normalized.startswith(prefix):
+            return encoding
+    try:
+        return cast(str, tiktoken.encoding_for_model(model).name)
+    except Exception:
+        return None
+
+
+def _load_encoding(name: Optional[str]) -> Optional[Any]:
+    if name is None or tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        return _register_ascii_encoding(name)
+
+
+def _encoding_registry_key(model: str) -> str:
+    normalized = model.strip().lower()
+    for prefix, _ in _MODEL_PREFIX_ENCODINGS:
+        if normalized.startswith(prefix):
+            return prefix
+    return normalized
+
+
+def get_encoding_for_model(model: str) -> _EncodingEntry:
+    """Return ``(encoding_name, encoding)`` for ``model``, loading it at most once."""
+
+    key = _encoding_registry_key(model)
+    entry = _ENCODING_REGISTRY.get(key)
+    if entry is not None:
+        return entry
+    with _ENCODING_REGISTRY_LOCK:
+        entry = _ENCODING_REGISTRY.get(key)
+        if entry is None:
+            name = _resolve_encoding_name(model)
+            entry = (name, _load_encoding(name))
+            _ENCODING_REGISTRY[key] = entry
+    return entry
+
+
+def warm_encodings(models: Iterable[str]) -> Dict[str, Optional[str]]:
+    """Eagerly load encodings for ``models`` and return the resolved names."""
+
+    return {model: get_encoding_for_model(model)[0] for model in models}
+
+
+def reset_encoding_registry() -> None:
+    with _ENCODING_REGISTRY_LOCK:
+        _ENCODING_REGISTRY.clear()
+
+
 def _group_conversation_turns(conversation: _MessageSeq) -> List[_MessageList]:
     turns: List[_MessageList] = []
     current: _MessageList = []
@@ -85,38 +162,113 @@ def _group_conversation_turns(conversation: _MessageSeq) -> List[_MessageList]:
     return turns
 
 
-class _TokenCounter:
-    def __init__(self, model: str) -> None:
-        self._encoding_name = self._resolve_encoding_name(model)
-        self._encoding = self._load_encoding(self._encoding_name)
+class TokenCountCache:
+    """Bounded LRU of token counts keyed by encoding and content hash.
 
-    @staticmethod
-    def _resolve_encoding_name(model: str) -> Optional[str]:
-        if tiktoken is None:
-            return None
-        normalized = model.lower()
-        for prefix, encoding in _MODEL_PREFIX_ENCODINGS:
-            if normalized.startswith(prefix):
-                return encoding
-        try:
-            return cast(str, tiktoken.encoding_for_model(model).name)
-        except Exception:
-            return None
+    One instance is meant to live for a chat session so that messages already
+    seen on previous turns are never re-encoded.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_TOKEN_CACHE_SIZE) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
     @staticmethod
-    def _load_encoding(name: Optional[str]) -> Optional[Any]:
-        if name is None or tiktoken is None:
+    def _key(namespace: str, text: str) -> Tuple[str, bytes]:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        return namespace, digest
+
+    def get(self, namespace: str, text: str) -> Optional[int]:
+        key = self._key(namespace, text)
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
             return None
-        try:
-            return tiktoken.get_encoding(name)
-        except Exception:
-            return _register_ascii_encoding(name)
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
 
-    def count(self, text: str) -> int:
+    def put(self, namespace: str, text: str, tokens: int) -> None:
+        key = self._key(namespace, text)
+        self._entries[key] = tokens
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class _TokenCounter:
+    def __init__(self, model: str, cache: Optional[TokenCountCache] = None) -> None:
+        self._encoding_name, self._encoding = get_encoding_for_model(model)
+        self._cache = cache
+        self._cache_namespace = (
+            self._encoding_name
+            if self._encoding is not None and self._encoding_name is not None
+            else _HEURISTIC_CACHE_NAMESPACE
+        )
+
+    def _encode_count(self, text: str) -> int:
         if self._encoding is not None:
             return len(self._encoding.encode(text))
         return max(1, len(text) // 4)
 
+    def count(self, text: str) -> int:
+        if self._cache is None:
+            return self._encode_count(text)
+        cached = self._cache.get(self._cache_namespace, text)
+        if cached is not None:
+            return cached
+        tokens = self._encode_count(text)
+        self._cache.put(self._cache_namespace, text, tokens)
+        return tokens
+
+    def _encode_counts(self, texts: Sequence[str]) -> List[int]:
+        if (
+            self._encoding is not None
+            and BATCH_ENCODE_THREADS > 1
+            and len(texts) >= BATCH_ENCODE_THRESHOLD
+        ):
+            encoded = self._encoding.encode_batch(list(texts), num_threads=BATCH_ENCODE_THREADS)
+            return [len(tokens) for tokens in encoded]
+        return [self._encode_count(text) for text in texts]
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        """Count ``texts``, encoding only distinct uncached values in one batch."""
+
+        counts: List[Optional[int]] = [None] * len(texts)
+        pending: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            waiting = pending.get(text)
+            if waiting is not None:
+                waiting.append(index)
+                continue
+            cached = (
+                self._cache.get(self._cache_namespace, text)
+                if self._cache is not None
+                else None
+            )
+            if cached is not None:
+                counts[index] = cached
+            else:
+                pending[text] = [index]
+        if pending:
+            uncached = list(pending)
+            for text, tokens in zip(uncached, self._encode_counts(uncached)):
+                if self._cache is not None:
+                    self._cache.put(self._cache_namespace, text, tokens)
+                for index in pending[text]:
+                    counts[index] = tokens
+        return [cast(int, value) for value in counts]
+
     def describe(self) -> Dict[str, str]:
         info: Dict[str, str] = {
             "mode": "tiktoken" if self._encoding is not None else "heuristic"
@@ -126,6 +278,117 @@ class _TokenCounter:
         return info
 
 
+def _select_window_start(
+    unit_tokens: Sequence[int], forced: Sequence[bool], budget: int
+) -> int:
+    """Return the index where the kept window of non-forced units begins.
+
+    Forced units are always kept and reserve their tokens first; the remaining
+    budget is filled with the most recent contiguous run of non-forced units.
+    ``suffix[i]`` holds the non-forced tokens of ``units[i:]`` and never grows
+    with ``i``, so the cut point is found by binary search.
+    """
+
+    size = len(unit_tokens)
+    suffix = [0] * (size + 1)
+    forced_total = 0
+    for index in range(size - 1, -1, -1):
+        if forced[index]:
+            forced_total += unit_tokens[index]
+            suffix[index] = suffix[index + 1]
+        else:
+            suffix[index] = suffix[index + 1] + unit_tokens[index]
+    remaining = budget - forced_total
+    if remaining < 0:
+        return size
+    return bisect_left(suffix, -remaining, key=operator.neg)
+
+
+@dataclass
+class TrimPlan:
+    """Conversation split into trim units with their token counts.
+
+    Units are whole turns when ``min_turns`` is set and single messages
+    otherwise. ``forced`` marks units that must survive regardless of budget.
+    """
+
+    units: List[_MessageList]
+    unit_tokens: List[int]
+    forced: List[bool]
+    counter: _TokenCounter
+
+    def window_start(self, budget: int) -> int:
+        return _select_window_start(self.unit_tokens, self.forced, budget)
+
+    def is_kept(self, index: int, start: int) -> bool:
+        return index >= start or self.forced[index]
+
+    def count(self, text: str) -> int:
+        return self.counter.count(text)
+
+
+class TrimStrategy(ABC):
+    """Decide which conversation messages survive a trim pass."""
+
+    name = "custom"
+
+    @abstractmethod
+    def select(self, plan: TrimPlan, budget: int) -> List[ChatMessage]:
+        """Return the conversation to send, oldest first.
+
+        Strategies may return messages that are not part of ``plan`` (for
+        example summaries); those are counted when metrics are computed.
+        """
+        ...
+
+
+class SlidingWindowStrategy(TrimStrategy):
+    """Keep forced units plus the most recent units that fit the budget."""
+
+    name = "sliding_window"
+
+    def select(self, plan: TrimPlan, budget: int) -> List[ChatMessage]:
+        start = plan.window_start(budget)
+        return [
+            message
+            for index, unit in enumerate(plan.units)
+            if plan.is_kept(index, start)
+            for message in unit
+        ]
+
+
+def _build_trim_plan(
+    conversation: _MessageSeq,
+    *,
+    min_turns: int,
+    priority_role_set: Set[str],
+    tokens: Dict[int, int],
+    counter: _TokenCounter,
+) -> TrimPlan:
+    turns = _group_conversation_turns(conversation)
+    latest_turn = turns[-1] if turns else []
+    required_turns = max(0, min_turns)
+
+    units: List[_MessageList]
+    if required_turns > 0:
+        units = turns
+        first_required = len(turns) - required_turns
+        forced = [
+            index >= first_required
+            or any(message.get("role") in priority_role_set for message in turn)
+            for index, turn in enumerate(turns)
+        ]
+    else:
+        latest_ids = {id(message) for message in latest_turn}
+        units = [[message] for message in conversation]
+        forced = [
+            id(message) in latest_ids or message.get("role") in priority_role_set
+            for message in conversation
+        ]
+    unit_tokens = [sum(tokens[id(message)] for message in unit) for unit in units]
+    return TrimPlan(units=units, unit_tokens=unit_tokens, forced=forced, counter=counter)
+
+
 def trim_messages(
     messages: Sequence[ChatMessage],
     target_tokens: int,
@@ -133,8 +396,23 @@ def trim_messages(
     *,
     min_turns: int = 0,
     priority_roles: Iterable[str] | None = None,
+    token_cache: Optional[TokenCountCache] = None,
+    strategy: Optional[TrimStrategy] = None,
 ) -> Tuple[List[ChatMessage], TrimMetrics]:
-    counter = _TokenCounter(model)
+    counter = _TokenCounter(model, cache=token_cache)
+    hits_before = token_cache.hits if token_cache is not None else 0
+    misses_before = token_cache.misses if token_cache is not None else 0
+    counts = counter.count_many([str(message.get("content", "")) for message in messages])
+    message_tokens: Dict[int, int] = {
+        id(message): tokens for message, tokens in zip(messages, counts)
+    }
+
+    def _tokens(message: ChatMessage) -> int:
+        cached = message_tokens.get(id(message))
+        if cached is None:
+            cached = counter.count(str(message.get("content", "")))
+        return cached
+
     priority_role_set: Set[str] = set(priority_roles or ())
     system_messages = [m for m in messages if m.get("role") == "system"]
     kept_system_messages: List[ChatMessage] = []
@@ -143,73 +421,34 @@ def trim_messages(
             kept_system_messages.append(message)
     conversation = [m for m in messages if m.get("role") != "system"]
     base_budget = max(256, target_tokens)
-    system_tokens = sum(
-        counter.count(str(message.get("content", ""))) for message in kept_system_messages
-    )
+    system_tokens = sum(_tokens(message) for message in kept_system_messages)
     budget = max(0, base_budget - system_tokens)
-    required_turns = max(0, min_turns)
 
-    turns = _group_conversation_turns(conversation)
-    latest_turn = turns[-1] if turns else []
-
-    if required_turns > 0:
-        kept_turns: List[_MessageList] = []
-        total = 0
-        turns_kept = 0
-        for turn in reversed(turns):
-            turn_tokens = sum(
-                counter.count(str(message.get("content", ""))) for message in turn
-            )
-            is_latest_turn = turn is latest_turn
-            has_priority = any(message.get("role") in priority_role_set for message in turn)
-            if (
-                not is_latest_turn
-                and total + turn_tokens > budget
-                and turns_kept >= required_turns
-                and not has_priority
-            ):
-                continue
-            kept_turns.append(turn)
-            total += turn_tokens
-            turns_kept += 1
-        if latest_turn and all(turn is not latest_turn for turn in kept_turns):
-            kept_turns.append(latest_turn)
-        kept = [message for turn in reversed(kept_turns) for message in turn]
-    else:
-        forced_ids = {id(message) for message in latest_turn}
-        if priority_role_set:
-            forced_ids.update(
-                id(message)
-                for message in conversation
-                if message.get("role") in priority_role_set
-            )
-        kept = []
-        total = 0
-        for message in reversed(conversation):
-            tokens = counter.count(str(message.get("content", "")))
-            should_force = id(message) in forced_ids
-            if not should_force and total + tokens > budget:
-                if forced_ids:
-                    continue
-                break
-            kept.append(message)
-            total += tokens
-            if should_force:
-                forced_ids.discard(id(message))
-        kept.reverse()
+    plan = _build_trim_plan(
+        conversation,
+        min_turns=min_turns,
+        priority_role_set=priority_role_set,
+        tokens=message_tokens,
+        counter=counter,
+    )
+    active_strategy = strategy if strategy is not None else SlidingWindowStrategy()
+    kept = active_strategy.select(plan, budget)
+    kept_tokens = sum(_tokens(message) for message in kept)
 
     output_messages = kept_system_messages + kept
 
-    original_tokens = sum(counter.count(str(m.get("content", ""))) for m in messages)
-    trimmed_tokens = sum(
-        counter.count(str(m.get("content", ""))) for m in output_messages
-    )
+    original_tokens = sum(counts)
+    trimmed_tokens = system_tokens + kept_tokens
     ratio = trimmed_tokens / max(1, original_tokens)
     metrics: TrimMetrics = {
         "input_tokens": original_tokens,
         "output_tokens": trimmed_tokens,
         "compress_ratio": round(ratio, 3),
         "token_counter": counter.describe(),
+        "strategy": active_strategy.name,
         "semantic_retention": None,
     }
+    if token_cache is not None:
+        metrics["token_cache_hits"] = token_cache.hits - hits_before
+        metrics["token_cache_misses"] = token_cache.misses - misses_before
     return output_messages, metrics
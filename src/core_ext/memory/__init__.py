@@ -1,8 +1,11 @@
 # Memory persistence layer for Katamari
 
 from .storage import (
+    BatchEmbedFunc,
+    ConversationCursor,
     ConversationMessage,
     ConversationMetadata,
+    ConversationPage,
     EmbeddingRecord,
     EmbeddingStore,
     FatalStorageError,
@@ -13,19 +16,61 @@ from .storage import (
     RetryableStorageError,
     StorageError,
 )
+from .codec import (
+    CODEC_VERSION,
+    decode_record,
+    encode_record,
+    read_records,
+    write_records,
+)
+from .compact import CompactConversation, CompactEmbedding, CompactMessage
 from .inmemory import (
     InMemoryEmbeddingStore,
     InMemoryMessageStore,
     InMemoryMetadataStore,
     create_in_memory_store,
 )
+from .numpy_store import NumpyEmbeddingStore
+from .ivf_store import IVFEmbeddingStore
+from .mmap_store import MmapEmbeddingStore
+from .sqlite_store import (
+    SQLiteDatabase,
+    SQLiteEmbeddingStore,
+    SQLiteMemoryStore,
+    SQLiteMessageStore,
+    SQLiteMetadataStore,
+    create_sqlite_store,
+)
+from .postgres_store import (
+    PostgresDatabase,
+    PostgresEmbeddingStore,
+    PostgresMemoryStore,
+    PostgresMessageStore,
+    PostgresMetadataStore,
+    close_postgres_databases,
+    create_postgres_store,
+    get_postgres_database,
+)
+from .cache import CachedMemoryStore
+from .factory import create_memory_store
+from .sweeper import RetentionSweeper, SweepResult, create_retention_sweeper
+from .write_behind import WriteBehindBuffer, create_write_behind_buffer
 
 __all__ = [
+    "CODEC_VERSION",
+    "BatchEmbedFunc",
+    "CachedMemoryStore",
+    "CompactConversation",
+    "CompactEmbedding",
+    "CompactMessage",
+    "ConversationCursor",
     "ConversationMessage",
     "ConversationMetadata",
+    "ConversationPage",
     "EmbeddingRecord",
     "EmbeddingStore",
     "FatalStorageError",
+    "IVFEmbeddingStore",
     "InMemoryEmbeddingStore",
     "InMemoryMessageStore",
     "InMemoryMetadataStore",
@@ -33,7 +78,33 @@ __all__ = [
     "MessageStore",
     "MetadataStore",
     "MessageType",
+    "MmapEmbeddingStore",
+    "NumpyEmbeddingStore",
+    "PostgresDatabase",
+    "PostgresEmbeddingStore",
+    "PostgresMemoryStore",
+    "PostgresMessageStore",
+    "PostgresMetadataStore",
+    "RetentionSweeper",
     "RetryableStorageError",
+    "SQLiteDatabase",
+    "SQLiteEmbeddingStore",
+    "SQLiteMemoryStore",
+    "SQLiteMessageStore",
+    "SQLiteMetadataStore",
     "StorageError",
+    "SweepResult",
+    "WriteBehindBuffer",
+    "close_postgres_databases",
     "create_in_memory_store",
+    "create_memory_store",
+    "create_postgres_store",
+    "create_retention_sweeper",
+    "create_sqlite_store",
+    "create_write_behind_buffer",
+    "decode_record",
+    "encode_record",
+    "get_postgres_database",
+    "read_records",
+    "write_records",
 ]
\ No newline at end of file
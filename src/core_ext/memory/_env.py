@@ -0,0 +1,33 @@
+"""Environment parsing shared by the memory background tasks."""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import timedelta
+from typing import Optional
+
+_LOGGER = logging.getLogger("katamari.memory")
+
+
+def _ttl_days(name: str) -> Optional[timedelta]:
+    value = (os.getenv(name) or "").strip()
+    if not value:
+        return None
+    try:
+        days = float(value)
+    except ValueError:
+        _LOGGER.warning("ignoring invalid %s=%r", name, value)
+        return None
+    return timedelta(days=days) if days > 0 else None
+
+
+def _env_number(name: str, default: float) -> float:
+    value = (os.getenv(name) or "").strip()
+    if not value:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        return default
+    return number if number > 0 else default
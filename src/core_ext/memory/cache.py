@@ -0,0 +1,235 @@
+"""Read-through LRU cache in front of ``MemoryStore.get_full_conversation``."""
+
+from __future__ import annotations
+
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from .storage import (
+    ConversationCursor,
+    ConversationMessage,
+    ConversationMetadata,
+    ConversationPage,
+    MemoryStore,
+    MessageStore,
+    MetadataStore,
+)
+
+DEFAULT_CACHE_SIZE = 256
+
+_Entry = Tuple[ConversationMetadata, List[ConversationMessage]]
+_T = TypeVar("_T")
+
+
+class CachedMemoryStore(MemoryStore):
+    """Wrap ``inner`` with a size-bounded LRU of full conversations.
+
+    Misses read through ``inner.get_full_conversation`` (metadata and
+    messages fetched concurrently) and only found conversations are kept.
+    ``save_conversation_with_messages`` and ``delete_conversation_full`` on
+    this instance, and every write or delete through its ``metadata`` and
+    ``messages`` stores, invalidate the touched conversations; a read that
+    raced with such a write is returned but not cached. Writes made directly
+    on ``inner`` or its stores are not seen, so call :meth:`invalidate` after
+    them. Hits return a fresh list of the cached messages; the records
+    themselves are shared.
+    """
+
+    def __init__(self, inner: MemoryStore, *, max_entries: int = DEFAULT_CACHE_SIZE) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        super().__init__(
+            _InvalidatingMetadataStore(inner.metadata, self),
+            _InvalidatingMessageStore(inner.messages, self),
+            inner.embeddings,
+        )
+        self._inner = inner
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # conversation id -> [reads in flight, invalidations seen meanwhile]
+        self._reads: Dict[str, List[int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def inner(self) -> MemoryStore:
+        return self._inner
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, conversation_id: str) -> None:
+        """Drop ``conversation_id`` and discard any read of it still in flight."""
+        self._entries.pop(conversation_id, None)
+        reads = self._reads.get(conversation_id)
+        if reads is not None:
+            reads[1] += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        for reads in self._reads.values():
+            reads[1] += 1
+
+    async def _invalidating(self, conversation_ids: Iterable[str], write: Awaitable[_T]) -> _T:
+        """Await ``write`` with ``conversation_ids`` invalidated before and after."""
+        ids = set(conversation_ids)
+        for conversation_id in ids:
+            self.invalidate(conversation_id)
+        try:
+            return await write
+        finally:
+            for conversation_id in ids:
+                self.invalidate(conversation_id)
+
+    async def get_full_conversation(
+        self, conversation_id: str
+    ) -> Optional[tuple[ConversationMetadata, List[ConversationMessage]]]:
+        cached = self._entries.get(conversation_id)
+        if cached is not None:
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return cached[0], list(cached[1])
+        self.misses += 1
+        reads = self._reads.setdefault(conversation_id, [0, 0])
+        reads[0] += 1
+        generation = reads[1]
+        try:
+            result = await self._inner.get_full_conversation(conversation_id)
+        finally:
+            reads[0] -= 1
+            if reads[0] == 0:
+                del self._reads[conversation_id]
+        if result is None or reads[1] != generation:
+            return result
+        metadata, messages = result
+        self._entries[conversation_id] = (metadata, list(messages))
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return metadata, messages
+
+    async def save_conversation_with_messages(
+        self,
+        conversation: ConversationMetadata,
+        messages: List[ConversationMessage],
+    ) -> None:
+        await self._invalidating(
+            [conversation.id, *(m.conversation_id for m in messages)],
+            self._inner.save_conversation_with_messages(conversation, messages),
+        )
+
+    async def delete_conversation_full(self, conversation_id: str) -> bool:
+        return await self._invalidating(
+            [conversation_id], self._inner.delete_conversation_full(conversation_id)
+        )
+
+
+class _InvalidatingMetadataStore(MetadataStore):
+    """Forward to ``inner``, invalidating ``cache`` on every write or delete."""
+
+    def __init__(self, inner: MetadataStore, cache: CachedMemoryStore) -> None:
+        self._inner = inner
+        self._cache = cache
+
+    async def save_conversation(self, conversation: ConversationMetadata) -> None:
+        await self._cache._invalidating(
+            [conversation.id], self._inner.save_conversation(conversation)
+        )
+
+    async def get_conversation(self, conversation_id: str) -> Optional[ConversationMetadata]:
+        return await self._inner.get_conversation(conversation_id)
+
+    async def list_conversations(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[ConversationMetadata]:
+        return await self._inner.list_conversations(user_id, limit, offset)
+
+    async def list_conversations_page(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[ConversationCursor] = None,
+    ) -> ConversationPage:
+        return await self._inner.list_conversations_page(user_id, limit, after)
+
+    async def list_conversation_ids_before(
+        self, cutoff: datetime, limit: int = 100
+    ) -> List[str]:
+        return await self._inner.list_conversation_ids_before(cutoff, limit)
+
+    async def delete_conversation(self, conversation_id: str) -> bool:
+        return await self._cache._invalidating(
+            [conversation_id], self._inner.delete_conversation(conversation_id)
+        )
+
+
+class _InvalidatingMessageStore(MessageStore):
+    """Forward to ``inner``, invalidating ``cache`` on every write or delete."""
+
+    def __init__(self, inner: MessageStore, cache: CachedMemoryStore) -> None:
+        self._inner = inner
+        self._cache = cache
+
+    async def save_message(self, message: ConversationMessage) -> None:
+        await self._cache._invalidating(
+            [message.conversation_id], self._inner.save_message(message)
+        )
+
+    async def save_messages(self, messages: Sequence[ConversationMessage]) -> None:
+        await self._cache._invalidating(
+            [message.conversation_id for message in messages],
+            self._inner.save_messages(messages),
+        )
+
+    async def get_messages(self, conversation_id: str) -> List[ConversationMessage]:
+        return await self._inner.get_messages(conversation_id)
+
+    async def get_recent_messages(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[str] = None,
+    ) -> List[ConversationMessage]:
+        return await self._inner.get_recent_messages(conversation_id, limit, before)
+
+    async def iter_messages(
+        self,
+        conversation_id: str,
+        *,
+        batch_size: int = 100,
+        newest_first: bool = False,
+    ) -> AsyncIterator[ConversationMessage]:
+        async for message in self._inner.iter_messages(
+            conversation_id, batch_size=batch_size, newest_first=newest_first
+        ):
+            yield message
+
+    async def delete_messages(self, conversation_id: str) -> int:
+        return await self._cache._invalidating(
+            [conversation_id], self._inner.delete_messages(conversation_id)
+        )
+
+
+def cache_size_from_env() -> int:
+    """``MEMORY_CACHE_SIZE`` as an entry count; 0 (default) disables caching."""
+    try:
+        return max(0, int((os.getenv("MEMORY_CACHE_SIZE") or "0").strip()))
+    except ValueError:
+        return 0
@@ -0,0 +1,338 @@
+"""Versioned binary codec for memory records.
+
+A record is ``KR`` + a format version byte + a record kind byte, a fixed
+block of little-endian fields, then the UTF-8 text fields back to back.
+The fixed block holds timestamps (``int64`` microseconds since the Unix
+epoch and a UTC-aware flag), numbers, and one ``uint32`` byte length per
+text field (``0xFFFFFFFF`` for ``None``), so decoding is one ``unpack``
+plus slicing. ``metadata`` travels as compact JSON text and embeddings as
+raw little-endian float32 values after the text. Aware timestamps come
+back as UTC. ``write_records``/``read_records`` frame a stream of records
+with a ``uint32`` length each for export files.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+
+from .storage import (
+    ConversationMessage,
+    ConversationMetadata,
+    EmbeddingRecord,
+    FatalStorageError,
+    MessageType,
+)
+
+MAGIC = b"KR"
+CODEC_VERSION = 1
+
+KIND_MESSAGE = 1
+KIND_CONVERSATION = 2
+KIND_EMBEDDING = 3
+
+Record = Union[ConversationMessage, ConversationMetadata, EmbeddingRecord]
+
+_HEADER = struct.Struct("<2sBB")
+_LENGTH = struct.Struct("<I")
+# Fixed fields per kind: (int64 micros, uint8 aware) per timestamp, then
+# numbers, then one uint32 byte length per text field.
+_MESSAGE_FIELDS = struct.Struct("<qB5I")
+_CONVERSATION_FIELDS = struct.Struct("<qBqBqdBd6I")
+_EMBEDDING_FIELDS = struct.Struct("<qB4II")
+_NONE = 0xFFFFFFFF
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_FLOAT32 = np.dtype("<f4")
+_ROLES = {role.value: role for role in MessageType}
+
+
+def encode_vector(embedding: Sequence[float]) -> bytes:
+    """Raw little-endian float32 bytes for ``embedding``."""
+    return np.asarray(embedding, dtype=_FLOAT32).tobytes()
+
+
+def decode_vector(blob: bytes | memoryview) -> List[float]:
+    """Inverse of :func:`encode_vector`."""
+    values: List[float] = np.frombuffer(blob, dtype=_FLOAT32).tolist()
+    return values
+
+
+def _check_header(data: bytes | memoryview, kind: int) -> bytes:
+    buffer = bytes(data)
+    if len(buffer) < _HEADER.size:
+        raise FatalStorageError("truncated memory record")
+    magic, version, found = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise FatalStorageError("not a binary memory record")
+    if version != CODEC_VERSION:
+        raise FatalStorageError(f"unsupported memory record version {version}")
+    if found != kind:
+        raise FatalStorageError(f"expected record kind {kind}, found {found}")
+    return buffer
+
+
+def _timestamp_fields(value: datetime) -> Tuple[int, int]:
+    if value.tzinfo is None:
+        return (value - _EPOCH) // _MICROSECOND, 0
+    return (value - _EPOCH_UTC) // _MICROSECOND, 1
+
+
+def _timestamp(micros: int, aware: int) -> datetime:
+    return (_EPOCH_UTC if aware else _EPOCH) + timedelta(microseconds=micros)
+
+
+def _metadata_text(value: Dict[str, Any]) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")) if value else ""
+
+
+def _metadata(text: Optional[str]) -> Dict[str, Any]:
+    if not text:
+        return {}
+    value = json.loads(text)
+    if not isinstance(value, dict):
+        raise ValueError("metadata is not an object")
+    return value
+
+
+def _encode_texts(values: Sequence[Optional[str]]) -> Tuple[List[int], bytes]:
+    lengths: List[int] = []
+    chunks: List[bytes] = []
+    for value in values:
+        if value is None:
+            lengths.append(_NONE)
+            continue
+        data = value.encode("utf-8")
+        lengths.append(len(data))
+        chunks.append(data)
+    return lengths, b"".join(chunks)
+
+
+def _decode_texts(
+    buffer: bytes, offset: int, lengths: Sequence[int], tail: int = 0
+) -> List[Optional[str]]:
+    values: List[Optional[str]] = []
+    for length in lengths:
+        if length == _NONE:
+            values.append(None)
+            continue
+        end = offset + length
+        values.append(buffer[offset:end].decode())
+        offset = end
+    if offset + tail > len(buffer):
+        raise FatalStorageError("truncated memory record")
+    if offset + tail < len(buffer):
+        raise FatalStorageError("trailing bytes after memory record")
+    return values
+
+
+def _required(value: Optional[str]) -> str:
+    if value is None:
+        raise FatalStorageError("missing required text field")
+    return value
+
+
+def encode_message(message: ConversationMessage) -> bytes:
+    lengths, texts = _encode_texts(
+        (
+            message.id,
+            message.conversation_id,
+            message.role.value,
+            message.content,
+            _metadata_text(message.metadata),
+        )
+    )
+    return (
+        _HEADER.pack(MAGIC, CODEC_VERSION, KIND_MESSAGE)
+        + _MESSAGE_FIELDS.pack(*_timestamp_fields(message.created_at), *lengths)
+        + texts
+    )
+
+
+def decode_message(data: bytes | memoryview) -> ConversationMessage:
+    buffer = _check_header(data, KIND_MESSAGE)
+    try:
+        micros, aware, *lengths = _MESSAGE_FIELDS.unpack_from(buffer, _HEADER.size)
+        record_id, conversation_id, role, content, metadata = _decode_texts(
+            buffer, _HEADER.size + _MESSAGE_FIELDS.size, lengths
+        )
+        return ConversationMessage(
+            id=_required(record_id),
+            conversation_id=_required(conversation_id),
+            role=_ROLES[_required(role)],
+            content=_required(content),
+            created_at=_timestamp(micros, aware),
+            metadata=_metadata(metadata),
+        )
+    except (struct.error, OverflowError, KeyError, ValueError) as exc:
+        raise FatalStorageError(f"corrupt message record: {exc!r}") from exc
+
+
+def encode_conversation(conversation: ConversationMetadata) -> bytes:
+    lengths, texts = _encode_texts(
+        (
+            conversation.id,
+            conversation.user_id,
+            conversation.model,
+            conversation.chain,
+            conversation.persona,
+            _metadata_text(conversation.metadata),
+        )
+    )
+    retention = conversation.semantic_retention
+    return (
+        _HEADER.pack(MAGIC, CODEC_VERSION, KIND_CONVERSATION)
+        + _CONVERSATION_FIELDS.pack(
+            *_timestamp_fields(conversation.created_at),
+            *_timestamp_fields(conversation.updated_at),
+            conversation.token_count,
+            conversation.compress_ratio,
+            retention is not None,
+            0.0 if retention is None else retention,
+            *lengths,
+        )
+        + texts
+    )
+
+
+def decode_conversation(data: bytes | memoryview) -> ConversationMetadata:
+    buffer = _check_header(data, KIND_CONVERSATION)
+    try:
+        (
+            created,
+            created_aware,
+            updated,
+            updated_aware,
+            token_count,
+            compress_ratio,
+            has_retention,
+            retention,
+            *lengths,
+        ) = _CONVERSATION_FIELDS.unpack_from(buffer, _HEADER.size)
+        record_id, user_id, model, chain, persona, metadata = _decode_texts(
+            buffer, _HEADER.size + _CONVERSATION_FIELDS.size, lengths
+        )
+        return ConversationMetadata(
+            id=_required(record_id),
+            user_id=user_id,
+            model=model,
+            chain=chain,
+            persona=persona,
+            created_at=_timestamp(created, created_aware),
+            updated_at=_timestamp(updated, updated_aware),
+            token_count=token_count,
+            compress_ratio=compress_ratio,
+            semantic_retention=retention if has_retention else None,
+            metadata=_metadata(metadata),
+        )
+    except (struct.error, OverflowError, ValueError) as exc:
+        raise FatalStorageError(f"corrupt conversation record: {exc}") from exc
+
+
+def encode_embedding(record: EmbeddingRecord) -> bytes:
+    lengths, texts = _encode_texts(
+        (record.id, record.message_id, record.conversation_id, record.model)
+    )
+    vector = encode_vector(record.embedding)
+    return (
+        _HEADER.pack(MAGIC, CODEC_VERSION, KIND_EMBEDDING)
+        + _EMBEDDING_FIELDS.pack(
+            *_timestamp_fields(record.created_at),
+            *lengths,
+            len(vector) // _FLOAT32.itemsize,
+        )
+        + texts
+        + vector
+    )
+
+
+def decode_embedding(data: bytes | memoryview) -> EmbeddingRecord:
+    buffer = _check_header(data, KIND_EMBEDDING)
+    try:
+        micros, aware, *lengths, dimension = _EMBEDDING_FIELDS.unpack_from(buffer, _HEADER.size)
+        vector_size = dimension * _FLOAT32.itemsize
+        record_id, message_id, conversation_id, model = _decode_texts(
+            buffer, _HEADER.size + _EMBEDDING_FIELDS.size, lengths, vector_size
+        )
+        return EmbeddingRecord(
+            id=_required(record_id),
+            message_id=_required(message_id),
+            conversation_id=_required(conversation_id),
+            embedding=decode_vector(memoryview(buffer)[len(buffer) - vector_size :]),
+            model=_required(model),
+            created_at=_timestamp(micros, aware),
+        )
+    except (struct.error, OverflowError, ValueError) as exc:
+        raise FatalStorageError(f"corrupt embedding record: {exc}") from exc
+
+
+_DECODERS: Dict[int, Callable[[memoryview], Record]] = {
+    KIND_MESSAGE: decode_message,
+    KIND_CONVERSATION: decode_conversation,
+    KIND_EMBEDDING: decode_embedding,
+}
+
+
+def encode_record(record: Record) -> bytes:
+    """Encode any of the three record types."""
+    if isinstance(record, ConversationMessage):
+        return encode_message(record)
+    if isinstance(record, ConversationMetadata):
+        return encode_conversation(record)
+    if isinstance(record, EmbeddingRecord):
+        return encode_embedding(record)
+    raise TypeError(f"cannot encode {type(record).__name__}")
+
+
+def decode_record(data: bytes | memoryview) -> Record:
+    """Decode a record of any kind, dispatching on its header."""
+    view = memoryview(data)
+    if len(view) < _HEADER.size:
+        raise FatalStorageError("truncated memory record")
+    decoder = _DECODERS.get(view[_HEADER.size - 1])
+    if decoder is None:
+        raise FatalStorageError(f"unknown memory record kind {view[_HEADER.size - 1]}")
+    return decoder(view)
+
+
+def write_records(stream: BinaryIO, records: Iterable[Record]) -> int:
+    """Write length-prefixed records to ``stream``; returns how many were written."""
+    count = 0
+    for record in records:
+        payload = encode_record(record)
+        stream.write(_LENGTH.pack(len(payload)))
+        stream.write(payload)
+        count += 1
+    return count
+
+
+def read_records(stream: BinaryIO) -> Iterator[Record]:
+    """Yield the records written by :func:`write_records`."""
+    while True:
+        prefix = stream.read(_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) != _LENGTH.size:
+            raise FatalStorageError("truncated record stream")
+        (length,) = _LENGTH.unpack(prefix)
+        payload = stream.read(length)
+        if len(payload) != length:
+            raise FatalStorageError("truncated record stream")
+        yield decode_record(payload)
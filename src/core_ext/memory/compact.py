@@ -0,0 +1,238 @@
+"""Slotted, memory-compact variants of the memory record types.
+
+The ``storage`` dataclasses carry a ``__dict__`` per instance, two
+``datetime`` objects, an always-allocated ``metadata`` dict and embeddings
+as Python float lists. The variants here keep the same fields in
+``__slots__``, timestamps as epoch seconds, empty metadata as ``None``,
+interned conversation ids and embeddings as ``array('f')``. Their
+``to_dict`` output matches the full types, so either side can read it.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import numpy.typing as npt
+
+from .storage import ConversationMessage, ConversationMetadata, EmbeddingRecord, MessageType
+
+
+def to_epoch(value: datetime) -> float:
+    """Epoch seconds for ``value``; naive datetimes are taken as UTC like ``utcnow``."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def from_epoch(value: float) -> datetime:
+    """Naive UTC datetime for ``value``, matching the ``storage`` defaults."""
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+
+def _isoformat(value: float) -> str:
+    return from_epoch(value).isoformat()
+
+
+def _float32_array(values: Sequence[float]) -> array[float]:
+    if isinstance(values, array) and values.typecode == "f":
+        return values
+    if isinstance(values, np.ndarray):
+        return array("f", np.asarray(values, dtype=np.float32).tobytes())
+    return array("f", values)
+
+
+@dataclass(slots=True)
+class CompactMessage:
+    """Slotted :class:`ConversationMessage` with an epoch ``created_at``."""
+
+    id: str
+    conversation_id: str
+    role: MessageType
+    content: str
+    created_at: float
+    metadata: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_message(cls, message: ConversationMessage) -> "CompactMessage":
+        return cls(
+            message.id,
+            sys.intern(message.conversation_id),
+            message.role,
+            message.content,
+            to_epoch(message.created_at),
+            message.metadata or None,
+        )
+
+    def to_message(self) -> ConversationMessage:
+        return ConversationMessage(
+            id=self.id,
+            conversation_id=self.conversation_id,
+            role=self.role,
+            content=self.content,
+            created_at=from_epoch(self.created_at),
+            metadata=self.metadata if self.metadata is not None else {},
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "conversation_id": self.conversation_id,
+            "role": self.role.value,
+            "content": self.content,
+            "created_at": _isoformat(self.created_at),
+            "metadata": self.metadata if self.metadata is not None else {},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactMessage":
+        return cls(
+            data["id"],
+            sys.intern(data["conversation_id"]),
+            MessageType(data["role"]),
+            data["content"],
+            to_epoch(datetime.fromisoformat(data["created_at"])),
+            data.get("metadata") or None,
+        )
+
+
+@dataclass(slots=True)
+class CompactConversation:
+    """Slotted :class:`ConversationMetadata` with epoch timestamps."""
+
+    id: str
+    user_id: Optional[str]
+    model: Optional[str]
+    chain: Optional[str]
+    persona: Optional[str]
+    created_at: float
+    updated_at: float
+    token_count: int = 0
+    compress_ratio: float = 1.0
+    semantic_retention: Optional[float] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_metadata(cls, conversation: ConversationMetadata) -> "CompactConversation":
+        return cls(
+            conversation.id,
+            conversation.user_id,
+            conversation.model,
+            conversation.chain,
+            conversation.persona,
+            to_epoch(conversation.created_at),
+            to_epoch(conversation.updated_at),
+            conversation.token_count,
+            conversation.compress_ratio,
+            conversation.semantic_retention,
+            conversation.metadata or None,
+        )
+
+    def to_metadata(self) -> ConversationMetadata:
+        return ConversationMetadata(
+            id=self.id,
+            user_id=self.user_id,
+            model=self.model,
+            chain=self.chain,
+            persona=self.persona,
+            created_at=from_epoch(self.created_at),
+            updated_at=from_epoch(self.updated_at),
+            token_count=self.token_count,
+            compress_ratio=self.compress_ratio,
+            semantic_retention=self.semantic_retention,
+            metadata=self.metadata if self.metadata is not None else {},
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "model": self.model,
+            "chain": self.chain,
+            "persona": self.persona,
+            "created_at": _isoformat(self.created_at),
+            "updated_at": _isoformat(self.updated_at),
+            "token_count": self.token_count,
+            "compress_ratio": self.compress_ratio,
+            "semantic_retention": self.semantic_retention,
+            "metadata": self.metadata if self.metadata is not None else {},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactConversation":
+        return cls(
+            data["id"],
+            data.get("user_id"),
+            data.get("model"),
+            data.get("chain"),
+            data.get("persona"),
+            to_epoch(datetime.fromisoformat(data["created_at"])),
+            to_epoch(datetime.fromisoformat(data["updated_at"])),
+            data.get("token_count", 0),
+            data.get("compress_ratio", 1.0),
+            data.get("semantic_retention"),
+            data.get("metadata") or None,
+        )
+
+
+@dataclass(slots=True)
+class CompactEmbedding:
+    """Slotted :class:`EmbeddingRecord` holding its vector as ``array('f')``."""
+
+    id: str
+    message_id: str
+    conversation_id: str
+    embedding: array[float]
+    model: str
+    created_at: float
+
+    @property
+    def vector(self) -> npt.NDArray[np.float32]:
+        """Zero-copy float32 NumPy view of ``embedding``."""
+        return np.frombuffer(self.embedding, dtype=np.float32)
+
+    @classmethod
+    def from_record(cls, record: EmbeddingRecord) -> "CompactEmbedding":
+        return cls(
+            record.id,
+            record.message_id,
+            sys.intern(record.conversation_id),
+            _float32_array(record.embedding),
+            sys.intern(record.model),
+            to_epoch(record.created_at),
+        )
+
+    def to_record(self) -> EmbeddingRecord:
+        return EmbeddingRecord(
+            id=self.id,
+            message_id=self.message_id,
+            conversation_id=self.conversation_id,
+            embedding=self.embedding.tolist(),
+            model=self.model,
+            created_at=from_epoch(self.created_at),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "message_id": self.message_id,
+            "conversation_id": self.conversation_id,
+            "embedding": self.embedding.tolist(),
+            "model": self.model,
+            "created_at": _isoformat(self.created_at),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompactEmbedding":
+        return cls(
+            data["id"],
+            data["message_id"],
+            sys.intern(data["conversation_id"]),
+            _float32_array(data["embedding"]),
+            sys.intern(data["model"]),
+            to_epoch(datetime.fromisoformat(data["created_at"])),
+        )
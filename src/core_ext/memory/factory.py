@@ -0,0 +1,37 @@
+"""Select a memory storage backend from configuration."""
+
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from .cache import CachedMemoryStore, cache_size_from_env
+from .inmemory import create_in_memory_store
+from .postgres_store import create_postgres_store
+from .sqlite_store import DEFAULT_SQLITE_PATH, create_sqlite_store
+from .storage import MemoryStore
+
+
+def create_memory_store(backend: Optional[str] = None) -> MemoryStore:
+    """Create the MemoryStore named by ``backend`` or ``MEMORY_STORAGE_BACKEND``.
+
+    ``memory`` (default) keeps everything in process; ``sqlite`` persists to
+    ``MEMORY_SQLITE_PATH``; ``postgres`` uses the shared asyncpg pool for
+    ``MEMORY_POSTGRES_DSN`` or the ``MEMORY_POSTGRES_*`` connection settings.
+    A positive ``MEMORY_CACHE_SIZE`` wraps the store in a
+    :class:`CachedMemoryStore` holding that many conversations.
+    """
+    store = _create_backend(backend)
+    cache_size = cache_size_from_env()
+    return CachedMemoryStore(store, max_entries=cache_size) if cache_size else store
+
+
+def _create_backend(backend: Optional[str]) -> MemoryStore:
+    name = (backend or os.getenv("MEMORY_STORAGE_BACKEND") or "memory").strip().lower()
+    if name == "memory":
+        return create_in_memory_store()
+    if name == "sqlite":
+        return create_sqlite_store(os.getenv("MEMORY_SQLITE_PATH") or DEFAULT_SQLITE_PATH)
+    if name in {"postgres", "postgresql"}:
+        return create_postgres_store()
+    raise ValueError(f"Unsupported MEMORY_STORAGE_BACKEND: {name}")
@@ -2,29 +2,70 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 from .storage import (
+    ConversationCursor,
     ConversationMessage,
     ConversationMetadata,
+    ConversationPage,
     EmbeddingRecord,
     EmbeddingStore,
     MessageStore,
     MetadataStore,
+    build_conversation_page,
 )
 
 if TYPE_CHECKING:
     from .storage import MemoryStore
 
 
+_SortKey = Tuple[datetime, str]
+
+
+def _discard_key(keys: List[_SortKey], key: _SortKey) -> None:
+    index = bisect_left(keys, key)
+    if index < len(keys) and keys[index] == key:
+        del keys[index]
+
+
 class InMemoryMetadataStore(MetadataStore):
-    """In-memory implementation of metadata storage."""
+    """In-memory implementation of metadata storage.
+
+    Besides the id map it keeps ``(updated_at, id)`` keys in sorted lists,
+    one overall and one per user, so keyset pages are a bisect plus a slice.
+    """
 
     def __init__(self) -> None:
         self._store: Dict[str, ConversationMetadata] = {}
+        self._indexed: Dict[str, Tuple[Optional[str], _SortKey]] = {}
+        self._all_keys: List[_SortKey] = []
+        self._user_keys: Dict[str, List[_SortKey]] = {}
+
+    def _unindex(self, conversation_id: str) -> None:
+        indexed = self._indexed.pop(conversation_id, None)
+        if indexed is None:
+            return
+        user_id, key = indexed
+        _discard_key(self._all_keys, key)
+        if user_id:
+            keys = self._user_keys.get(user_id)
+            if keys is not None:
+                _discard_key(keys, key)
+                if not keys:
+                    del self._user_keys[user_id]
 
     async def save_conversation(self, conversation: ConversationMetadata) -> None:
+        self._unindex(conversation.id)
         self._store[conversation.id] = conversation
+        key = (conversation.updated_at, conversation.id)
+        self._indexed[conversation.id] = (conversation.user_id, key)
+        insort(self._all_keys, key)
+        if conversation.user_id:
+            insort(self._user_keys.setdefault(conversation.user_id, []), key)
 
     async def get_conversation(self, conversation_id: str) -> Optional[ConversationMetadata]:
         return self._store.get(conversation_id)
@@ -40,9 +81,36 @@ class InMemoryMetadataStore(MetadataStore):
             conversations = [c for c in conversations if c.user_id == user_id]
         return conversations[offset : offset + limit]
 
+    async def list_conversations_page(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[ConversationCursor] = None,
+    ) -> ConversationPage:
+        if limit <= 0:
+            return ConversationPage(conversations=[])
+        keys = self._user_keys.get(user_id, []) if user_id else self._all_keys
+        end = len(keys) if after is None else bisect_left(keys, after.key)
+        # One extra key lets build_conversation_page tell whether more remain.
+        start = max(0, end - limit - 1)
+        return build_conversation_page(
+            (self._store[conversation_id] for _, conversation_id in reversed(keys[start:end])),
+            limit,
+        )
+
+    async def list_conversation_ids_before(
+        self, cutoff: datetime, limit: int = 100
+    ) -> List[str]:
+        if limit <= 0:
+            return []
+        # Ids are never empty, so (cutoff, "") sorts before every key at cutoff.
+        end = min(bisect_left(self._all_keys, (cutoff, "")), limit)
+        return [conversation_id for _, conversation_id in self._all_keys[:end]]
+
     async def delete_conversation(self, conversation_id: str) -> bool:
         if conversation_id in self._store:
             del self._store[conversation_id]
+            self._unindex(conversation_id)
             return True
         return False
 
@@ -52,20 +120,60 @@ class InMemoryMessageStore(MessageStore):
 
     def __init__(self) -> None:
         self._store: Dict[str, List[ConversationMessage]] = {}
+        # Message id -> index in its conversation list, for ``before`` lookups.
+        self._positions: Dict[str, int] = {}
 
     async def save_message(self, message: ConversationMessage) -> None:
         if message.conversation_id not in self._store:
             self._store[message.conversation_id] = []
-        self._store[message.conversation_id].append(message)
+        messages = self._store[message.conversation_id]
+        self._positions[message.id] = len(messages)
+        messages.append(message)
+
+    async def save_messages(self, messages: Sequence[ConversationMessage]) -> None:
+        for message in messages:
+            stored = self._store.setdefault(message.conversation_id, [])
+            self._positions[message.id] = len(stored)
+            stored.append(message)
 
     async def get_messages(self, conversation_id: str) -> List[ConversationMessage]:
-        return self._store.get(conversation_id, [])
+        return list(self._store.get(conversation_id, []))
+
+    async def get_recent_messages(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[str] = None,
+    ) -> List[ConversationMessage]:
+        messages = self._store.get(conversation_id)
+        if not messages or limit <= 0:
+            return []
+        end = len(messages)
+        if before is not None:
+            position = self._positions.get(before)
+            if position is None or position >= end or messages[position].id != before:
+                return []
+            end = position
+        return messages[max(0, end - limit) : end]
+
+    async def iter_messages(
+        self,
+        conversation_id: str,
+        *,
+        batch_size: int = 100,
+        newest_first: bool = False,
+    ) -> AsyncIterator[ConversationMessage]:
+        messages = self._store.get(conversation_id, [])
+        count = len(messages)
+        indices = range(count - 1, -1, -1) if newest_first else range(count)
+        for index in indices:
+            yield messages[index]
 
     async def delete_messages(self, conversation_id: str) -> int:
-        count = len(self._store.get(conversation_id, []))
-        if conversation_id in self._store:
-            del self._store[conversation_id]
-        return count
+        messages = self._store.pop(conversation_id, [])
+        for message in messages:
+            self._positions.pop(message.id, None)
+        return len(messages)
 
 
 class InMemoryEmbeddingStore(EmbeddingStore):
@@ -118,6 +226,24 @@ class InMemoryEmbeddingStore(EmbeddingStore):
             del self._by_conversation[conversation_id]
         return len(records)
 
+    async def delete_embeddings_before(self, cutoff: datetime, limit: int = 100) -> int:
+        if limit <= 0:
+            return 0
+        expired = heapq.nsmallest(
+            limit,
+            (record for record in self._by_message.values() if record.created_at < cutoff),
+            key=lambda record: record.created_at,
+        )
+        for record in expired:
+            del self._by_message[record.message_id]
+            records = self._by_conversation.get(record.conversation_id)
+            if records is None:
+                continue
+            records[:] = [r for r in records if r.message_id != record.message_id]
+            if not records:
+                del self._by_conversation[record.conversation_id]
+        return len(expired)
+
 
 def create_in_memory_store() -> MemoryStore:
     """Create an in-memory MemoryStore for testing and development."""
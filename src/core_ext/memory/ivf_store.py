@@ -0,0 +1,256 @@
+"""Approximate nearest-neighbour embedding storage (inverted file index)."""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import numpy.typing as npt
+
+from .codec import read_records, write_records
+from .numpy_store import FloatMatrix, NumpyEmbeddingStore
+from .storage import EmbeddingRecord, FatalStorageError
+
+_FORMAT_VERSION = 1
+
+
+def spherical_kmeans(
+    vectors: FloatMatrix, k: int, *, iterations: int = 10, seed: int = 0
+) -> FloatMatrix:
+    """Cluster unit ``vectors`` by cosine and return unit centroids."""
+
+    count = vectors.shape[0]
+    k = max(1, min(k, count))
+    rng = np.random.default_rng(seed)
+    centroids: FloatMatrix = vectors[rng.choice(count, size=k, replace=False)].copy()
+    for _ in range(max(1, iterations)):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        empty = np.flatnonzero(np.bincount(labels, minlength=k) == 0)
+        if empty.size:
+            sums[empty] = vectors[rng.choice(count, size=empty.size, replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+    return centroids
+
+
+class IVFEmbeddingStore(NumpyEmbeddingStore):
+    """Inverted-file approximate nearest-neighbour store.
+
+    Rows are bucketed under the nearest of ``n_lists`` spherical k-means
+    centroids and a query only scores the ``n_probe`` closest buckets, so
+    raising ``n_probe`` trades latency for recall (``n_probe == n_lists`` is
+    exact). Below ``min_train_size`` vectors the store scans everything; once
+    trained, inserts are assigned incrementally and the centroids are
+    retrained whenever the store has grown ``retrain_growth`` times since the
+    last training.
+    """
+
+    def __init__(
+        self,
+        *,
+        n_lists: int = 64,
+        n_probe: int = 8,
+        min_train_size: Optional[int] = None,
+        retrain_growth: float = 2.0,
+        max_train_samples: int = 50_000,
+        kmeans_iterations: int = 10,
+        seed: int = 0,
+        chunk_size: int = 1024,
+        compact_ratio: float = 0.25,
+    ) -> None:
+        super().__init__(chunk_size=chunk_size, compact_ratio=compact_ratio)
+        if n_lists <= 0:
+            raise ValueError("n_lists must be positive")
+        if retrain_growth <= 1.0:
+            raise ValueError("retrain_growth must be greater than 1")
+        self._n_lists = n_lists
+        self.n_probe = n_probe
+        self._min_train_size = min_train_size if min_train_size is not None else n_lists * 16
+        self._retrain_growth = retrain_growth
+        self._max_train_samples = max(n_lists, max_train_samples)
+        self._kmeans_iterations = kmeans_iterations
+        self._seed = seed
+        self._centroids: Optional[FloatMatrix] = None
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[npt.NDArray[np.intp]]] = []
+        self._trained_size = 0
+
+    @property
+    def n_probe(self) -> int:
+        return self._n_probe
+
+    @n_probe.setter
+    def n_probe(self, value: int) -> None:
+        if value <= 0:
+            raise ValueError("n_probe must be positive")
+        self._n_probe = value
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def _alive_rows(self) -> npt.NDArray[np.intp]:
+        return np.flatnonzero(self._alive[: len(self._records)])
+
+    def train(self) -> None:
+        """Fit centroids on the stored vectors and rebuild every bucket."""
+
+        rows = self._alive_rows()
+        if rows.size == 0:
+            return
+        sample = rows
+        if rows.size > self._max_train_samples:
+            rng = np.random.default_rng(self._seed)
+            sample = rng.choice(rows, size=self._max_train_samples, replace=False)
+        self._centroids = spherical_kmeans(
+            self._matrix[sample],
+            self._n_lists,
+            iterations=self._kmeans_iterations,
+            seed=self._seed,
+        )
+        self._trained_size = int(rows.size)
+        self._reassign(rows)
+
+    def _reassign(self, rows: npt.NDArray[np.intp]) -> None:
+        centroids = self._centroids
+        if centroids is None:
+            return
+        self._lists = [[] for _ in range(centroids.shape[0])]
+        self._list_arrays = [None] * centroids.shape[0]
+        if rows.size == 0:
+            return
+        labels = np.argmax(self._matrix[rows] @ centroids.T, axis=1)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(centroids.shape[0] + 1))
+        for label in range(centroids.shape[0]):
+            members = rows[order[bounds[label] : bounds[label + 1]]]
+            self._lists[label] = [int(row) for row in members]
+
+    def _row_added(self, row: int) -> None:
+        centroids = self._centroids
+        if centroids is None:
+            if len(self) >= self._min_train_size:
+                self.train()
+            return
+        if len(self) >= self._trained_size * self._retrain_growth:
+            self.train()
+            return
+        label = int(np.argmax(centroids @ self._matrix[row]))
+        self._lists[label].append(row)
+        self._list_arrays[label] = None
+
+    def _rows_rebuilt(self) -> None:
+        self._reassign(self._alive_rows())
+
+    def _list_array(self, label: int) -> npt.NDArray[np.intp]:
+        cached = self._list_arrays[label]
+        if cached is None:
+            cached = np.asarray(self._lists[label], dtype=np.intp)
+            self._list_arrays[label] = cached
+        return cached
+
+    def _candidate_rows(self, query: FloatMatrix) -> Optional[npt.NDArray[np.intp]]:
+        centroids = self._centroids
+        if centroids is None:
+            return None
+        lists = centroids.shape[0]
+        if self._n_probe >= lists:
+            return None
+        closeness = centroids @ query
+        probes = np.argpartition(-closeness, self._n_probe - 1)[: self._n_probe]
+        return np.concatenate([self._list_array(int(label)) for label in probes])
+
+    def save(self, path: str | Path) -> None:
+        """Write vectors, records and centroids to ``path`` (``.npz``) atomically.
+
+        Records are a :mod:`.codec` record stream stored as a byte array.
+        """
+
+        self.compact()
+        used = len(self._records)
+        config: Dict[str, Any] = {
+            "version": _FORMAT_VERSION,
+            "n_lists": self._n_lists,
+            "n_probe": self._n_probe,
+            "min_train_size": self._min_train_size,
+            "retrain_growth": self._retrain_growth,
+            "max_train_samples": self._max_train_samples,
+            "kmeans_iterations": self._kmeans_iterations,
+            "seed": self._seed,
+            "trained_size": self._trained_size,
+            "dimension": self._dimension,
+        }
+        records = io.BytesIO()
+        write_records(records, (record for record in self._records if record is not None))
+        centroids = self._centroids
+        target = Path(path)
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "wb") as handle:
+            np.savez(
+                handle,
+                config=np.array(json.dumps(config)),
+                records=np.frombuffer(records.getbuffer(), dtype=np.uint8),
+                matrix=self._matrix[:used],
+                centroids=(
+                    centroids
+                    if centroids is not None
+                    else np.zeros((0, self._dimension or 0), dtype=np.float32)
+                ),
+            )
+        os.replace(tmp, target)
+
+    @classmethod
+    def load(cls, path: str | Path, **overrides: Any) -> "IVFEmbeddingStore":
+        """Restore a store written by :meth:`save` without retraining."""
+
+        with np.load(Path(path), allow_pickle=False) as data:
+            config = json.loads(str(data["config"]))
+            version = config.get("version")
+            if version != _FORMAT_VERSION:
+                raise FatalStorageError(f"unsupported IVF store version {version}")
+            records: List[EmbeddingRecord] = []
+            for record in read_records(io.BytesIO(data["records"].tobytes())):
+                if not isinstance(record, EmbeddingRecord):
+                    raise FatalStorageError("IVF store holds a non-embedding record")
+                records.append(record)
+            matrix = np.array(data["matrix"], dtype=np.float32)
+            centroids = np.array(data["centroids"], dtype=np.float32)
+        options = {
+            key: config[key]
+            for key in (
+                "n_lists",
+                "n_probe",
+                "min_train_size",
+                "retrain_growth",
+                "max_train_samples",
+                "kmeans_iterations",
+                "seed",
+            )
+        }
+        options.update(overrides)
+        store = cls(**options)
+        store._restore(matrix, records, config.get("dimension"))
+        if centroids.shape[0]:
+            store._centroids = centroids
+            store._trained_size = int(config.get("trained_size") or len(records))
+            store._reassign(store._alive_rows())
+        return store
+
+    def _restore(
+        self, matrix: FloatMatrix, records: List[EmbeddingRecord], dimension: Optional[int]
+    ) -> None:
+        self._dimension = dimension
+        self._grow(len(records))
+        self._matrix[: len(records)] = matrix
+        self._alive[: len(records)] = True
+        self._records = list(records)
+        for row, record in enumerate(records):
+            self._row_by_message[record.message_id] = row
+            self._rows_by_conversation.setdefault(record.conversation_id, set()).add(row)
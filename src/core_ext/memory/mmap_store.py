@@ -0,0 +1,472 @@
+"""Memory-mapped float32 embedding storage."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+from .codec import _timestamp, _timestamp_fields, read_records, write_records
+from .storage import EmbeddingRecord, EmbeddingStore, FatalStorageError
+
+_FORMAT_VERSION = 1
+_HEADER = "header.json"
+_VECTORS = "vectors.f32"
+_NORMS = "norms.f32"
+_ALIVE = "alive.u8"
+_INDEX = "index.kr"
+_LOGGER = logging.getLogger("katamari.memory")
+
+# Per-row columns kept in RAM: conversation and model as codes into the
+# store's string tables, created_at as microseconds since the Unix epoch.
+_ROW_DTYPE = np.dtype(
+    [("conversation", "<i4"), ("model", "<i4"), ("created", "<i8"), ("aware", "u1")]
+)
+
+
+class MmapEmbeddingStore(EmbeddingStore):
+    """Embedding store whose vectors live in memory-mapped float32 files.
+
+    ``directory`` holds unit vectors (``vectors.f32``), their original norms,
+    a per-row alive flag and an append-only ``index.kr``: one
+    :mod:`.codec` embedding record without its vector per row, in row
+    order. Deletes only clear the alive flag. Only the index is loaded on
+    open, into a NumPy column block
+    plus one id pair per row, so a restarted worker can search immediately;
+    vector pages are faulted in by the OS instead of being copied onto the
+    Python heap. Searches scan the map in blocks of ``search_block_rows``
+    rows and keep a running top-k. Deleted and replaced rows stay in the
+    files until :meth:`compact` rewrites them, which happens automatically
+    once they exceed ``compact_ratio`` of the used rows.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        chunk_rows: int = 65_536,
+        search_block_rows: int = 65_536,
+        compact_ratio: float = 0.25,
+    ) -> None:
+        if chunk_rows <= 0 or search_block_rows <= 0:
+            raise ValueError("chunk_rows and search_block_rows must be positive")
+        if not 0.0 < compact_ratio <= 1.0:
+            raise ValueError("compact_ratio must be in (0, 1]")
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._chunk_rows = chunk_rows
+        self._block_rows = search_block_rows
+        self._compact_ratio = compact_ratio
+        self._dimension: Optional[int] = None
+        self._capacity = 0
+        self._count = 0
+        self._generation = 0
+        self._vectors: Optional[np.memmap[Any, np.dtype[np.float32]]] = None
+        self._norms: Optional[np.memmap[Any, np.dtype[np.float32]]] = None
+        self._alive: Optional[np.memmap[Any, np.dtype[np.uint8]]] = None
+        self._rows: npt.NDArray[np.void] = np.zeros(0, dtype=_ROW_DTYPE)
+        # (record id, message id) per row; None once the row is dropped.
+        self._ids: List[Optional[Tuple[str, str]]] = []
+        self._conversations: List[str] = []
+        self._conversation_codes: Dict[str, int] = {}
+        self._models: List[str] = []
+        self._model_codes: Dict[str, int] = {}
+        self._row_by_message: Dict[str, int] = {}
+        self._rows_by_conversation: Dict[str, Set[int]] = {}
+        self._index_file: Optional[BinaryIO] = None
+        self._open()
+
+    def __len__(self) -> int:
+        return len(self._row_by_message)
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    @property
+    def tombstones(self) -> int:
+        """Dropped rows still occupying space in the data files."""
+        return self._count - len(self._row_by_message)
+
+    def _path(self, name: str, generation: Optional[int] = None) -> Path:
+        # Data files of generation N > 0 are named e.g. ``vectors.N.f32``.
+        generation = self._generation if generation is None else generation
+        if generation and name != _HEADER:
+            stem, _, suffix = name.partition(".")
+            name = f"{stem}.{generation}.{suffix}"
+        return self._directory / name
+
+    def _open(self) -> None:
+        header_path = self._path(_HEADER)
+        if header_path.exists():
+            header = json.loads(header_path.read_text(encoding="utf-8"))
+            version = header.get("version")
+            if version != _FORMAT_VERSION:
+                raise FatalStorageError(f"unsupported mmap store version {version}")
+            self._dimension = int(header["dimension"])
+            self._capacity = int(header["capacity"])
+            self._generation = int(header.get("generation", 0))
+            self._rows = np.zeros(self._capacity, dtype=_ROW_DTYPE)
+            self._map_files()
+            self._replay_index()
+        self._index_file = open(self._path(_INDEX), "ab")
+
+    def _write_header(self) -> None:
+        header = {
+            "version": _FORMAT_VERSION,
+            "dimension": self._dimension,
+            "capacity": self._capacity,
+            "generation": self._generation,
+        }
+        tmp = self._path(_HEADER + ".tmp")
+        tmp.write_text(json.dumps(header), encoding="utf-8")
+        os.replace(tmp, self._path(_HEADER))
+
+    def _map_files(self) -> None:
+        dimension = self._dimension or 0
+        self._vectors = np.memmap(
+            self._path(_VECTORS), dtype=np.float32, mode="r+", shape=(self._capacity, dimension)
+        )
+        self._norms = np.memmap(
+            self._path(_NORMS), dtype=np.float32, mode="r+", shape=(self._capacity,)
+        )
+        self._alive = np.memmap(
+            self._path(_ALIVE), dtype=np.uint8, mode="r+", shape=(self._capacity,)
+        )
+
+    def _unmap_files(self) -> None:
+        for mapped in (self._vectors, self._norms, self._alive):
+            if mapped is not None:
+                mapped.flush()
+        self._vectors = self._norms = self._alive = None
+
+    def _grow(self, needed_rows: int) -> None:
+        if needed_rows <= self._capacity:
+            return
+        dimension = self._dimension or 0
+        capacity = -(-needed_rows // self._chunk_rows) * self._chunk_rows
+        self._unmap_files()
+        for name, row_bytes in ((_VECTORS, 4 * dimension), (_NORMS, 4), (_ALIVE, 1)):
+            with open(self._path(name), "ab") as handle:
+                handle.truncate(capacity * row_bytes)
+        rows = np.zeros(capacity, dtype=_ROW_DTYPE)
+        rows[: len(self._rows)] = self._rows
+        self._rows = rows
+        self._capacity = capacity
+        self._write_header()
+        self._map_files()
+
+    def _replay_index(self) -> None:
+        index_path = self._path(_INDEX)
+        if not index_path.exists():
+            return
+        with open(index_path, "r+b") as handle:
+            good = 0
+            row = 0
+            try:
+                for record in read_records(handle):
+                    if not isinstance(record, EmbeddingRecord):
+                        raise FatalStorageError("mmap index holds a non-embedding record")
+                    if row < self._capacity:
+                        self._remember(
+                            row,
+                            record.id,
+                            record.message_id,
+                            record.conversation_id,
+                            record.model,
+                            record.created_at,
+                        )
+                    row += 1
+                    good = handle.tell()
+            except FatalStorageError:
+                # A crash mid-append leaves a torn last record; cut it off so
+                # later appends stay aligned with their rows.
+                _LOGGER.warning("truncating damaged mmap index %s at byte %d", index_path, good)
+                handle.truncate(good)
+        self._drop_dead_rows()
+
+    def _drop_dead_rows(self) -> None:
+        if self._alive is not None:
+            for dead in np.flatnonzero(self._alive[: self._count] == 0):
+                self._drop_row(int(dead))
+
+    @staticmethod
+    def _code(value: str, table: List[str], codes: Dict[str, int]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+
+    def _remember(
+        self,
+        row: int,
+        record_id: str,
+        message_id: str,
+        conversation_id: str,
+        model: str,
+        created_at: datetime,
+    ) -> None:
+        if row >= len(self._ids):
+            self._ids.extend([None] * (row + 1 - len(self._ids)))
+        previous = self._row_by_message.get(message_id)
+        if previous is not None and previous != row:
+            self._drop_row(previous)
+        micros, aware = _timestamp_fields(created_at)
+        self._rows[row] = (
+            self._code(conversation_id, self._conversations, self._conversation_codes),
+            self._code(model, self._models, self._model_codes),
+            micros,
+            aware,
+        )
+        self._ids[row] = (record_id, message_id)
+        self._row_by_message[message_id] = row
+        self._rows_by_conversation.setdefault(conversation_id, set()).add(row)
+        self._count = max(self._count, row + 1)
+
+    def _drop_row(self, row: int) -> None:
+        ids = self._ids[row]
+        if ids is None:
+            return
+        self._ids[row] = None
+        if self._row_by_message.get(ids[1]) == row:
+            del self._row_by_message[ids[1]]
+        conversation_id = self._conversations[int(self._rows["conversation"][row])]
+        rows = self._rows_by_conversation.get(conversation_id)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._rows_by_conversation[conversation_id]
+        if self._alive is not None:
+            self._alive[row] = 0
+
+    def _forget_conversation(self, conversation_id: str) -> int:
+        rows = list(self._rows_by_conversation.get(conversation_id, ()))
+        for row in rows:
+            self._drop_row(row)
+        return len(rows)
+
+    def _index_record(self, row: int) -> EmbeddingRecord:
+        """Index entry for ``row``: its record without the vector."""
+        ids = self._ids[row]
+        assert ids is not None
+        columns = self._rows[row]
+        return EmbeddingRecord(
+            id=ids[0],
+            message_id=ids[1],
+            conversation_id=self._conversations[int(columns["conversation"])],
+            embedding=[],
+            model=self._models[int(columns["model"])],
+            created_at=_timestamp(int(columns["created"]), int(columns["aware"])),
+        )
+
+    def _append_index(self, row: int) -> None:
+        if self._index_file is None:
+            raise FatalStorageError("mmap embedding store is closed")
+        write_records(self._index_file, [self._index_record(row)])
+        self._index_file.flush()
+
+    def _as_vector(self, embedding: Sequence[float]) -> npt.NDArray[np.float32]:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if self._dimension is not None and vector.shape[0] != self._dimension:
+            raise FatalStorageError(
+                f"embedding has {vector.shape[0]} dimensions, store expects {self._dimension}"
+            )
+        return vector
+
+    async def save_embedding(self, record: EmbeddingRecord) -> None:
+        if self._dimension is None:
+            self._dimension = len(record.embedding)
+            self._write_header()
+        vector = self._as_vector(record.embedding)
+        row = self._count
+        self._grow(row + 1)
+        assert self._vectors is not None and self._norms is not None and self._alive is not None
+        norm = float(np.linalg.norm(vector))
+        self._vectors[row] = vector / norm if norm > 0 else vector
+        self._norms[row] = norm
+        self._alive[row] = 1
+        self._remember(
+            row,
+            record.id,
+            record.message_id,
+            record.conversation_id,
+            record.model,
+            record.created_at,
+        )
+        # The vector is written before its index line, so a crash in between
+        # leaves an unreferenced row rather than a record without a vector.
+        self._append_index(row)
+        self._maybe_compact()
+
+    def _build_record(self, row: int) -> Optional[EmbeddingRecord]:
+        ids = self._ids[row]
+        if ids is None or self._vectors is None or self._norms is None:
+            return None
+        vector = np.asarray(self._vectors[row], dtype=np.float32) * self._norms[row]
+        columns = self._rows[row]
+        return EmbeddingRecord(
+            id=ids[0],
+            message_id=ids[1],
+            conversation_id=self._conversations[int(columns["conversation"])],
+            embedding=vector.tolist(),
+            model=self._models[int(columns["model"])],
+            created_at=_timestamp(int(columns["created"]), int(columns["aware"])),
+        )
+
+    async def get_embedding(self, message_id: str) -> Optional[EmbeddingRecord]:
+        row = self._row_by_message.get(message_id)
+        return None if row is None else self._build_record(row)
+
+    async def search_similar(
+        self,
+        embedding: Sequence[float],
+        limit: int = 10,
+        threshold: float = 0.8,
+    ) -> List[EmbeddingRecord]:
+        if limit <= 0 or not self._row_by_message or self._vectors is None or self._alive is None:
+            return []
+        query = self._as_vector(embedding)
+        norm = float(np.linalg.norm(query))
+        if norm > 0:
+            query = query / norm
+        best_rows = np.zeros(0, dtype=np.intp)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for start in range(0, self._count, self._block_rows):
+            stop = min(start + self._block_rows, self._count)
+            scores = self._vectors[start:stop] @ query
+            scores[self._alive[start:stop] == 0] = -np.inf
+            keep = scores >= threshold
+            if not keep.any():
+                continue
+            rows = np.flatnonzero(keep) + start
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores[keep]])
+            if best_rows.size > limit:
+                top = np.argpartition(-best_scores, limit - 1)[:limit]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+        order = np.argsort(-best_scores, kind="stable")
+        results: List[EmbeddingRecord] = []
+        for row in best_rows[order]:
+            record = self._build_record(int(row))
+            if record is not None:
+                results.append(record)
+        return results
+
+    async def delete_embeddings(self, conversation_id: str) -> int:
+        if conversation_id not in self._rows_by_conversation:
+            return 0
+        deleted = self._forget_conversation(conversation_id)
+        self._maybe_compact()
+        return deleted
+
+    async def delete_embeddings_before(self, cutoff: datetime, limit: int = 100) -> int:
+        if limit <= 0 or self._alive is None:
+            return 0
+        count = self._count
+        created = self._rows["created"][:count]
+        expired = np.flatnonzero(
+            (created < _timestamp_fields(cutoff)[0]) & (self._alive[:count] != 0)
+        )
+        if expired.size > limit:
+            expired = expired[np.argpartition(created[expired], limit - 1)[:limit]]
+        # Oldest first; ties keep row (insertion) order.
+        rows = [int(row) for row in expired[np.lexsort((expired, created[expired]))]]
+        rows = [row for row in rows if self._ids[row] is not None]
+        if not rows:
+            return 0
+        for row in rows:
+            self._drop_row(row)
+        self._maybe_compact()
+        return len(rows)
+
+    def _maybe_compact(self) -> None:
+        if self._count and self.tombstones > self._compact_ratio * self._count:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the data files and the index without dropped rows.
+
+        The compacted copy is written as the next file generation and only
+        becomes current when the header is replaced, so a crash part-way
+        leaves the previous generation intact.
+        """
+
+        if self._dimension is None or self._vectors is None or self._norms is None:
+            return
+        keep = np.asarray(
+            [row for row, ids in enumerate(self._ids) if ids is not None], dtype=np.intp
+        )
+        generation = self._generation + 1
+        capacity = max(self._chunk_rows, -(-keep.size // self._chunk_rows) * self._chunk_rows)
+        vectors: np.memmap[Any, np.dtype[np.float32]] = np.memmap(
+            self._path(_VECTORS, generation),
+            dtype=np.float32,
+            mode="w+",
+            shape=(capacity, self._dimension),
+        )
+        norms: np.memmap[Any, np.dtype[np.float32]] = np.memmap(
+            self._path(_NORMS, generation), dtype=np.float32, mode="w+", shape=(capacity,)
+        )
+        alive: np.memmap[Any, np.dtype[np.uint8]] = np.memmap(
+            self._path(_ALIVE, generation), dtype=np.uint8, mode="w+", shape=(capacity,)
+        )
+        for start in range(0, keep.size, self._block_rows):
+            block = keep[start : start + self._block_rows]
+            vectors[start : start + block.size] = self._vectors[block]
+            norms[start : start + block.size] = self._norms[block]
+        alive[: keep.size] = 1
+        for mapped in (vectors, norms, alive):
+            mapped.flush()
+        del vectors, norms, alive
+        with open(self._path(_INDEX, generation), "wb") as handle:
+            write_records(handle, (self._index_record(int(source)) for source in keep))
+            handle.flush()
+            os.fsync(handle.fileno())
+
+        rows = np.zeros(capacity, dtype=_ROW_DTYPE)
+        rows[: keep.size] = self._rows[keep]
+        ids = [self._ids[int(source)] for source in keep]
+        previous = self._generation
+        self.close()
+        self._generation = generation
+        self._capacity = capacity
+        self._write_header()
+        for name in (_VECTORS, _NORMS, _ALIVE, _INDEX):
+            self._path(name, previous).unlink(missing_ok=True)
+
+        self._rows = rows
+        self._ids = list(ids)
+        self._count = keep.size
+        self._row_by_message = {}
+        self._rows_by_conversation = {}
+        for row, pair in enumerate(ids):
+            assert pair is not None
+            self._row_by_message[pair[1]] = row
+            conversation_id = self._conversations[int(rows["conversation"][row])]
+            self._rows_by_conversation.setdefault(conversation_id, set()).add(row)
+        self._map_files()
+        self._index_file = open(self._path(_INDEX), "ab")
+
+    def flush(self) -> None:
+        """Flush mapped pages and the index log to disk."""
+
+        for mapped in (self._vectors, self._norms, self._alive):
+            if mapped is not None:
+                mapped.flush()
+        if self._index_file is not None:
+            self._index_file.flush()
+            os.fsync(self._index_file.fileno())
+
+    def close(self) -> None:
+        self.flush()
+        self._unmap_files()
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
@@ -0,0 +1,219 @@
+"""NumPy-backed embedding storage with vectorized similarity search."""
+
+from __future__ import annotations
+
+import heapq
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Set
+
+import numpy as np
+import numpy.typing as npt
+
+from .storage import EmbeddingRecord, EmbeddingStore, FatalStorageError
+
+FloatMatrix = npt.NDArray[np.float32]
+
+
+class NumpyEmbeddingStore(EmbeddingStore):
+    """Embedding store that keeps unit vectors in one contiguous float32 matrix.
+
+    ``search_similar`` is a single matrix-vector product followed by an
+    ``argpartition`` top-k, so cost no longer includes a Python-level loop per
+    record. The matrix grows by ``chunk_size`` rows at a time. Replaced and
+    deleted rows are tombstoned and reclaimed by :meth:`compact` once they
+    exceed ``compact_ratio`` of the used rows.
+    """
+
+    def __init__(self, *, chunk_size: int = 1024, compact_ratio: float = 0.25) -> None:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0.0 < compact_ratio <= 1.0:
+            raise ValueError("compact_ratio must be in (0, 1]")
+        self._chunk_size = chunk_size
+        self._compact_ratio = compact_ratio
+        self._dimension: Optional[int] = None
+        self._matrix: FloatMatrix = np.zeros((0, 0), dtype=np.float32)
+        self._alive: npt.NDArray[np.bool_] = np.zeros(0, dtype=bool)
+        self._records: List[Optional[EmbeddingRecord]] = []
+        self._row_by_message: Dict[str, int] = {}
+        self._rows_by_conversation: Dict[str, Set[int]] = {}
+        self._tombstones = 0
+
+    def __len__(self) -> int:
+        return len(self._row_by_message)
+
+    @property
+    def tombstones(self) -> int:
+        return self._tombstones
+
+    @property
+    def capacity(self) -> int:
+        return int(self._matrix.shape[0])
+
+    def _as_unit(self, embedding: Sequence[float]) -> FloatMatrix:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if self._dimension is not None and vector.shape[0] != self._dimension:
+            raise FatalStorageError(
+                f"embedding has {vector.shape[0]} dimensions, store expects {self._dimension}"
+            )
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector = vector / norm
+        return vector
+
+    def _grow(self, needed_rows: int) -> None:
+        if needed_rows <= self.capacity:
+            return
+        chunks = -(-needed_rows // self._chunk_size)
+        grown = np.zeros((chunks * self._chunk_size, self._dimension or 0), dtype=np.float32)
+        alive = np.zeros(grown.shape[0], dtype=bool)
+        used = len(self._records)
+        if used:
+            grown[:used] = self._matrix[:used]
+            alive[:used] = self._alive[:used]
+        self._matrix = grown
+        self._alive = alive
+
+    def _tombstone(self, row: int) -> None:
+        record = self._records[row]
+        if record is None:
+            return
+        self._records[row] = None
+        self._alive[row] = False
+        rows = self._rows_by_conversation.get(record.conversation_id)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._rows_by_conversation[record.conversation_id]
+        self._tombstones += 1
+
+    async def save_embedding(self, record: EmbeddingRecord) -> None:
+        if self._dimension is None:
+            self._dimension = len(record.embedding)
+        vector = self._as_unit(record.embedding)
+        previous = self._row_by_message.get(record.message_id)
+        if previous is not None:
+            self._tombstone(previous)
+        row = len(self._records)
+        self._grow(row + 1)
+        self._matrix[row] = vector
+        self._alive[row] = True
+        self._records.append(record)
+        self._row_by_message[record.message_id] = row
+        self._rows_by_conversation.setdefault(record.conversation_id, set()).add(row)
+        self._row_added(row)
+        self._maybe_compact()
+
+    def _row_added(self, row: int) -> None:
+        """Hook for index structures that track rows as they are written."""
+
+    def _rows_rebuilt(self) -> None:
+        """Hook called after :meth:`compact` renumbers every row."""
+
+    def _candidate_rows(self, query: FloatMatrix) -> Optional[npt.NDArray[np.intp]]:
+        """Rows worth scoring for ``query``; ``None`` scans the whole matrix."""
+
+        return None
+
+    async def get_embedding(self, message_id: str) -> Optional[EmbeddingRecord]:
+        row = self._row_by_message.get(message_id)
+        return None if row is None else self._records[row]
+
+    async def search_similar(
+        self,
+        embedding: Sequence[float],
+        limit: int = 10,
+        threshold: float = 0.8,
+    ) -> List[EmbeddingRecord]:
+        used = len(self._records)
+        if limit <= 0 or used == 0 or not self._row_by_message:
+            return []
+        query = self._as_unit(embedding)
+        rows = self._candidate_rows(query)
+        if rows is None:
+            # Slicing keeps the full scan a view instead of a gathered copy.
+            scores = self._matrix[:used] @ query
+            scores[~self._alive[:used]] = -np.inf
+        elif rows.size == 0:
+            return []
+        else:
+            scores = self._matrix[rows] @ query
+            scores[~self._alive[rows]] = -np.inf
+        if limit < scores.size:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(scores.size)
+        ranked = top[np.argsort(-scores[top], kind="stable")]
+        results: List[EmbeddingRecord] = []
+        for index in ranked:
+            if scores[index] < threshold:
+                break
+            row = int(index) if rows is None else int(rows[index])
+            record = self._records[row]
+            if record is not None:
+                results.append(record)
+        return results
+
+    async def delete_embeddings(self, conversation_id: str) -> int:
+        rows = self._rows_by_conversation.get(conversation_id)
+        if not rows:
+            return 0
+        count = 0
+        for row in list(rows):
+            record = self._records[row]
+            if record is not None:
+                self._row_by_message.pop(record.message_id, None)
+            self._tombstone(row)
+            count += 1
+        self._maybe_compact()
+        return count
+
+    async def delete_embeddings_before(self, cutoff: datetime, limit: int = 100) -> int:
+        if limit <= 0:
+            return 0
+        expired = heapq.nsmallest(
+            limit,
+            (
+                (record.created_at, row)
+                for row, record in enumerate(self._records)
+                if record is not None and record.created_at < cutoff
+            ),
+        )
+        for _, row in expired:
+            record = self._records[row]
+            if record is not None:
+                self._row_by_message.pop(record.message_id, None)
+            self._tombstone(row)
+        self._maybe_compact()
+        return len(expired)
+
+    def _maybe_compact(self) -> None:
+        used = len(self._records)
+        if used and self._tombstones > self._compact_ratio * used:
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop tombstoned rows and rebuild the row indexes."""
+
+        used = len(self._records)
+        keep = np.flatnonzero(self._alive[:used])
+        records: List[EmbeddingRecord] = []
+        for kept in keep:
+            record = self._records[int(kept)]
+            if record is not None:
+                records.append(record)
+        capacity = max(self._chunk_size, -(-len(keep) // self._chunk_size) * self._chunk_size)
+        matrix = np.zeros((capacity, self._dimension or 0), dtype=np.float32)
+        matrix[: len(keep)] = self._matrix[keep]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: len(keep)] = True
+        self._matrix = matrix
+        self._alive = alive
+        self._records = list(records)
+        self._row_by_message = {}
+        self._rows_by_conversation = {}
+        for row, record in enumerate(records):
+            self._row_by_message[record.message_id] = row
+            self._rows_by_conversation.setdefault(record.conversation_id, set()).add(row)
+        self._tombstones = 0
+        self._rows_rebuilt()
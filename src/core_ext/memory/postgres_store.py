@@ -0,0 +1,697 @@
+"""PostgreSQL storage implementations backed by a shared asyncpg pool."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from .codec import decode_vector, encode_vector
+from .storage import (
+    ConversationCursor,
+    ConversationMessage,
+    ConversationMetadata,
+    ConversationPage,
+    EmbeddingRecord,
+    EmbeddingStore,
+    FatalStorageError,
+    MemoryStore,
+    MessageStore,
+    MessageType,
+    MetadataStore,
+    RetryableStorageError,
+    StorageError,
+    build_conversation_page,
+)
+
+# Connection failures, serialization/deadlock rollbacks, resource exhaustion,
+# lock timeouts, cancellations and server shutdowns are worth retrying.
+_RETRYABLE_SQLSTATE_PREFIXES = ("08", "40", "53", "55P03", "57014", "57P")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    model TEXT,
+    chain TEXT,
+    persona TEXT,
+    created_at TIMESTAMP NOT NULL,
+    updated_at TIMESTAMP NOT NULL,
+    token_count INTEGER NOT NULL DEFAULT 0,
+    compress_ratio DOUBLE PRECISION NOT NULL DEFAULT 1.0,
+    semantic_retention DOUBLE PRECISION,
+    metadata JSONB NOT NULL DEFAULT '{}'::jsonb
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_user_updated
+    ON conversations (user_id, updated_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (updated_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS messages (
+    seq BIGSERIAL PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    conversation_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    metadata JSONB NOT NULL DEFAULT '{}'::jsonb
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages (conversation_id, seq);
+
+CREATE TABLE IF NOT EXISTS embeddings (
+    seq BIGSERIAL PRIMARY KEY,
+    message_id TEXT NOT NULL UNIQUE,
+    id TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    dimension INTEGER NOT NULL,
+    vector BYTEA NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_conversation_id ON embeddings (conversation_id);
+CREATE INDEX IF NOT EXISTS idx_embeddings_created ON embeddings (created_at);
+"""
+
+_CONVERSATION_COLUMNS = (
+    "id, user_id, model, chain, persona, created_at, updated_at,"
+    " token_count, compress_ratio, semantic_retention, metadata::text"
+)
+_UPSERT_CONVERSATION = """
+INSERT INTO conversations (
+    id, user_id, model, chain, persona, created_at, updated_at,
+    token_count, compress_ratio, semantic_retention, metadata
+) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11::jsonb)
+ON CONFLICT (id) DO UPDATE SET
+    user_id = EXCLUDED.user_id,
+    model = EXCLUDED.model,
+    chain = EXCLUDED.chain,
+    persona = EXCLUDED.persona,
+    created_at = EXCLUDED.created_at,
+    updated_at = EXCLUDED.updated_at,
+    token_count = EXCLUDED.token_count,
+    compress_ratio = EXCLUDED.compress_ratio,
+    semantic_retention = EXCLUDED.semantic_retention,
+    metadata = EXCLUDED.metadata
+"""
+_SELECT_CONVERSATION = f"SELECT {_CONVERSATION_COLUMNS} FROM conversations WHERE id = $1"
+_LIST_CONVERSATIONS = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations ORDER BY created_at, id LIMIT $1 OFFSET $2"
+)
+_LIST_USER_CONVERSATIONS = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations"
+    " WHERE user_id = $1 ORDER BY created_at, id LIMIT $2 OFFSET $3"
+)
+_PAGE_CONVERSATIONS = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations"
+    " ORDER BY updated_at DESC, id DESC LIMIT $1"
+)
+_PAGE_CONVERSATIONS_AFTER = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations"
+    " WHERE (updated_at, id) < ($1, $2) ORDER BY updated_at DESC, id DESC LIMIT $3"
+)
+_PAGE_USER_CONVERSATIONS = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations"
+    " WHERE user_id = $1 ORDER BY updated_at DESC, id DESC LIMIT $2"
+)
+_PAGE_USER_CONVERSATIONS_AFTER = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations"
+    " WHERE user_id = $1 AND (updated_at, id) < ($2, $3)"
+    " ORDER BY updated_at DESC, id DESC LIMIT $4"
+)
+_EXPIRED_CONVERSATIONS = (
+    "SELECT id FROM conversations WHERE updated_at < $1 ORDER BY updated_at, id LIMIT $2"
+)
+_DELETE_CONVERSATION = "DELETE FROM conversations WHERE id = $1"
+
+_UPSERT_MESSAGE = """
+INSERT INTO messages (id, conversation_id, role, content, created_at, metadata)
+VALUES ($1, $2, $3, $4, $5, $6::jsonb)
+ON CONFLICT (id) DO UPDATE SET
+    conversation_id = EXCLUDED.conversation_id,
+    role = EXCLUDED.role,
+    content = EXCLUDED.content,
+    created_at = EXCLUDED.created_at,
+    metadata = EXCLUDED.metadata
+"""
+_STAGING_TABLE = "staging_messages"
+_STAGING_COLUMNS = ("ordinal", "id", "conversation_id", "role", "content", "created_at", "metadata")
+_CREATE_STAGING = f"""
+CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} (
+    ordinal INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    metadata TEXT NOT NULL
+) ON COMMIT DELETE ROWS
+"""
+_MERGE_STAGING = f"""
+INSERT INTO messages (id, conversation_id, role, content, created_at, metadata)
+SELECT id, conversation_id, role, content, created_at, metadata::jsonb
+FROM {_STAGING_TABLE} ORDER BY ordinal
+ON CONFLICT (id) DO UPDATE SET
+    conversation_id = EXCLUDED.conversation_id,
+    role = EXCLUDED.role,
+    content = EXCLUDED.content,
+    created_at = EXCLUDED.created_at,
+    metadata = EXCLUDED.metadata
+"""
+_MESSAGE_COLUMNS = "id, conversation_id, role, content, created_at, metadata::text"
+_SELECT_MESSAGES = (
+    f"SELECT {_MESSAGE_COLUMNS} FROM messages WHERE conversation_id = $1 ORDER BY seq"
+)
+_RECENT_MESSAGES = (
+    f"SELECT {_MESSAGE_COLUMNS} FROM messages"
+    " WHERE conversation_id = $1 ORDER BY seq DESC LIMIT $2"
+)
+_RECENT_MESSAGES_BEFORE = (
+    f"SELECT {_MESSAGE_COLUMNS} FROM messages"
+    " WHERE conversation_id = $1"
+    " AND seq < (SELECT seq FROM messages WHERE id = $2 AND conversation_id = $1)"
+    " ORDER BY seq DESC LIMIT $3"
+)
+_MESSAGES_AFTER_SEQ = (
+    f"SELECT seq, {_MESSAGE_COLUMNS} FROM messages"
+    " WHERE conversation_id = $1 AND seq > $2 ORDER BY seq LIMIT $3"
+)
+_MESSAGES_BEFORE_SEQ = (
+    f"SELECT seq, {_MESSAGE_COLUMNS} FROM messages"
+    " WHERE conversation_id = $1 AND seq < $2 ORDER BY seq DESC LIMIT $3"
+)
+_MAX_SEQ = 2**63 - 1
+_DELETE_MESSAGES = "DELETE FROM messages WHERE conversation_id = $1"
+
+_UPSERT_EMBEDDING = """
+INSERT INTO embeddings (message_id, id, conversation_id, model, created_at, dimension, vector)
+VALUES ($1, $2, $3, $4, $5, $6, $7)
+ON CONFLICT (message_id) DO UPDATE SET
+    id = EXCLUDED.id,
+    conversation_id = EXCLUDED.conversation_id,
+    model = EXCLUDED.model,
+    created_at = EXCLUDED.created_at,
+    dimension = EXCLUDED.dimension,
+    vector = EXCLUDED.vector
+"""
+_EMBEDDING_COLUMNS = "id, message_id, conversation_id, model, created_at, vector"
+_SELECT_EMBEDDING = f"SELECT {_EMBEDDING_COLUMNS} FROM embeddings WHERE message_id = $1"
+_SCAN_EMBEDDINGS = (
+    f"SELECT seq, {_EMBEDDING_COLUMNS} FROM embeddings"
+    " WHERE dimension = $1 AND seq > $2 ORDER BY seq LIMIT $3"
+)
+_DELETE_EMBEDDINGS = "DELETE FROM embeddings WHERE conversation_id = $1"
+_DELETE_EXPIRED_EMBEDDINGS = """
+DELETE FROM embeddings WHERE seq IN (
+    SELECT seq FROM embeddings WHERE created_at < $1 ORDER BY created_at LIMIT $2
+)
+"""
+
+
+def postgres_dsn_from_env() -> str:
+    """Build a DSN from ``MEMORY_POSTGRES_DSN`` or the ``MEMORY_POSTGRES_*`` parts."""
+    dsn = os.getenv("MEMORY_POSTGRES_DSN")
+    if dsn:
+        return dsn
+    host = os.getenv("MEMORY_POSTGRES_HOST") or "localhost"
+    port = os.getenv("MEMORY_POSTGRES_PORT") or "5432"
+    database = os.getenv("MEMORY_POSTGRES_DATABASE") or "katamari"
+    user = os.getenv("MEMORY_POSTGRES_USER") or "katamari"
+    password = os.getenv("MEMORY_POSTGRES_PASSWORD") or ""
+    auth = quote(user, safe="")
+    if password:
+        auth += ":" + quote(password, safe="")
+    return f"postgresql://{auth}@{host}:{port}/{quote(database, safe='')}"
+
+
+def to_storage_error(exc: BaseException) -> StorageError:
+    """Map an asyncpg/driver exception onto the storage error hierarchy."""
+    if isinstance(exc, StorageError):
+        return exc
+    sqlstate = getattr(exc, "sqlstate", None)
+    if isinstance(sqlstate, str) and sqlstate:
+        retryable = sqlstate.startswith(_RETRYABLE_SQLSTATE_PREFIXES)
+    else:
+        retryable = isinstance(exc, (OSError, asyncio.TimeoutError))
+    message = f"postgres: {exc}"
+    return RetryableStorageError(message) if retryable else FatalStorageError(message)
+
+
+def _affected(status: Any) -> int:
+    """Row count from an asyncpg command tag such as ``DELETE 3``."""
+    try:
+        return int(str(status).rsplit(" ", 1)[-1])
+    except ValueError:
+        return 0
+
+
+class PostgresDatabase:
+    """asyncpg pool shared by the Postgres memory stores.
+
+    The pool is created on first use and the schema is applied once. Driver
+    exceptions raised inside :meth:`connection` are re-raised as
+    :class:`RetryableStorageError` or :class:`FatalStorageError` by SQLSTATE.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        *,
+        min_size: int = 1,
+        max_size: int = 10,
+        command_timeout: float = 30.0,
+        pool: Any = None,
+    ) -> None:
+        self._dsn = dsn
+        self._min_size = min_size
+        self._max_size = max_size
+        self._command_timeout = command_timeout
+        self._pool = pool
+        self._schema_ready = False
+        self._lock = asyncio.Lock()
+
+    async def _create_pool(self) -> Any:
+        try:
+            import asyncpg
+        except ImportError as exc:
+            raise FatalStorageError(
+                "asyncpg is required for MEMORY_STORAGE_BACKEND=postgres"
+            ) from exc
+        return await asyncpg.create_pool(
+            self._dsn or postgres_dsn_from_env(),
+            min_size=self._min_size,
+            max_size=self._max_size,
+            command_timeout=self._command_timeout,
+        )
+
+    async def pool(self) -> Any:
+        if self._pool is not None and self._schema_ready:
+            return self._pool
+        async with self._lock:
+            if self._pool is None:
+                self._pool = await self._create_pool()
+            if not self._schema_ready:
+                async with self._pool.acquire() as conn:
+                    await conn.execute(_SCHEMA)
+                self._schema_ready = True
+        return self._pool
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[Any]:
+        try:
+            pool = await self.pool()
+            async with pool.acquire() as conn:
+                yield conn
+        except StorageError:
+            raise
+        except Exception as exc:
+            raise to_storage_error(exc) from exc
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Any]:
+        async with self.connection() as conn:
+            async with conn.transaction():
+                yield conn
+
+    async def close(self) -> None:
+        pool, self._pool = self._pool, None
+        self._schema_ready = False
+        if pool is not None:
+            await pool.close()
+
+
+def _conversation_args(conversation: ConversationMetadata) -> Tuple[Any, ...]:
+    return (
+        conversation.id,
+        conversation.user_id,
+        conversation.model,
+        conversation.chain,
+        conversation.persona,
+        conversation.created_at,
+        conversation.updated_at,
+        conversation.token_count,
+        conversation.compress_ratio,
+        conversation.semantic_retention,
+        json.dumps(conversation.metadata, ensure_ascii=False),
+    )
+
+
+def _conversation_from_row(row: Sequence[Any]) -> ConversationMetadata:
+    return ConversationMetadata(
+        id=row[0],
+        user_id=row[1],
+        model=row[2],
+        chain=row[3],
+        persona=row[4],
+        created_at=row[5],
+        updated_at=row[6],
+        token_count=row[7],
+        compress_ratio=row[8],
+        semantic_retention=row[9],
+        metadata=json.loads(row[10]),
+    )
+
+
+def _message_from_row(row: Sequence[Any]) -> ConversationMessage:
+    return ConversationMessage(
+        id=row[0],
+        conversation_id=row[1],
+        role=MessageType(row[2]),
+        content=row[3],
+        created_at=row[4],
+        metadata=json.loads(row[5]),
+    )
+
+
+def _embedding_from_row(row: Sequence[Any]) -> EmbeddingRecord:
+    return EmbeddingRecord(
+        id=row[0],
+        message_id=row[1],
+        conversation_id=row[2],
+        embedding=decode_vector(row[5]),
+        model=row[3],
+        created_at=row[4],
+    )
+
+
+async def _copy_messages(conn: Any, messages: Sequence[ConversationMessage]) -> None:
+    """COPY ``messages`` into a staging table and upsert them in order.
+
+    Must run inside a transaction: the staging table clears on commit.
+    """
+    # ON CONFLICT cannot touch one row twice per statement, so the last
+    # write for a repeated id wins while keeping its first position.
+    latest: Dict[str, ConversationMessage] = {}
+    for message in messages:
+        latest[message.id] = message
+    if not latest:
+        return
+    await conn.execute(_CREATE_STAGING)
+    await conn.copy_records_to_table(
+        _STAGING_TABLE,
+        records=[
+            (
+                ordinal,
+                message.id,
+                message.conversation_id,
+                message.role.value,
+                message.content,
+                message.created_at,
+                json.dumps(message.metadata, ensure_ascii=False),
+            )
+            for ordinal, message in enumerate(latest.values())
+        ],
+        columns=list(_STAGING_COLUMNS),
+    )
+    await conn.execute(_MERGE_STAGING)
+
+
+class PostgresMetadataStore(MetadataStore):
+    """PostgreSQL implementation of metadata storage."""
+
+    def __init__(self, database: PostgresDatabase) -> None:
+        self._db = database
+
+    async def save_conversation(self, conversation: ConversationMetadata) -> None:
+        async with self._db.connection() as conn:
+            await conn.execute(_UPSERT_CONVERSATION, *_conversation_args(conversation))
+
+    async def get_conversation(self, conversation_id: str) -> Optional[ConversationMetadata]:
+        async with self._db.connection() as conn:
+            row = await conn.fetchrow(_SELECT_CONVERSATION, conversation_id)
+        return None if row is None else _conversation_from_row(row)
+
+    async def list_conversations(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[ConversationMetadata]:
+        async with self._db.connection() as conn:
+            if user_id:
+                rows = await conn.fetch(_LIST_USER_CONVERSATIONS, user_id, limit, offset)
+            else:
+                rows = await conn.fetch(_LIST_CONVERSATIONS, limit, offset)
+        return [_conversation_from_row(row) for row in rows]
+
+    async def list_conversations_page(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[ConversationCursor] = None,
+    ) -> ConversationPage:
+        if limit <= 0:
+            return ConversationPage(conversations=[])
+        params: List[Any] = [user_id] if user_id else []
+        if after is not None:
+            params += [after.updated_at, after.id]
+            sql = _PAGE_USER_CONVERSATIONS_AFTER if user_id else _PAGE_CONVERSATIONS_AFTER
+        else:
+            sql = _PAGE_USER_CONVERSATIONS if user_id else _PAGE_CONVERSATIONS
+        async with self._db.connection() as conn:
+            rows = await conn.fetch(sql, *params, limit + 1)
+        return build_conversation_page((_conversation_from_row(row) for row in rows), limit)
+
+    async def list_conversation_ids_before(
+        self, cutoff: datetime, limit: int = 100
+    ) -> List[str]:
+        if limit <= 0:
+            return []
+        async with self._db.connection() as conn:
+            rows = await conn.fetch(_EXPIRED_CONVERSATIONS, cutoff, limit)
+        return [str(row[0]) for row in rows]
+
+    async def delete_conversation(self, conversation_id: str) -> bool:
+        async with self._db.connection() as conn:
+            status = await conn.execute(_DELETE_CONVERSATION, conversation_id)
+        return _affected(status) > 0
+
+
+class PostgresMessageStore(MessageStore):
+    """PostgreSQL implementation of message storage."""
+
+    def __init__(self, database: PostgresDatabase) -> None:
+        self._db = database
+
+    async def save_message(self, message: ConversationMessage) -> None:
+        async with self._db.connection() as conn:
+            await conn.execute(
+                _UPSERT_MESSAGE,
+                message.id,
+                message.conversation_id,
+                message.role.value,
+                message.content,
+                message.created_at,
+                json.dumps(message.metadata, ensure_ascii=False),
+            )
+
+    async def save_messages(self, messages: Sequence[ConversationMessage]) -> None:
+        """Bulk insert ``messages`` with ``COPY`` in a single transaction."""
+        if not messages:
+            return
+        async with self._db.transaction() as conn:
+            await _copy_messages(conn, messages)
+
+    async def get_messages(self, conversation_id: str) -> List[ConversationMessage]:
+        async with self._db.connection() as conn:
+            rows = await conn.fetch(_SELECT_MESSAGES, conversation_id)
+        return [_message_from_row(row) for row in rows]
+
+    async def get_recent_messages(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[str] = None,
+    ) -> List[ConversationMessage]:
+        if limit <= 0:
+            return []
+        async with self._db.connection() as conn:
+            if before is None:
+                rows = await conn.fetch(_RECENT_MESSAGES, conversation_id, limit)
+            else:
+                rows = await conn.fetch(_RECENT_MESSAGES_BEFORE, conversation_id, before, limit)
+        return [_message_from_row(row) for row in reversed(rows)]
+
+    async def iter_messages(
+        self,
+        conversation_id: str,
+        *,
+        batch_size: int = 100,
+        newest_first: bool = False,
+    ) -> AsyncIterator[ConversationMessage]:
+        # Keyset pages on seq; a pooled connection is only held per page.
+        sql = _MESSAGES_BEFORE_SEQ if newest_first else _MESSAGES_AFTER_SEQ
+        position = _MAX_SEQ if newest_first else 0
+        size = max(1, batch_size)
+        while True:
+            async with self._db.connection() as conn:
+                rows = await conn.fetch(sql, conversation_id, position, size)
+            for row in rows:
+                yield _message_from_row(tuple(row)[1:])
+            if len(rows) < size:
+                return
+            position = int(rows[-1][0])
+
+    async def delete_messages(self, conversation_id: str) -> int:
+        async with self._db.connection() as conn:
+            return _affected(await conn.execute(_DELETE_MESSAGES, conversation_id))
+
+
+class PostgresEmbeddingStore(EmbeddingStore):
+    """PostgreSQL implementation of embedding storage.
+
+    Vectors are float32 ``BYTEA``; ``search_similar`` pages through rows of
+    the query's dimension by ``seq`` and scores each page with NumPy.
+    """
+
+    def __init__(self, database: PostgresDatabase, *, scan_batch_size: int = 1024) -> None:
+        if scan_batch_size <= 0:
+            raise ValueError("scan_batch_size must be positive")
+        self._db = database
+        self._scan_batch_size = scan_batch_size
+
+    @staticmethod
+    def _row(record: EmbeddingRecord) -> Tuple[Any, ...]:
+        return (
+            record.message_id,
+            record.id,
+            record.conversation_id,
+            record.model,
+            record.created_at,
+            len(record.embedding),
+            encode_vector(record.embedding),
+        )
+
+    async def save_embedding(self, record: EmbeddingRecord) -> None:
+        async with self._db.connection() as conn:
+            await conn.execute(_UPSERT_EMBEDDING, *self._row(record))
+
+    async def save_embeddings(self, records: Sequence[EmbeddingRecord]) -> None:
+        """Upsert ``records`` with one ``executemany`` in a single transaction."""
+        if not records:
+            return
+        async with self._db.transaction() as conn:
+            await conn.executemany(_UPSERT_EMBEDDING, [self._row(record) for record in records])
+
+    async def get_embedding(self, message_id: str) -> Optional[EmbeddingRecord]:
+        async with self._db.connection() as conn:
+            row = await conn.fetchrow(_SELECT_EMBEDDING, message_id)
+        return None if row is None else _embedding_from_row(row)
+
+    async def search_similar(
+        self,
+        embedding: Sequence[float],
+        limit: int = 10,
+        threshold: float = 0.8,
+    ) -> List[EmbeddingRecord]:
+        if limit <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0:
+            return []
+        query = query / query_norm
+        best: List[Tuple[float, int, Any]] = []
+        last_seq = 0
+        async with self._db.connection() as conn:
+            while True:
+                rows = await conn.fetch(
+                    _SCAN_EMBEDDINGS, query.shape[0], last_seq, self._scan_batch_size
+                )
+                if not rows:
+                    break
+                last_seq = int(rows[-1][0])
+                matrix = np.frombuffer(b"".join(row[6] for row in rows), dtype=np.float32)
+                matrix = matrix.reshape(len(rows), query.shape[0])
+                norms = np.linalg.norm(matrix, axis=1)
+                norms[norms == 0] = np.inf
+                scores = (matrix @ query) / norms
+                page = [
+                    (float(scores[index]), int(rows[index][0]), rows[index])
+                    for index in np.flatnonzero(scores >= threshold)
+                ]
+                best = heapq.nlargest(limit, best + page, key=lambda item: (item[0], -item[1]))
+                if len(rows) < self._scan_batch_size:
+                    break
+        return [_embedding_from_row(tuple(row)[1:]) for _, _, row in best]
+
+    async def delete_embeddings(self, conversation_id: str) -> int:
+        async with self._db.connection() as conn:
+            return _affected(await conn.execute(_DELETE_EMBEDDINGS, conversation_id))
+
+    async def delete_embeddings_before(self, cutoff: datetime, limit: int = 100) -> int:
+        if limit <= 0:
+            return 0
+        async with self._db.connection() as conn:
+            return _affected(await conn.execute(_DELETE_EXPIRED_EMBEDDINGS, cutoff, limit))
+
+
+class PostgresMemoryStore(MemoryStore):
+    """MemoryStore whose conversation writes land in one COPY transaction."""
+
+    def __init__(self, database: PostgresDatabase) -> None:
+        super().__init__(
+            metadata_store=PostgresMetadataStore(database),
+            message_store=PostgresMessageStore(database),
+            embedding_store=PostgresEmbeddingStore(database),
+        )
+        self._database = database
+
+    @property
+    def database(self) -> PostgresDatabase:
+        return self._database
+
+    async def save_conversation_with_messages(
+        self,
+        conversation: ConversationMetadata,
+        messages: List[ConversationMessage],
+    ) -> None:
+        """Upsert the conversation and COPY its messages in one transaction."""
+        async with self._database.transaction() as conn:
+            await conn.execute(_UPSERT_CONVERSATION, *_conversation_args(conversation))
+            await _copy_messages(conn, messages)
+
+
+_SHARED_DATABASES: Dict[str, PostgresDatabase] = {}
+
+
+def _pool_size(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return default
+
+
+def get_postgres_database(dsn: Optional[str] = None) -> PostgresDatabase:
+    """Return the process-wide PostgresDatabase (one pool per DSN)."""
+    target = dsn or postgres_dsn_from_env()
+    database = _SHARED_DATABASES.get(target)
+    if database is None:
+        database = PostgresDatabase(
+            target,
+            min_size=_pool_size("MEMORY_POSTGRES_POOL_MIN_SIZE", 1),
+            max_size=_pool_size("MEMORY_POSTGRES_POOL_MAX_SIZE", 10),
+        )
+        _SHARED_DATABASES[target] = database
+    return database
+
+
+async def close_postgres_databases() -> None:
+    """Close every shared pool (call on shutdown)."""
+    databases = list(_SHARED_DATABASES.values())
+    _SHARED_DATABASES.clear()
+    for database in databases:
+        await database.close()
+
+
+def create_postgres_store(dsn: Optional[str] = None) -> MemoryStore:
+    """Create a MemoryStore on the shared asyncpg pool for ``dsn``."""
+    return PostgresMemoryStore(get_postgres_database(dsn))
@@ -0,0 +1,626 @@
+"""SQLite storage implementations for single-node durable memory."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import numpy as np
+
+from .codec import decode_vector, encode_vector
+from .storage import (
+    ConversationCursor,
+    ConversationMessage,
+    ConversationMetadata,
+    ConversationPage,
+    EmbeddingRecord,
+    EmbeddingStore,
+    FatalStorageError,
+    MemoryStore,
+    MessageStore,
+    MessageType,
+    MetadataStore,
+    RetryableStorageError,
+    build_conversation_page,
+)
+
+DEFAULT_SQLITE_PATH = ".katamari/memory.sqlite"
+_MAX_ROWID = 2**63 - 1
+_T = TypeVar("_T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    model TEXT,
+    chain TEXT,
+    persona TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    token_count INTEGER NOT NULL DEFAULT 0,
+    compress_ratio REAL NOT NULL DEFAULT 1.0,
+    semantic_retention REAL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_user_updated
+    ON conversations (user_id, updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (updated_at, id);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages (conversation_id);
+
+CREATE TABLE IF NOT EXISTS embeddings (
+    message_id TEXT PRIMARY KEY,
+    id TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    model TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    dimension INTEGER NOT NULL,
+    vector BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_conversation_id ON embeddings (conversation_id);
+CREATE INDEX IF NOT EXISTS idx_embeddings_created ON embeddings (created_at);
+"""
+
+# Statements are module constants so sqlite3's statement cache reuses the
+# prepared form instead of re-parsing on every call.
+_UPSERT_CONVERSATION = """
+INSERT INTO conversations (
+    id, user_id, model, chain, persona, created_at, updated_at,
+    token_count, compress_ratio, semantic_retention, metadata
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    user_id = excluded.user_id,
+    model = excluded.model,
+    chain = excluded.chain,
+    persona = excluded.persona,
+    created_at = excluded.created_at,
+    updated_at = excluded.updated_at,
+    token_count = excluded.token_count,
+    compress_ratio = excluded.compress_ratio,
+    semantic_retention = excluded.semantic_retention,
+    metadata = excluded.metadata
+"""
+_CONVERSATION_COLUMNS = (
+    "id, user_id, model, chain, persona, created_at, updated_at,"
+    " token_count, compress_ratio, semantic_retention, metadata"
+)
+_SELECT_CONVERSATION = f"SELECT {_CONVERSATION_COLUMNS} FROM conversations WHERE id = ?"
+_LIST_CONVERSATIONS = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations ORDER BY rowid LIMIT ? OFFSET ?"
+)
+_LIST_USER_CONVERSATIONS = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations"
+    " WHERE user_id = ? ORDER BY rowid LIMIT ? OFFSET ?"
+)
+_PAGE_ORDER = " ORDER BY updated_at DESC, id DESC LIMIT ?"
+_PAGE_CONVERSATIONS = f"SELECT {_CONVERSATION_COLUMNS} FROM conversations" + _PAGE_ORDER
+_PAGE_CONVERSATIONS_AFTER = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations"
+    " WHERE (updated_at, id) < (?, ?)" + _PAGE_ORDER
+)
+_PAGE_USER_CONVERSATIONS = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations WHERE user_id = ?" + _PAGE_ORDER
+)
+_PAGE_USER_CONVERSATIONS_AFTER = (
+    f"SELECT {_CONVERSATION_COLUMNS} FROM conversations"
+    " WHERE user_id = ? AND (updated_at, id) < (?, ?)" + _PAGE_ORDER
+)
+_EXPIRED_CONVERSATIONS = (
+    "SELECT id FROM conversations WHERE updated_at < ? ORDER BY updated_at, id LIMIT ?"
+)
+_DELETE_CONVERSATION = "DELETE FROM conversations WHERE id = ?"
+
+_UPSERT_MESSAGE = """
+INSERT INTO messages (id, conversation_id, role, content, created_at, metadata)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    conversation_id = excluded.conversation_id,
+    role = excluded.role,
+    content = excluded.content,
+    created_at = excluded.created_at,
+    metadata = excluded.metadata
+"""
+_MESSAGE_COLUMNS = "id, conversation_id, role, content, created_at, metadata"
+_SELECT_MESSAGES = (
+    f"SELECT {_MESSAGE_COLUMNS} FROM messages WHERE conversation_id = ? ORDER BY rowid"
+)
+_RECENT_MESSAGES = (
+    f"SELECT {_MESSAGE_COLUMNS} FROM messages"
+    " WHERE conversation_id = ? ORDER BY rowid DESC LIMIT ?"
+)
+_RECENT_MESSAGES_BEFORE = (
+    f"SELECT {_MESSAGE_COLUMNS} FROM messages"
+    " WHERE conversation_id = ?"
+    " AND rowid < (SELECT rowid FROM messages WHERE id = ? AND conversation_id = ?)"
+    " ORDER BY rowid DESC LIMIT ?"
+)
+_MESSAGES_AFTER_ROWID = (
+    f"SELECT rowid, {_MESSAGE_COLUMNS} FROM messages"
+    " WHERE conversation_id = ? AND rowid > ? ORDER BY rowid LIMIT ?"
+)
+_MESSAGES_BEFORE_ROWID = (
+    f"SELECT rowid, {_MESSAGE_COLUMNS} FROM messages"
+    " WHERE conversation_id = ? AND rowid < ? ORDER BY rowid DESC LIMIT ?"
+)
+_DELETE_MESSAGES = "DELETE FROM messages WHERE conversation_id = ?"
+
+_UPSERT_EMBEDDING = """
+INSERT INTO embeddings (message_id, id, conversation_id, model, created_at, dimension, vector)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (message_id) DO UPDATE SET
+    id = excluded.id,
+    conversation_id = excluded.conversation_id,
+    model = excluded.model,
+    created_at = excluded.created_at,
+    dimension = excluded.dimension,
+    vector = excluded.vector
+"""
+_EMBEDDING_COLUMNS = "id, message_id, conversation_id, model, created_at, vector"
+_SELECT_EMBEDDING = f"SELECT {_EMBEDDING_COLUMNS} FROM embeddings WHERE message_id = ?"
+_SCAN_EMBEDDINGS = (
+    f"SELECT {_EMBEDDING_COLUMNS} FROM embeddings WHERE dimension = ? ORDER BY rowid"
+)
+_DELETE_EMBEDDINGS = "DELETE FROM embeddings WHERE conversation_id = ?"
+_DELETE_EXPIRED_EMBEDDINGS = """
+DELETE FROM embeddings WHERE message_id IN (
+    SELECT message_id FROM embeddings WHERE created_at < ? ORDER BY created_at LIMIT ?
+)
+"""
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width text keeps lexicographic order equal to time order, which
+    # the updated_at keyset and created_at expiry queries rely on.
+    return value.isoformat(timespec="microseconds")
+
+
+class SQLiteDatabase:
+    """One WAL-mode SQLite connection shared by the SQLite memory stores.
+
+    The connection is opened on, and only used from, a dedicated
+    single-thread executor: store coroutines hand their statements to it via
+    :meth:`run` and :meth:`write` and await the result, so the event loop
+    never blocks on SQLite and the one worker serialises access to the
+    connection. ``database is locked`` and other operational errors surface
+    as :class:`RetryableStorageError`; constraint and schema errors as
+    :class:`FatalStorageError`.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_SQLITE_PATH, *, timeout: float = 5.0) -> None:
+        target = str(path)
+        if target != ":memory:":
+            Path(target).parent.mkdir(parents=True, exist_ok=True)
+        self._path = target
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="katamari-sqlite")
+        try:
+            self._conn = self._executor.submit(self._connect, target, timeout).result()
+        except BaseException:
+            self._executor.shutdown(wait=False)
+            raise
+
+    def _connect(self, target: str, timeout: float) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            target, timeout=timeout, isolation_level=None, cached_statements=256
+        )
+        try:
+            with self._errors():
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(_SCHEMA)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def journal_mode(self) -> str:
+        """Current journal mode; blocks on the worker, so keep it off hot paths."""
+        row = self._executor.submit(
+            self._call, lambda conn: conn.execute("PRAGMA journal_mode").fetchone()
+        ).result()
+        return str(row[0])
+
+    @contextmanager
+    def _errors(self) -> Iterator[None]:
+        try:
+            yield
+        except sqlite3.OperationalError as exc:
+            raise RetryableStorageError(f"sqlite: {exc}") from exc
+        except sqlite3.Error as exc:
+            raise FatalStorageError(f"sqlite: {exc}") from exc
+
+    def _call(self, fn: Callable[[sqlite3.Connection], _T]) -> _T:
+        with self._errors():
+            return fn(self._conn)
+
+    def _transact(self, fn: Callable[[sqlite3.Connection], _T]) -> _T:
+        with self._errors():
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    async def run(self, fn: Callable[[sqlite3.Connection], _T]) -> _T:
+        """Call ``fn(connection)`` on the database thread and await its result."""
+
+        return await asyncio.wrap_future(self._executor.submit(self._call, fn))
+
+    async def write(self, fn: Callable[[sqlite3.Connection], _T]) -> _T:
+        """Like :meth:`run`, inside one ``BEGIN IMMEDIATE`` transaction."""
+
+        return await asyncio.wrap_future(self._executor.submit(self._transact, fn))
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Any:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Any]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    def close(self) -> None:
+        self._executor.submit(self._conn.close).result()
+        self._executor.shutdown(wait=True)
+
+
+class SQLiteMetadataStore(MetadataStore):
+    """SQLite implementation of metadata storage."""
+
+    def __init__(self, database: SQLiteDatabase) -> None:
+        self._db = database
+
+    @staticmethod
+    def _row(conversation: ConversationMetadata) -> Tuple[Any, ...]:
+        return (
+            conversation.id,
+            conversation.user_id,
+            conversation.model,
+            conversation.chain,
+            conversation.persona,
+            _timestamp(conversation.created_at),
+            _timestamp(conversation.updated_at),
+            conversation.token_count,
+            conversation.compress_ratio,
+            conversation.semantic_retention,
+            json.dumps(conversation.metadata, ensure_ascii=False),
+        )
+
+    @staticmethod
+    def _from_row(row: Sequence[Any]) -> ConversationMetadata:
+        return ConversationMetadata(
+            id=row[0],
+            user_id=row[1],
+            model=row[2],
+            chain=row[3],
+            persona=row[4],
+            created_at=datetime.fromisoformat(row[5]),
+            updated_at=datetime.fromisoformat(row[6]),
+            token_count=row[7],
+            compress_ratio=row[8],
+            semantic_retention=row[9],
+            metadata=json.loads(row[10]),
+        )
+
+    async def save_conversation(self, conversation: ConversationMetadata) -> None:
+        row = self._row(conversation)
+        await self._db.write(lambda conn: conn.execute(_UPSERT_CONVERSATION, row))
+
+    async def get_conversation(self, conversation_id: str) -> Optional[ConversationMetadata]:
+        row = await self._db.fetchone(_SELECT_CONVERSATION, (conversation_id,))
+        return None if row is None else self._from_row(row)
+
+    async def list_conversations(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[ConversationMetadata]:
+        if user_id:
+            rows = await self._db.fetchall(_LIST_USER_CONVERSATIONS, (user_id, limit, offset))
+        else:
+            rows = await self._db.fetchall(_LIST_CONVERSATIONS, (limit, offset))
+        return [self._from_row(row) for row in rows]
+
+    async def list_conversations_page(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[ConversationCursor] = None,
+    ) -> ConversationPage:
+        if limit <= 0:
+            return ConversationPage(conversations=[])
+        params: List[Any] = [user_id] if user_id else []
+        if after is not None:
+            params += [_timestamp(after.updated_at), after.id]
+            sql = _PAGE_USER_CONVERSATIONS_AFTER if user_id else _PAGE_CONVERSATIONS_AFTER
+        else:
+            sql = _PAGE_USER_CONVERSATIONS if user_id else _PAGE_CONVERSATIONS
+        rows = await self._db.fetchall(sql, params + [limit + 1])
+        return build_conversation_page((self._from_row(row) for row in rows), limit)
+
+    async def list_conversation_ids_before(
+        self, cutoff: datetime, limit: int = 100
+    ) -> List[str]:
+        if limit <= 0:
+            return []
+        rows = await self._db.fetchall(_EXPIRED_CONVERSATIONS, (_timestamp(cutoff), limit))
+        return [str(row[0]) for row in rows]
+
+    async def delete_conversation(self, conversation_id: str) -> bool:
+        deleted = await self._db.write(
+            lambda conn: conn.execute(_DELETE_CONVERSATION, (conversation_id,)).rowcount
+        )
+        return deleted > 0
+
+
+class SQLiteMessageStore(MessageStore):
+    """SQLite implementation of message storage.
+
+    Messages are returned in insertion order; re-saving an id updates the
+    row in place.
+    """
+
+    def __init__(self, database: SQLiteDatabase) -> None:
+        self._db = database
+
+    @staticmethod
+    def _row(message: ConversationMessage) -> Tuple[Any, ...]:
+        return (
+            message.id,
+            message.conversation_id,
+            message.role.value,
+            message.content,
+            _timestamp(message.created_at),
+            json.dumps(message.metadata, ensure_ascii=False),
+        )
+
+    async def save_message(self, message: ConversationMessage) -> None:
+        row = self._row(message)
+        await self._db.write(lambda conn: conn.execute(_UPSERT_MESSAGE, row))
+
+    async def save_messages(self, messages: Sequence[ConversationMessage]) -> None:
+        """Insert ``messages`` with one ``executemany`` inside one transaction."""
+
+        if not messages:
+            return
+        rows = [self._row(message) for message in messages]
+        await self._db.write(lambda conn: conn.executemany(_UPSERT_MESSAGE, rows))
+
+    @staticmethod
+    def _from_row(row: Sequence[Any]) -> ConversationMessage:
+        return ConversationMessage(
+            id=row[0],
+            conversation_id=row[1],
+            role=MessageType(row[2]),
+            content=row[3],
+            created_at=datetime.fromisoformat(row[4]),
+            metadata=json.loads(row[5]),
+        )
+
+    async def get_messages(self, conversation_id: str) -> List[ConversationMessage]:
+        rows = await self._db.fetchall(_SELECT_MESSAGES, (conversation_id,))
+        return [self._from_row(row) for row in rows]
+
+    async def get_recent_messages(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[str] = None,
+    ) -> List[ConversationMessage]:
+        if limit <= 0:
+            return []
+        if before is None:
+            rows = await self._db.fetchall(_RECENT_MESSAGES, (conversation_id, limit))
+        else:
+            rows = await self._db.fetchall(
+                _RECENT_MESSAGES_BEFORE, (conversation_id, before, conversation_id, limit)
+            )
+        return [self._from_row(row) for row in reversed(rows)]
+
+    async def iter_messages(
+        self,
+        conversation_id: str,
+        *,
+        batch_size: int = 100,
+        newest_first: bool = False,
+    ) -> AsyncIterator[ConversationMessage]:
+        # Keyset pages on rowid; the worker is only held per page, not between yields.
+        sql = _MESSAGES_BEFORE_ROWID if newest_first else _MESSAGES_AFTER_ROWID
+        position = _MAX_ROWID if newest_first else 0
+        while True:
+            rows = await self._db.fetchall(sql, (conversation_id, position, max(1, batch_size)))
+            for row in rows:
+                yield self._from_row(row[1:])
+            if len(rows) < max(1, batch_size):
+                return
+            position = int(rows[-1][0])
+
+    async def delete_messages(self, conversation_id: str) -> int:
+        return int(
+            await self._db.write(
+                lambda conn: conn.execute(_DELETE_MESSAGES, (conversation_id,)).rowcount
+            )
+        )
+
+
+class SQLiteEmbeddingStore(EmbeddingStore):
+    """SQLite implementation of embedding storage.
+
+    Vectors are stored as raw float32 blobs. ``search_similar`` pages through
+    rows of the query's dimension ``scan_batch_size`` at a time and scores
+    each page with NumPy on the database thread, keeping only the running
+    top ``limit``.
+    """
+
+    def __init__(self, database: SQLiteDatabase, *, scan_batch_size: int = 1024) -> None:
+        if scan_batch_size <= 0:
+            raise ValueError("scan_batch_size must be positive")
+        self._db = database
+        self._scan_batch_size = scan_batch_size
+
+    @staticmethod
+    def _row(record: EmbeddingRecord) -> Tuple[Any, ...]:
+        return (
+            record.message_id,
+            record.id,
+            record.conversation_id,
+            record.model,
+            _timestamp(record.created_at),
+            len(record.embedding),
+            encode_vector(record.embedding),
+        )
+
+    @staticmethod
+    def _from_row(row: Sequence[Any]) -> EmbeddingRecord:
+        return EmbeddingRecord(
+            id=row[0],
+            message_id=row[1],
+            conversation_id=row[2],
+            embedding=decode_vector(row[5]),
+            model=row[3],
+            created_at=datetime.fromisoformat(row[4]),
+        )
+
+    async def save_embedding(self, record: EmbeddingRecord) -> None:
+        row = self._row(record)
+        await self._db.write(lambda conn: conn.execute(_UPSERT_EMBEDDING, row))
+
+    async def save_embeddings(self, records: Sequence[EmbeddingRecord]) -> None:
+        """Upsert ``records`` with one ``executemany`` inside one transaction."""
+
+        if not records:
+            return
+        rows = [self._row(record) for record in records]
+        await self._db.write(lambda conn: conn.executemany(_UPSERT_EMBEDDING, rows))
+
+    async def get_embedding(self, message_id: str) -> Optional[EmbeddingRecord]:
+        row = await self._db.fetchone(_SELECT_EMBEDDING, (message_id,))
+        return None if row is None else self._from_row(row)
+
+    async def search_similar(
+        self,
+        embedding: Sequence[float],
+        limit: int = 10,
+        threshold: float = 0.8,
+    ) -> List[EmbeddingRecord]:
+        if limit <= 0:
+            return []
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0:
+            return []
+        query = query / query_norm
+
+        def _scan(conn: sqlite3.Connection) -> List[Any]:
+            best: List[Tuple[float, int, Any]] = []
+            seen = 0
+            cursor = conn.execute(_SCAN_EMBEDDINGS, (query.shape[0],))
+            try:
+                while True:
+                    rows = cursor.fetchmany(self._scan_batch_size)
+                    if not rows:
+                        break
+                    matrix = np.frombuffer(b"".join(row[5] for row in rows), dtype=np.float32)
+                    matrix = matrix.reshape(len(rows), query.shape[0])
+                    norms = np.linalg.norm(matrix, axis=1)
+                    norms[norms == 0] = np.inf
+                    scores = (matrix @ query) / norms
+                    page = [
+                        (float(scores[index]), seen + int(index), rows[index])
+                        for index in np.flatnonzero(scores >= threshold)
+                    ]
+                    seen += len(rows)
+                    # Ties keep insertion order, matching the in-memory store.
+                    best = heapq.nlargest(
+                        limit, best + page, key=lambda item: (item[0], -item[1])
+                    )
+            finally:
+                cursor.close()
+            return [row for _, _, row in best]
+
+        return [self._from_row(row) for row in await self._db.run(_scan)]
+
+    async def delete_embeddings(self, conversation_id: str) -> int:
+        return int(
+            await self._db.write(
+                lambda conn: conn.execute(_DELETE_EMBEDDINGS, (conversation_id,)).rowcount
+            )
+        )
+
+    async def delete_embeddings_before(self, cutoff: datetime, limit: int = 100) -> int:
+        if limit <= 0:
+            return 0
+        params = (_timestamp(cutoff), limit)
+        return int(
+            await self._db.write(
+                lambda conn: conn.execute(_DELETE_EXPIRED_EMBEDDINGS, params).rowcount
+            )
+        )
+
+
+class SQLiteMemoryStore(MemoryStore):
+    """MemoryStore whose conversation writes share one SQLite transaction."""
+
+    def __init__(self, database: SQLiteDatabase) -> None:
+        super().__init__(
+            metadata_store=SQLiteMetadataStore(database),
+            message_store=SQLiteMessageStore(database),
+            embedding_store=SQLiteEmbeddingStore(database),
+        )
+        self._database = database
+
+    @property
+    def database(self) -> SQLiteDatabase:
+        return self._database
+
+    async def save_conversation_with_messages(
+        self,
+        conversation: ConversationMetadata,
+        messages: List[ConversationMessage],
+    ) -> None:
+        """Upsert the conversation and all messages in one transaction."""
+        row = SQLiteMetadataStore._row(conversation)
+        rows = [SQLiteMessageStore._row(message) for message in messages]
+
+        def _save(conn: sqlite3.Connection) -> None:
+            conn.execute(_UPSERT_CONVERSATION, row)
+            if rows:
+                conn.executemany(_UPSERT_MESSAGE, rows)
+
+        await self._database.write(_save)
+
+
+def create_sqlite_store(path: str | Path = DEFAULT_SQLITE_PATH) -> MemoryStore:
+    """Create a MemoryStore whose three stores share one SQLite database."""
+    return SQLiteMemoryStore(SQLiteDatabase(path))
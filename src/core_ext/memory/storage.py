@@ -2,11 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
+import base64
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional, Sequence
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+BatchEmbedFunc = Callable[[Sequence[str]], Awaitable[Sequence[Sequence[float]]]]
 
 
 class StorageError(Exception):
@@ -153,6 +168,58 @@ class EmbeddingRecord:
         )
 
 
+@dataclass(frozen=True)
+class ConversationCursor:
+    """Keyset position in the ``updated_at`` (newest first) conversation order."""
+
+    updated_at: datetime
+    id: str
+
+    @property
+    def key(self) -> Tuple[datetime, str]:
+        return (self.updated_at, self.id)
+
+    def encode(self) -> str:
+        """Opaque URL-safe token for handing the cursor to clients."""
+        raw = f"{self.updated_at.isoformat()}|{self.id}".encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @classmethod
+    def decode(cls, token: str) -> "ConversationCursor":
+        try:
+            raw = base64.urlsafe_b64decode(token.encode("ascii")).decode("utf-8")
+            updated_at, conversation_id = raw.split("|", 1)
+            return cls(updated_at=datetime.fromisoformat(updated_at), id=conversation_id)
+        except (ValueError, UnicodeError) as exc:
+            raise ValueError(f"invalid conversation cursor: {token!r}") from exc
+
+
+@dataclass
+class ConversationPage:
+    """One page of conversations and the cursor for the next, if any."""
+
+    conversations: List[ConversationMetadata]
+    next_cursor: Optional[ConversationCursor] = None
+
+
+def build_conversation_page(
+    ordered: Iterable[ConversationMetadata], limit: int
+) -> ConversationPage:
+    """Take ``limit`` items from a newest-first iterable holding one extra lookahead row."""
+    conversations: List[ConversationMetadata] = []
+    has_more = False
+    for conversation in ordered:
+        if len(conversations) >= limit:
+            has_more = True
+            break
+        conversations.append(conversation)
+    next_cursor = None
+    if has_more and conversations:
+        last = conversations[-1]
+        next_cursor = ConversationCursor(updated_at=last.updated_at, id=last.id)
+    return ConversationPage(conversations=conversations, next_cursor=next_cursor)
+
+
 class MetadataStore(ABC):
     """Abstract interface for metadata storage."""
 
@@ -176,6 +243,55 @@ class MetadataStore(ABC):
         """List conversations with optional filtering."""
         ...
 
+    async def list_conversations_page(
+        self,
+        user_id: Optional[str] = None,
+        limit: int = 100,
+        after: Optional[ConversationCursor] = None,
+    ) -> ConversationPage:
+        """Keyset page ordered by ``updated_at`` descending (ties by ``id``).
+
+        Pass the previous page's ``next_cursor`` as ``after`` to continue.
+        The default scans ``list_conversations``; backends override it with
+        an index.
+        """
+        if limit <= 0:
+            return ConversationPage(conversations=[])
+        conversations: List[ConversationMetadata] = []
+        offset = 0
+        while True:
+            batch = await self.list_conversations(user_id=user_id, limit=1000, offset=offset)
+            conversations.extend(batch)
+            if len(batch) < 1000:
+                break
+            offset += len(batch)
+        conversations.sort(key=lambda c: (c.updated_at, c.id), reverse=True)
+        if after is not None:
+            conversations = [c for c in conversations if (c.updated_at, c.id) < after.key]
+        return build_conversation_page(conversations, limit)
+
+    async def list_conversation_ids_before(
+        self, cutoff: datetime, limit: int = 100
+    ) -> List[str]:
+        """Ids of conversations last updated before ``cutoff``, oldest first.
+
+        Used by the retention sweeper to find expired conversations one
+        bounded batch at a time. The default scans ``list_conversations``;
+        backends override it with an ``updated_at`` index.
+        """
+        if limit <= 0:
+            return []
+        expired: List[Tuple[datetime, str]] = []
+        offset = 0
+        while True:
+            batch = await self.list_conversations(limit=1000, offset=offset)
+            expired.extend((c.updated_at, c.id) for c in batch if c.updated_at < cutoff)
+            if len(batch) < 1000:
+                break
+            offset += len(batch)
+        expired.sort()
+        return [conversation_id for _, conversation_id in expired[:limit]]
+
     @abstractmethod
     async def delete_conversation(self, conversation_id: str) -> bool:
         """Delete conversation metadata. Returns True if deleted."""
@@ -190,11 +306,60 @@ class MessageStore(ABC):
         """Save a message."""
         ...
 
+    async def save_messages(self, messages: Sequence[ConversationMessage]) -> None:
+        """Save several messages in order.
+
+        Backends override this with a single transaction or batch; the
+        default falls back to one ``save_message`` call per message.
+        """
+        for message in messages:
+            await self.save_message(message)
+
     @abstractmethod
     async def get_messages(self, conversation_id: str) -> List[ConversationMessage]:
         """Get all messages for a conversation."""
         ...
 
+    async def get_recent_messages(
+        self,
+        conversation_id: str,
+        limit: int,
+        before: Optional[str] = None,
+    ) -> List[ConversationMessage]:
+        """Return the last ``limit`` messages, oldest first.
+
+        With ``before`` (a message id) only messages saved before it are
+        considered; an id that is not in the conversation yields ``[]``.
+        The default slices ``get_messages``; backends override it with a
+        ranged query.
+        """
+        if limit <= 0:
+            return []
+        messages = await self.get_messages(conversation_id)
+        if before is not None:
+            ids = [message.id for message in messages]
+            if before not in ids:
+                return []
+            messages = messages[: ids.index(before)]
+        return messages[-limit:]
+
+    async def iter_messages(
+        self,
+        conversation_id: str,
+        *,
+        batch_size: int = 100,
+        newest_first: bool = False,
+    ) -> AsyncIterator[ConversationMessage]:
+        """Yield a conversation's messages without materializing all of them.
+
+        Backends fetch ``batch_size`` rows per round trip. ``newest_first``
+        walks backwards, e.g. to fill a token budget from the latest turn.
+        The default falls back to ``get_messages``.
+        """
+        messages = await self.get_messages(conversation_id)
+        for message in reversed(messages) if newest_first else messages:
+            yield message
+
     @abstractmethod
     async def delete_messages(self, conversation_id: str) -> int:
         """Delete all messages for a conversation. Returns count deleted."""
@@ -209,6 +374,15 @@ class EmbeddingStore(ABC):
         """Save an embedding record."""
         ...
 
+    async def save_embeddings(self, records: Sequence[EmbeddingRecord]) -> None:
+        """Save several embedding records.
+
+        Backends override this with a single transaction or batch; the
+        default falls back to one ``save_embedding`` call per record.
+        """
+        for record in records:
+            await self.save_embedding(record)
+
     @abstractmethod
     async def get_embedding(self, message_id: str) -> Optional[EmbeddingRecord]:
         """Get embedding for a message."""
@@ -229,6 +403,17 @@ class EmbeddingStore(ABC):
         """Delete embeddings for a conversation. Returns count deleted."""
         ...
 
+    async def delete_embeddings_before(self, cutoff: datetime, limit: int = 100) -> int:
+        """Delete up to ``limit`` embeddings created before ``cutoff``, oldest first.
+
+        Returns the count deleted; the retention sweeper calls it until it
+        returns less than ``limit``. Only needed when
+        ``MEMORY_EMBEDDING_TTL_DAYS`` is set; the default raises.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support embedding expiry (MEMORY_EMBEDDING_TTL_DAYS)"
+        )
+
 
 class MemoryStore:
     """Unified interface for hybrid memory storage."""
@@ -260,19 +445,58 @@ class MemoryStore:
         conversation: ConversationMetadata,
         messages: List[ConversationMessage],
     ) -> None:
-        """Save conversation metadata and messages atomically."""
+        """Save conversation metadata and messages.
+
+        Messages go through one bulk ``save_messages`` call. Backends whose
+        stores share a connection (SQLite, PostgreSQL) override this to write
+        both in a single transaction.
+        """
         await self._metadata.save_conversation(conversation)
-        for message in messages:
-            await self._messages.save_message(message)
+        if messages:
+            await self._messages.save_messages(messages)
+
+    async def save_message_embeddings(
+        self,
+        messages: Sequence[ConversationMessage],
+        embed: BatchEmbedFunc,
+        model: str,
+    ) -> List[EmbeddingRecord]:
+        """Embed ``messages`` with one batched ``embed`` call and store the records.
+
+        ``embed`` takes a list of texts and returns one vector per text (for
+        example ``EmbeddingBatcher.embed_many``). Returns the saved records;
+        nothing is written when no embedding store is configured.
+        """
+        if self._embeddings is None or not messages:
+            return []
+        vectors = await embed([message.content for message in messages])
+        if len(vectors) != len(messages):
+            raise FatalStorageError(
+                f"embedder returned {len(vectors)} vectors for {len(messages)} messages"
+            )
+        records = [
+            EmbeddingRecord(
+                id=f"emb-{message.id}",
+                message_id=message.id,
+                conversation_id=message.conversation_id,
+                embedding=list(vector),
+                model=model,
+            )
+            for message, vector in zip(messages, vectors)
+        ]
+        await self._embeddings.save_embeddings(records)
+        return records
 
     async def get_full_conversation(
         self, conversation_id: str
     ) -> Optional[tuple[ConversationMetadata, List[ConversationMessage]]]:
-        """Get conversation metadata and messages together."""
-        metadata = await self._metadata.get_conversation(conversation_id)
+        """Get conversation metadata and messages together (fetched concurrently)."""
+        metadata, messages = await asyncio.gather(
+            self._metadata.get_conversation(conversation_id),
+            self._messages.get_messages(conversation_id),
+        )
         if metadata is None:
             return None
-        messages = await self._messages.get_messages(conversation_id)
         return metadata, messages
 
     async def delete_conversation_full(self, conversation_id: str) -> bool:
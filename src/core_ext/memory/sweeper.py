@@ -0,0 +1,197 @@
+"""Background TTL sweeper that expires old conversations and embeddings."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Callable, List, Optional
+
+from ._env import _env_number, _ttl_days
+from .storage import MemoryStore
+
+DEFAULT_SWEEP_INTERVAL = 3600.0
+DEFAULT_SWEEP_BATCH_SIZE = 100
+DEFAULT_SWEEP_BATCH_DELAY = 0.05
+DEFAULT_SWEEP_MAX_BATCHES = 100
+_LOGGER = logging.getLogger("katamari.memory")
+
+SweepCallback = Callable[["SweepResult"], None]
+
+
+@dataclass
+class SweepResult:
+    """Outcome of one :meth:`RetentionSweeper.sweep` pass."""
+
+    conversations_deleted: int = 0
+    embeddings_deleted: int = 0
+    batches: int = 0
+    duration_seconds: float = 0.0
+    # False when ``max_batches`` stopped the pass with expired rows left.
+    complete: bool = True
+
+
+class RetentionSweeper:
+    """Delete conversations and embeddings that outlived their TTL.
+
+    A conversation expires once its ``updated_at`` is older than
+    ``conversation_ttl`` and is removed with its messages and embeddings;
+    embeddings older than ``embedding_ttl`` are removed on their own. Each
+    pass works in batches of ``batch_size`` rows, sleeps ``batch_delay``
+    seconds between batches and stops after ``max_batches``, so a large
+    backlog is spread over several passes instead of holding the event loop
+    or the database. ``start`` runs a pass every ``interval`` seconds (right
+    away again when the previous pass was cut short).
+    """
+
+    def __init__(
+        self,
+        store: MemoryStore,
+        *,
+        conversation_ttl: Optional[timedelta] = None,
+        embedding_ttl: Optional[timedelta] = None,
+        interval: float = DEFAULT_SWEEP_INTERVAL,
+        batch_size: int = DEFAULT_SWEEP_BATCH_SIZE,
+        batch_delay: float = DEFAULT_SWEEP_BATCH_DELAY,
+        max_batches: int = DEFAULT_SWEEP_MAX_BATCHES,
+        clock: Callable[[], datetime] = datetime.utcnow,
+        on_sweep: Optional[SweepCallback] = None,
+    ) -> None:
+        if batch_size <= 0 or max_batches <= 0:
+            raise ValueError("batch_size and max_batches must be positive")
+        if interval <= 0 or batch_delay < 0:
+            raise ValueError("interval must be positive and batch_delay non-negative")
+        self._store = store
+        self._conversation_ttl = conversation_ttl
+        self._embedding_ttl = embedding_ttl
+        self._interval = interval
+        self._batch_size = batch_size
+        self._batch_delay = batch_delay
+        self._max_batches = max_batches
+        self._clock = clock
+        self._on_sweep = on_sweep
+        self._embedding_expiry_supported = True
+        self._task: Optional[asyncio.Task[None]] = None
+        self.sweeps = 0
+        self.failures = 0
+        self.conversations_deleted = 0
+        self.embeddings_deleted = 0
+        self.last_duration = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _pause(self) -> None:
+        # Always yield, even with no delay, so other tasks run between batches.
+        await asyncio.sleep(self._batch_delay)
+
+    async def _expire_conversations(self, cutoff: datetime, result: SweepResult) -> None:
+        while result.batches < self._max_batches:
+            ids: List[str] = await self._store.metadata.list_conversation_ids_before(
+                cutoff, self._batch_size
+            )
+            if not ids:
+                return
+            result.batches += 1
+            for conversation_id in ids:
+                if await self._store.delete_conversation_full(conversation_id):
+                    result.conversations_deleted += 1
+            if len(ids) < self._batch_size:
+                return
+            await self._pause()
+        result.complete = False
+
+    async def _expire_embeddings(self, cutoff: datetime, result: SweepResult) -> None:
+        embeddings = self._store.embeddings
+        if embeddings is None or not self._embedding_expiry_supported:
+            return
+        while result.batches < self._max_batches:
+            try:
+                deleted = await embeddings.delete_embeddings_before(cutoff, self._batch_size)
+            except NotImplementedError:
+                _LOGGER.warning("%s cannot expire embeddings; skipping", type(embeddings).__name__)
+                self._embedding_expiry_supported = False
+                return
+            result.batches += 1
+            result.embeddings_deleted += deleted
+            if deleted < self._batch_size:
+                return
+            await self._pause()
+        result.complete = False
+
+    async def sweep(self) -> SweepResult:
+        """Run one bounded pass and return what it deleted."""
+
+        started = perf_counter()
+        now = self._clock()
+        result = SweepResult()
+        try:
+            if self._conversation_ttl is not None:
+                await self._expire_conversations(now - self._conversation_ttl, result)
+            if self._embedding_ttl is not None:
+                await self._expire_embeddings(now - self._embedding_ttl, result)
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            # Rows deleted before a failure still count.
+            self.conversations_deleted += result.conversations_deleted
+            self.embeddings_deleted += result.embeddings_deleted
+        result.duration_seconds = perf_counter() - started
+        self.sweeps += 1
+        self.last_duration = result.duration_seconds
+        if self._on_sweep is not None:
+            self._on_sweep(result)
+        return result
+
+    async def _run(self) -> None:
+        while True:
+            delay = self._interval
+            try:
+                result = await self.sweep()
+                if not result.complete:
+                    delay = self._batch_delay
+            except Exception:  # noqa: BLE001 - a failed pass must not stop the sweeper
+                _LOGGER.exception("memory retention sweep failed")
+            await asyncio.sleep(delay)
+
+    def start(self) -> None:
+        """Start the periodic sweep on the running loop (no-op if already running)."""
+
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the periodic sweep and wait for it to finish."""
+
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+def create_retention_sweeper(
+    store: MemoryStore, *, on_sweep: Optional[SweepCallback] = None
+) -> Optional[RetentionSweeper]:
+    """Build a sweeper from ``MEMORY_*_TTL_DAYS``; ``None`` when neither TTL is set.
+
+    ``MEMORY_SWEEP_INTERVAL_SECONDS`` and ``MEMORY_SWEEP_BATCH_SIZE`` tune the
+    schedule and batch size.
+    """
+
+    conversation_ttl = _ttl_days("MEMORY_CONVERSATION_TTL_DAYS")
+    embedding_ttl = _ttl_days("MEMORY_EMBEDDING_TTL_DAYS")
+    if conversation_ttl is None and embedding_ttl is None:
+        return None
+    return RetentionSweeper(
+        store,
+        conversation_ttl=conversation_ttl,
+        embedding_ttl=embedding_ttl,
+        interval=_env_number("MEMORY_SWEEP_INTERVAL_SECONDS", DEFAULT_SWEEP_INTERVAL),
+        batch_size=max(1, int(_env_number("MEMORY_SWEEP_BATCH_SIZE", DEFAULT_SWEEP_BATCH_SIZE))),
+        on_sweep=on_sweep,
+    )
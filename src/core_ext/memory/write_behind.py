@@ -0,0 +1,194 @@
+"""Write-behind buffer that keeps storage latency off the chat path."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Set
+
+from ._env import _env_number
+from .storage import (
+    ConversationMessage,
+    ConversationMetadata,
+    MemoryStore,
+    RetryableStorageError,
+)
+
+DEFAULT_WRITE_BEHIND_BATCH_SIZE = 32
+DEFAULT_WRITE_BEHIND_INTERVAL = 1.0
+_LOGGER = logging.getLogger("katamari.memory")
+
+
+@dataclass
+class _Pending:
+    conversation: ConversationMetadata
+    messages: List[ConversationMessage] = field(default_factory=list)
+
+
+class WriteBehindBuffer:
+    """Buffer conversation writes and persist them in per-conversation batches.
+
+    ``enqueue`` only appends to memory and never awaits the store. A
+    conversation is flushed once it holds ``batch_size`` messages, every
+    ``flush_interval`` seconds by the background task, when ``flush`` is
+    called for it (e.g. at session end) and by ``close`` on shutdown. Each
+    flush is one ``save_conversation_with_messages`` call with the latest
+    metadata. Flushes run one at a time so a conversation's batches land in
+    order; a batch that fails with ``RetryableStorageError`` is put back in
+    front of newer writes, other failures drop it after logging.
+    """
+
+    def __init__(
+        self,
+        store: MemoryStore,
+        *,
+        batch_size: int = DEFAULT_WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = DEFAULT_WRITE_BEHIND_INTERVAL,
+    ) -> None:
+        if batch_size <= 0 or flush_interval <= 0:
+            raise ValueError("batch_size and flush_interval must be positive")
+        self._store = store
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._pending: Dict[str, _Pending] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._timer: Optional[asyncio.Task[None]] = None
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self.flushes = 0
+        self.failures = 0
+        self.flushed_messages = 0
+        self.last_flush_latency = 0.0
+
+    @property
+    def store(self) -> MemoryStore:
+        return self._store
+
+    @property
+    def pending(self) -> int:
+        """Queue depth: buffered messages plus pending metadata updates."""
+        return sum(len(entry.messages) + 1 for entry in self._pending.values())
+
+    @property
+    def pending_conversations(self) -> int:
+        return len(self._pending)
+
+    def pending_messages(self, conversation_id: str) -> List[ConversationMessage]:
+        """Messages buffered for ``conversation_id`` that are not stored yet."""
+        entry = self._pending.get(conversation_id)
+        return list(entry.messages) if entry is not None else []
+
+    def _ensure_started(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._timer = loop.create_task(self._run())
+        return self._lock
+
+    def enqueue(
+        self,
+        conversation: ConversationMetadata,
+        messages: Sequence[ConversationMessage] = (),
+    ) -> None:
+        """Buffer ``conversation`` (latest wins) and append ``messages``."""
+
+        self._ensure_started()
+        entry = self._pending.get(conversation.id)
+        if entry is None:
+            entry = self._pending[conversation.id] = _Pending(conversation)
+        else:
+            entry.conversation = conversation
+        entry.messages.extend(messages)
+        if len(entry.messages) >= self._batch_size:
+            task = asyncio.get_running_loop().create_task(self._flush_quietly(conversation.id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _requeue(self, conversation_id: str, failed: _Pending) -> None:
+        newer = self._pending.get(conversation_id)
+        if newer is not None:
+            failed.conversation = newer.conversation
+            failed.messages.extend(newer.messages)
+        self._pending[conversation_id] = failed
+
+    async def _flush_one(self, conversation_id: str) -> int:
+        lock = self._ensure_started()
+        async with lock:
+            entry = self._pending.pop(conversation_id, None)
+            if entry is None:
+                return 0
+            started = perf_counter()
+            try:
+                await self._store.save_conversation_with_messages(entry.conversation, entry.messages)
+            except asyncio.CancelledError:
+                self._requeue(conversation_id, entry)
+                raise
+            except RetryableStorageError:
+                self.failures += 1
+                self._requeue(conversation_id, entry)
+                raise
+            except Exception:
+                self.failures += 1
+                raise
+            self.last_flush_latency = perf_counter() - started
+            self.flushes += 1
+            self.flushed_messages += len(entry.messages)
+            return len(entry.messages)
+
+    async def _flush_quietly(self, conversation_id: str) -> None:
+        try:
+            await self._flush_one(conversation_id)
+        except Exception:  # noqa: BLE001 - background flushes must not crash the loop
+            _LOGGER.exception("write-behind flush failed for %s", conversation_id)
+
+    async def flush(self, conversation_id: Optional[str] = None) -> int:
+        """Persist one conversation (or all) now; returns messages written."""
+
+        if conversation_id is not None:
+            return await self._flush_one(conversation_id)
+        written = 0
+        for pending_id in list(self._pending):
+            written += await self._flush_one(pending_id)
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            for conversation_id in list(self._pending):
+                await self._flush_quietly(conversation_id)
+
+    async def close(self) -> None:
+        """Stop the timer and flush everything still buffered."""
+
+        timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+            await asyncio.gather(timer, return_exceptions=True)
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        for conversation_id in list(self._pending):
+            await self._flush_quietly(conversation_id)
+        if self._pending:
+            _LOGGER.error(
+                "write-behind buffer closed with %d unsaved conversations", len(self._pending)
+            )
+        self._lock = None
+        self._loop = None
+
+
+def create_write_behind_buffer(store: MemoryStore) -> WriteBehindBuffer:
+    """Build a buffer tuned by ``MEMORY_WRITE_BEHIND_BATCH_SIZE`` and
+    ``MEMORY_WRITE_BEHIND_INTERVAL_SECONDS``."""
+
+    return WriteBehindBuffer(
+        store,
+        batch_size=max(
+            1, int(_env_number("MEMORY_WRITE_BEHIND_BATCH_SIZE", DEFAULT_WRITE_BEHIND_BATCH_SIZE))
+        ),
+        flush_interval=_env_number(
+            "MEMORY_WRITE_BEHIND_INTERVAL_SECONDS", DEFAULT_WRITE_BEHIND_INTERVAL
+        ),
+    )
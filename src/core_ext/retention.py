@@ -1,42 +1,377 @@
 from __future__ import annotations
 
-import math
+import asyncio
+import hashlib
+import inspect
+import logging
 import os
-from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Sequence, Tuple, cast
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+
+import numpy as np
+import numpy.typing as npt
 
 Message = Mapping[str, Any]
 Embedder = Callable[[str], Sequence[float]]
+BatchEmbedder = Callable[[Sequence[str]], List[Sequence[float]]]
+AsyncBatchEmbedder = Callable[[Sequence[str]], Awaitable[List[Sequence[float]]]]
 _Signature = Tuple[Tuple[str, str], ...]
 _CacheEntry = Tuple[_Signature, Embedder]
 
 _EMBEDDER_CACHE: Dict[str, _CacheEntry] = {}
+_BATCH_EMBEDDER_CACHE: Dict[str, Tuple[_Signature, BatchEmbedder]] = {}
+_ASYNC_BATCH_EMBEDDER_CACHE: Dict[str, Tuple[_Signature, AsyncBatchEmbedder]] = {}
+_ASYNC_CLIENTS: Dict[Tuple[str, str], Any] = {}
+_ASYNC_CLIENTS_LOCK = Lock()
 _MODEL_DEFAULTS: Dict[str, str] = {
     "SEMANTIC_RETENTION_OPENAI_MODEL": "text-embedding-3-large",
     "SEMANTIC_RETENTION_GEMINI_MODEL": "text-embedding-004",
 }
+_PROVIDER_MODEL_ENV: Dict[str, str] = {
+    "openai": "SEMANTIC_RETENTION_OPENAI_MODEL",
+    "gemini": "SEMANTIC_RETENTION_GEMINI_MODEL",
+}
+
+DEFAULT_EMBEDDING_CACHE_SIZE = 1024
+DEFAULT_RETENTION_QUEUE_SIZE = 32
+DEFAULT_EMBEDDING_BATCH_SIZE = 64
+DEFAULT_EMBEDDING_BATCH_LATENCY = 0.01
+_LOGGER = logging.getLogger("katamari.retention")
+_EMBEDDING_CACHE: Optional["EmbeddingCache"] = None
+_EMBEDDING_CACHE_LOCK = Lock()
+_SQLITE_MAX_PARAMS = 500
+
+
+class EmbeddingCache:
+    """Content-hash keyed LRU of embedding vectors.
+
+    Entries older than ``ttl_seconds`` are treated as misses. When ``path`` is
+    set, vectors are also written to a SQLite file so a restarted worker can
+    reuse them; the in-memory LRU stays the first lookup.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_EMBEDDING_CACHE_SIZE,
+        *,
+        ttl_seconds: Optional[float] = None,
+        path: Optional[str | Path] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._clock = clock
+        self._lock = Lock()
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, stored_at REAL NOT NULL, vector BLOB NOT NULL)"
+            )
+            if self._ttl is not None:
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE stored_at < ?", (clock() - self._ttl,)
+                )
+            self._db.commit()
+
+    @staticmethod
+    def _key(namespace: str, text: str) -> str:
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{namespace}:{digest}"
+
+    def _expired(self, stored_at: float) -> bool:
+        return self._ttl is not None and self._clock() - stored_at > self._ttl
+
+    @property
+    def persistent(self) -> bool:
+        """Whether lookups and writes may touch the SQLite file."""
+
+        return self._db is not None
+
+    def _load(self, keys: Sequence[str]) -> Dict[str, Tuple[float, List[float]]]:
+        if self._db is None or not keys:
+            return {}
+        loaded: Dict[str, Tuple[float, List[float]]] = {}
+        for start in range(0, len(keys), _SQLITE_MAX_PARAMS):
+            chunk = keys[start : start + _SQLITE_MAX_PARAMS]
+            placeholders = ", ".join("?" for _ in chunk)
+            rows = self._db.execute(
+                f"SELECT key, stored_at, vector FROM embeddings WHERE key IN ({placeholders})",
+                tuple(chunk),
+            ).fetchall()
+            for key, stored_at, vector in rows:
+                loaded[key] = (float(stored_at), array("d", vector).tolist())
+        return loaded
+
+    def get(self, namespace: str, text: str) -> Optional[List[float]]:
+        return self.get_many(namespace, [text]).get(text)
+
+    def get_many(self, namespace: str, texts: Sequence[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for ``texts``, reading the SQLite file at most once per call."""
+
+        keys = {text: self._key(namespace, text) for text in dict.fromkeys(texts)}
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            loaded = self._load([key for key in keys.values() if key not in self._entries])
+            for text, key in keys.items():
+                entry = self._entries.get(key) or loaded.get(key)
+                if entry is None or self._expired(entry[0]):
+                    self._entries.pop(key, None)
+                    self.misses += 1
+                    continue
+                self._remember(key, entry)
+                self.hits += 1
+                found[text] = list(entry[1])
+        return found
+
+    def _remember(self, key: str, entry: Tuple[float, List[float]]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, namespace: str, text: str, vector: Sequence[float]) -> None:
+        self.put_many(namespace, [(text, vector)])
+
+    def put_many(self, namespace: str, items: Iterable[Tuple[str, Sequence[float]]]) -> None:
+        """Store vectors for several texts with one SQLite transaction."""
+
+        stored_at = self._clock()
+        entries = [
+            (self._key(namespace, text), (stored_at, [float(value) for value in vector]))
+            for text, vector in items
+        ]
+        if not entries:
+            return
+        with self._lock:
+            for key, entry in entries:
+                self._remember(key, entry)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, stored_at, vector) VALUES (?, ?, ?)",
+                    [(key, entry[0], array("d", entry[1]).tobytes()) for key, entry in entries],
+                )
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def with_embedding_cache(embedder: Embedder, cache: EmbeddingCache, namespace: str) -> Embedder:
+    """Wrap ``embedder`` so repeated texts are served from ``cache``."""
+
+    def _embed(text: str) -> Sequence[float]:
+        vector = cache.get(namespace, text)
+        if vector is None:
+            vector = list(embedder(text))
+            cache.put(namespace, text, vector)
+        return vector
+
+    return _embed
+
+
+def chunked_batch_embedder(batch_embedder: BatchEmbedder, max_batch_size: int) -> BatchEmbedder:
+    """Split calls to ``batch_embedder`` into requests of at most ``max_batch_size`` texts."""
+
+    if max_batch_size <= 0:
+        raise ValueError("max_batch_size must be positive")
+
+    def _embed_batch(texts: Sequence[str]) -> List[Sequence[float]]:
+        vectors: List[Sequence[float]] = []
+        for start in range(0, len(texts), max_batch_size):
+            chunk = texts[start : start + max_batch_size]
+            embedded = batch_embedder(chunk)
+            if len(embedded) != len(chunk):
+                raise ValueError(
+                    f"batch embedder returned {len(embedded)} vectors for {len(chunk)} texts"
+                )
+            vectors.extend(embedded)
+        return vectors
+
+    return _embed_batch
 
 
-def _norm(vec: Sequence[float]) -> float:
-    return math.sqrt(sum(v * v for v in vec))
+def chunked_async_batch_embedder(
+    batch_embedder: AsyncBatchEmbedder, max_batch_size: int
+) -> AsyncBatchEmbedder:
+    """Split async batch calls into chunks of ``max_batch_size`` sent concurrently."""
+
+    if max_batch_size <= 0:
+        raise ValueError("max_batch_size must be positive")
+
+    async def _embed_batch(texts: Sequence[str]) -> List[Sequence[float]]:
+        chunks = [texts[start : start + max_batch_size] for start in range(0, len(texts), max_batch_size)]
+        results = await asyncio.gather(*(batch_embedder(chunk) for chunk in chunks))
+        vectors: List[Sequence[float]] = []
+        for chunk, embedded in zip(chunks, results):
+            if len(embedded) != len(chunk):
+                raise ValueError(
+                    f"batch embedder returned {len(embedded)} vectors for {len(chunk)} texts"
+                )
+            vectors.extend(embedded)
+        return vectors
+
+    return _embed_batch
+
+
+def with_batch_embedding_cache(
+    batch_embedder: BatchEmbedder, cache: EmbeddingCache, namespace: str
+) -> BatchEmbedder:
+    """Serve cached texts from ``cache`` and embed the rest in one batch call."""
+
+    def _embed_batch(texts: Sequence[str]) -> List[Sequence[float]]:
+        found, missing = _split_cached(cache, namespace, texts)
+        if missing:
+            _store_embedded(cache, namespace, found, missing, batch_embedder(missing))
+        return [found[text] for text in texts]
+
+    return _embed_batch
+
+
+def with_async_batch_embedding_cache(
+    batch_embedder: AsyncBatchEmbedder, cache: EmbeddingCache, namespace: str
+) -> AsyncBatchEmbedder:
+    """Async counterpart of :func:`with_batch_embedding_cache`."""
+
+    async def _embed_batch(texts: Sequence[str]) -> List[Sequence[float]]:
+        # A persistent cache does blocking SQLite I/O; keep it off the event loop.
+        if cache.persistent:
+            found, missing = await asyncio.to_thread(_split_cached, cache, namespace, texts)
+        else:
+            found, missing = _split_cached(cache, namespace, texts)
+        if missing:
+            embedded = await batch_embedder(missing)
+            if cache.persistent:
+                await asyncio.to_thread(_store_embedded, cache, namespace, found, missing, embedded)
+            else:
+                _store_embedded(cache, namespace, found, missing, embedded)
+        return [found[text] for text in texts]
+
+    return _embed_batch
+
+
+def _split_cached(
+    cache: EmbeddingCache, namespace: str, texts: Sequence[str]
+) -> Tuple[Dict[str, Sequence[float]], List[str]]:
+    found: Dict[str, Sequence[float]] = dict(cache.get_many(namespace, texts))
+    missing = [text for text in dict.fromkeys(texts) if text not in found]
+    return found, missing
+
+
+def _store_embedded(
+    cache: EmbeddingCache,
+    namespace: str,
+    found: Dict[str, Sequence[float]],
+    missing: Sequence[str],
+    embedded: Sequence[Sequence[float]],
+) -> None:
+    if len(embedded) != len(missing):
+        raise ValueError(f"batch embedder returned {len(embedded)} vectors for {len(missing)} texts")
+    for text, vector in zip(missing, embedded):
+        found[text] = list(vector)
+    cache.put_many(namespace, ((text, found[text]) for text in missing))
+
+
+def _env_float(name: str) -> Optional[float]:
+    value = (os.getenv(name) or "").strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, configured from the environment.
+
+    ``SEMANTIC_RETENTION_CACHE_SIZE``, ``SEMANTIC_RETENTION_CACHE_TTL_SECONDS``
+    and ``SEMANTIC_RETENTION_CACHE_PATH`` (SQLite file) are read once.
+    """
+
+    global _EMBEDDING_CACHE
+    with _EMBEDDING_CACHE_LOCK:
+        if _EMBEDDING_CACHE is None:
+            size = _env_float("SEMANTIC_RETENTION_CACHE_SIZE")
+            path = (os.getenv("SEMANTIC_RETENTION_CACHE_PATH") or "").strip()
+            _EMBEDDING_CACHE = EmbeddingCache(
+                int(size) if size and size > 0 else DEFAULT_EMBEDDING_CACHE_SIZE,
+                ttl_seconds=_env_float("SEMANTIC_RETENTION_CACHE_TTL_SECONDS"),
+                path=path or None,
+            )
+        return _EMBEDDING_CACHE
+
+
+def embedding_cache_stats() -> Dict[str, int]:
+    cache = _EMBEDDING_CACHE
+    if cache is None:
+        return {"hits": 0, "misses": 0, "size": 0}
+    return cache.stats()
 
 
 def _cosine_similarity(a: Sequence[float], b: Sequence[float]) -> Optional[float]:
-    if not a or not b:
+    if len(a) == 0 or len(b) == 0:
         return None
-    denom = _norm(a) * _norm(b)
+    left = np.asarray(a, dtype=np.float64)
+    right = np.asarray(b, dtype=np.float64)
+    denom = float(np.linalg.norm(left) * np.linalg.norm(right))
     if denom == 0:
         return None
-    return round(sum(x * y for x, y in zip(a, b)) / denom, 3)
+    return round(float(np.dot(left, right)) / denom, 3)
 
 
-def _aggregate(messages: Iterable[Message]) -> str:
-    parts = []
+def _message_texts(messages: Iterable[Message]) -> List[str]:
+    texts = []
     for message in messages:
         content = message.get("content")
         if not content:
             continue
-        parts.append(str(content))
-    return "\n".join(parts)
+        texts.append(str(content))
+    return texts
+
+
+def _aggregate(messages: Iterable[Message]) -> str:
+    return "\n".join(_message_texts(messages))
+
+
+def _mean_pool(vectors: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+    """Average L2-normalized rows so every message weighs the same."""
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    pooled: npt.NDArray[np.float64] = (vectors / norms).mean(axis=0)
+    return pooled
 
 
 def _normalized_model_env(name: str) -> str:
@@ -49,27 +384,14 @@ def _normalized_model_env(name: str) -> str:
     return default
 
 
-def _build_openai_embedder() -> Optional[Embedder]:
+def _openai_api_key() -> Optional[str]:
     api_key = os.getenv("OPENAI_API_KEY")
     if api_key is not None:
         api_key = api_key.strip()
-    if not api_key:
-        return None
-    try:
-        from openai import OpenAI
-    except ImportError:
-        return None
-    model = _normalized_model_env("SEMANTIC_RETENTION_OPENAI_MODEL")
-    client = OpenAI(api_key=api_key)
-
-    def _embed(text: str) -> Sequence[float]:
-        response = client.embeddings.create(model=model, input=text)
-        return cast(Sequence[float], response.data[0].embedding)
-
-    return _embed
+    return api_key or None
 
 
-def _build_gemini_embedder() -> Optional[Embedder]:
+def _gemini_api_key() -> Optional[str]:
     api_key = None
     for env_var in ("GOOGLE_GEMINI_API_KEY", "GEMINI_API_KEY"):
         value = os.getenv(env_var)
@@ -83,30 +405,160 @@ def _build_gemini_embedder() -> Optional[Embedder]:
         if fallback is not None:
             fallback = fallback.strip()
         api_key = fallback or None
-    if not api_key:
-        return None
+    return api_key
+
+
+def _configured_genai(api_key: str) -> Optional[Any]:
     try:
         import google.generativeai as genai
     except ImportError:
         return None
-    model = _normalized_model_env("SEMANTIC_RETENTION_GEMINI_MODEL")
     configure = getattr(genai, "configure", None)
     if callable(configure):
         configure(api_key=api_key)
     else:  # pragma: no cover - defensive guard
         return None
+    return genai
+
+
+def _gemini_embed_content(genai: Any, model: str, content: str | List[str]) -> Any:
+    embed_content = getattr(genai, "embed_content", None)
+    if not callable(embed_content):
+        raise RuntimeError("Gemini embed_content API unavailable")
+    response = embed_content(model=model, content=content)
+    embedding = response.get("embedding")
+    if embedding is None:
+        raise ValueError("Gemini embedding response missing 'embedding'")
+    return embedding
+
+
+def _build_openai_embedder() -> Optional[Embedder]:
+    api_key = _openai_api_key()
+    if not api_key:
+        return None
+    try:
+        from openai import OpenAI
+    except ImportError:
+        return None
+    model = _normalized_model_env("SEMANTIC_RETENTION_OPENAI_MODEL")
+    client = OpenAI(api_key=api_key)
 
     def _embed(text: str) -> Sequence[float]:
-        embed_content = getattr(genai, "embed_content", None)
-        if not callable(embed_content):
-            raise RuntimeError("Gemini embed_content API unavailable")
-        response = embed_content(model=model, content=text)
+        response = client.embeddings.create(model=model, input=text)
+        return cast(Sequence[float], response.data[0].embedding)
+
+    return _embed
+
+
+def _build_openai_batch_embedder() -> Optional[BatchEmbedder]:
+    api_key = _openai_api_key()
+    if not api_key:
+        return None
+    try:
+        from openai import OpenAI
+    except ImportError:
+        return None
+    model = _normalized_model_env("SEMANTIC_RETENTION_OPENAI_MODEL")
+    client = OpenAI(api_key=api_key)
+
+    def _embed_batch(texts: Sequence[str]) -> List[Sequence[float]]:
+        response = client.embeddings.create(model=model, input=list(texts))
+        items = sorted(response.data, key=lambda item: int(getattr(item, "index", 0)))
+        return [cast(Sequence[float], item.embedding) for item in items]
+
+    return _embed_batch
+
+
+def _build_gemini_embedder() -> Optional[Embedder]:
+    api_key = _gemini_api_key()
+    if not api_key:
+        return None
+    genai = _configured_genai(api_key)
+    if genai is None:
+        return None
+    model = _normalized_model_env("SEMANTIC_RETENTION_GEMINI_MODEL")
+
+    def _embed(text: str) -> Sequence[float]:
+        return cast(Sequence[float], _gemini_embed_content(genai, model, text))
+
+    return _embed
+
+
+def _build_gemini_batch_embedder() -> Optional[BatchEmbedder]:
+    api_key = _gemini_api_key()
+    if not api_key:
+        return None
+    genai = _configured_genai(api_key)
+    if genai is None:
+        return None
+    model = _normalized_model_env("SEMANTIC_RETENTION_GEMINI_MODEL")
+
+    def _embed_batch(texts: Sequence[str]) -> List[Sequence[float]]:
+        # ``embed_content`` accepts a list and returns one vector per entry.
+        vectors = _gemini_embed_content(genai, model, list(texts))
+        return [cast(Sequence[float], vector) for vector in vectors]
+
+    return _embed_batch
+
+
+def _shared_async_openai_client(api_key: str) -> Optional[Any]:
+    """Return the process-wide ``AsyncOpenAI`` client for ``api_key``.
+
+    Reusing one client keeps a single HTTP connection pool per worker instead
+    of one per chat turn.
+    """
+
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:
+        return None
+    with _ASYNC_CLIENTS_LOCK:
+        client = _ASYNC_CLIENTS.get(("openai", api_key))
+        if client is None:
+            client = AsyncOpenAI(api_key=api_key)
+            _ASYNC_CLIENTS[("openai", api_key)] = client
+        return client
+
+
+def _build_async_openai_batch_embedder() -> Optional[AsyncBatchEmbedder]:
+    api_key = _openai_api_key()
+    if not api_key:
+        return None
+    client = _shared_async_openai_client(api_key)
+    if client is None:
+        return None
+    model = _normalized_model_env("SEMANTIC_RETENTION_OPENAI_MODEL")
+
+    async def _embed_batch(texts: Sequence[str]) -> List[Sequence[float]]:
+        response = await client.embeddings.create(model=model, input=list(texts))
+        items = sorted(response.data, key=lambda item: int(getattr(item, "index", 0)))
+        return [cast(Sequence[float], item.embedding) for item in items]
+
+    return _embed_batch
+
+
+def _build_async_gemini_batch_embedder() -> Optional[AsyncBatchEmbedder]:
+    api_key = _gemini_api_key()
+    if not api_key:
+        return None
+    genai = _configured_genai(api_key)
+    if genai is None:
+        return None
+    model = _normalized_model_env("SEMANTIC_RETENTION_GEMINI_MODEL")
+
+    async def _embed_batch(texts: Sequence[str]) -> List[Sequence[float]]:
+        embed_content_async = getattr(genai, "embed_content_async", None)
+        if not callable(embed_content_async):
+            # SDKs without the async surface: keep the blocking call off the loop.
+            vectors = await asyncio.to_thread(_gemini_embed_content, genai, model, list(texts))
+            return [cast(Sequence[float], vector) for vector in vectors]
+        response = await embed_content_async(model=model, content=list(texts))
         embedding = response.get("embedding")
         if embedding is None:
             raise ValueError("Gemini embedding response missing 'embedding'")
-        return cast(Sequence[float], embedding)
+        return [cast(Sequence[float], vector) for vector in embedding]
 
-    return _embed
+    return _embed_batch
 
 
 def _provider_signature(provider: str) -> _Signature:
@@ -154,12 +606,166 @@ def get_embedder(provider: str) -> Optional[Embedder]:
     if embedder is None:
         _EMBEDDER_CACHE.pop(key, None)
         return None
+    model = dict(current_signature)[_PROVIDER_MODEL_ENV[key]]
+    embedder = with_embedding_cache(embedder, get_embedding_cache(), f"{key}:{model}")
     _EMBEDDER_CACHE[key] = (current_signature, embedder)
     return embedder
 
 
+def _embedding_batch_size() -> int:
+    size = _env_float("SEMANTIC_RETENTION_BATCH_SIZE")
+    return int(size) if size and size >= 1 else DEFAULT_EMBEDDING_BATCH_SIZE
+
+
+def get_batch_embedder(provider: str) -> Optional[BatchEmbedder]:
+    """Return a cached, chunked list-of-texts embedder for ``provider``.
+
+    Shares the :class:`EmbeddingCache` namespace with :func:`get_embedder`,
+    so vectors fetched either way are reused by both.
+    """
+
+    key = provider.lower()
+    current_signature = _provider_signature(key)
+    cached = _BATCH_EMBEDDER_CACHE.get(key)
+    if cached is not None and cached[0] == current_signature:
+        return cached[1]
+
+    builder: Optional[Callable[[], Optional[BatchEmbedder]]]
+    if key == "openai":
+        builder = _build_openai_batch_embedder
+    elif key == "gemini":
+        builder = _build_gemini_batch_embedder
+    else:
+        return None
+
+    batch_embedder = builder()
+    if batch_embedder is None:
+        _BATCH_EMBEDDER_CACHE.pop(key, None)
+        return None
+    model = dict(current_signature)[_PROVIDER_MODEL_ENV[key]]
+    batch_embedder = with_batch_embedding_cache(
+        chunked_batch_embedder(batch_embedder, _embedding_batch_size()),
+        get_embedding_cache(),
+        f"{key}:{model}",
+    )
+    _BATCH_EMBEDDER_CACHE[key] = (current_signature, batch_embedder)
+    return batch_embedder
+
+
+def get_async_batch_embedder(provider: str) -> Optional[AsyncBatchEmbedder]:
+    """Async counterpart of :func:`get_batch_embedder` built on pooled clients."""
+
+    key = provider.lower()
+    current_signature = _provider_signature(key)
+    cached = _ASYNC_BATCH_EMBEDDER_CACHE.get(key)
+    if cached is not None and cached[0] == current_signature:
+        return cached[1]
+
+    builder: Optional[Callable[[], Optional[AsyncBatchEmbedder]]]
+    if key == "openai":
+        builder = _build_async_openai_batch_embedder
+    elif key == "gemini":
+        builder = _build_async_gemini_batch_embedder
+    else:
+        return None
+
+    batch_embedder = builder()
+    if batch_embedder is None:
+        _ASYNC_BATCH_EMBEDDER_CACHE.pop(key, None)
+        return None
+    model = dict(current_signature)[_PROVIDER_MODEL_ENV[key]]
+    batch_size = _embedding_batch_size()
+    # One batcher per provider coalesces concurrent callers (retention,
+    # turn embeddings, recall queries) into shared provider requests.
+    batcher = EmbeddingBatcher(
+        with_async_batch_embedding_cache(
+            chunked_async_batch_embedder(batch_embedder, batch_size),
+            get_embedding_cache(),
+            f"{key}:{model}",
+        ),
+        max_batch_size=batch_size,
+    )
+
+    async def _coalesced(texts: Sequence[str]) -> List[Sequence[float]]:
+        return list(await batcher.embed_many(texts))
+
+    _ASYNC_BATCH_EMBEDDER_CACHE[key] = (current_signature, _coalesced)
+    return _coalesced
+
+
 def reset_embedder_cache() -> None:
+    global _EMBEDDING_CACHE
     _EMBEDDER_CACHE.clear()
+    _BATCH_EMBEDDER_CACHE.clear()
+    _ASYNC_BATCH_EMBEDDER_CACHE.clear()
+    with _ASYNC_CLIENTS_LOCK:
+        _ASYNC_CLIENTS.clear()
+    with _EMBEDDING_CACHE_LOCK:
+        if _EMBEDDING_CACHE is not None:
+            _EMBEDDING_CACHE.close()
+        _EMBEDDING_CACHE = None
+
+
+def _resolve_embedder(embedder: Optional[Embedder]) -> Optional[Embedder]:
+    if embedder is not None:
+        return embedder
+    provider = os.getenv("SEMANTIC_RETENTION_PROVIDER", "").strip().lower()
+    if provider in {"", "none", "off", "0", "false"}:
+        return None
+    return get_embedder(provider)
+
+
+def _resolve_batch_embedder(
+    embedder: Optional[Embedder], batch_embedder: Optional[BatchEmbedder]
+) -> Optional[BatchEmbedder]:
+    if batch_embedder is not None:
+        return batch_embedder
+    if embedder is not None:
+        single = embedder
+        return lambda texts: [single(text) for text in texts]
+    provider = os.getenv("SEMANTIC_RETENTION_PROVIDER", "").strip().lower()
+    if provider in {"", "none", "off", "0", "false"}:
+        return None
+    return get_batch_embedder(provider)
+
+
+def compute_message_retention(
+    before: Iterable[Message],
+    after: Iterable[Message],
+    embedder: Optional[Embedder] = None,
+    *,
+    batch_embedder: Optional[BatchEmbedder] = None,
+) -> Optional[float]:
+    """Cosine of mean-pooled per-message embeddings.
+
+    Each distinct message is embedded once, so with the cached embedders from
+    :func:`get_batch_embedder` a turn only pays for messages not seen before,
+    sent together in as few requests as the batch size allows.
+    """
+
+    embed_batch = _resolve_batch_embedder(embedder, batch_embedder)
+    if embed_batch is None:
+        return None
+    before_texts = _message_texts(before)
+    after_texts = _message_texts(after)
+    if not before_texts or not after_texts:
+        return None
+    unique = list(dict.fromkeys(before_texts + after_texts))
+    return _pooled_retention(before_texts, after_texts, unique, embed_batch(unique))
+
+
+def _pooled_retention(
+    before_texts: Sequence[str],
+    after_texts: Sequence[str],
+    unique: Sequence[str],
+    embedded: Sequence[Sequence[float]],
+) -> Optional[float]:
+    vectors = {
+        text: np.asarray(vector, dtype=np.float64) for text, vector in zip(unique, embedded)
+    }
+    before_vec = _mean_pool(np.stack([vectors[text] for text in before_texts]))
+    after_vec = _mean_pool(np.stack([vectors[text] for text in after_texts]))
+    return _cosine_similarity(before_vec.tolist(), after_vec.tolist())
 
 
 def compute_semantic_retention(
@@ -167,17 +773,211 @@ def compute_semantic_retention(
     after: Iterable[Message],
     embedder: Optional[Embedder] = None,
 ) -> Optional[float]:
-    provider = os.getenv("SEMANTIC_RETENTION_PROVIDER", "").strip().lower()
+    """Retention between two histories.
+
+    ``SEMANTIC_RETENTION_METHOD=per_message`` switches to
+    :func:`compute_message_retention`; the default embeds each side as one
+    concatenated text.
+    """
+
+    if os.getenv("SEMANTIC_RETENTION_METHOD", "").strip().lower() == "per_message":
+        return compute_message_retention(before, after, embedder)
+    embedder = _resolve_embedder(embedder)
     if embedder is None:
+        return None
+    before_text = _aggregate(before)
+    after_text = _aggregate(after)
+    if not before_text or not after_text:
+        return None
+    before_vec = list(embedder(before_text))
+    after_vec = list(embedder(after_text))
+    return _cosine_similarity(before_vec, after_vec)
+
+
+async def compute_semantic_retention_async(
+    before: Iterable[Message],
+    after: Iterable[Message],
+    embedder: Optional[AsyncBatchEmbedder] = None,
+) -> Optional[float]:
+    """Event-loop native :func:`compute_semantic_retention`.
+
+    Uses :func:`get_async_batch_embedder` unless ``embedder`` is given, so no
+    executor thread is taken per turn. Both methods send their texts in one
+    batched request: the two aggregated sides, or every distinct message.
+    """
+
+    if embedder is None:
+        provider = os.getenv("SEMANTIC_RETENTION_PROVIDER", "").strip().lower()
         if provider in {"", "none", "off", "0", "false"}:
             return None
-        embedder = get_embedder(provider)
+        embedder = get_async_batch_embedder(provider)
         if embedder is None:
             return None
+    if os.getenv("SEMANTIC_RETENTION_METHOD", "").strip().lower() == "per_message":
+        before_texts = _message_texts(before)
+        after_texts = _message_texts(after)
+        if not before_texts or not after_texts:
+            return None
+        unique = list(dict.fromkeys(before_texts + after_texts))
+        return _pooled_retention(before_texts, after_texts, unique, await embedder(unique))
     before_text = _aggregate(before)
     after_text = _aggregate(after)
     if not before_text or not after_text:
         return None
-    before_vec = list(embedder(before_text))
-    after_vec = list(embedder(after_text))
-    return _cosine_similarity(before_vec, after_vec)
+    before_vec, after_vec = await embedder([before_text, after_text])
+    return _cosine_similarity(list(before_vec), list(after_vec))
+
+
+RetentionJob = Callable[[], Awaitable[Optional[float]]]
+RetentionCallback = Callable[[Optional[float]], None]
+
+
+class RetentionQueue:
+    """Bounded background queue that computes semantic retention off the request path.
+
+    ``submit`` never blocks: when ``max_pending`` jobs are already waiting the
+    job is dropped and counted in ``dropped``. Jobs are coroutine functions
+    awaited by ``workers`` tasks; a failing job reports ``None`` to its callback.
+    """
+
+    def __init__(self, max_pending: int = DEFAULT_RETENTION_QUEUE_SIZE, *, workers: int = 1) -> None:
+        if max_pending <= 0:
+            raise ValueError("max_pending must be positive")
+        self._max_pending = max_pending
+        self._workers = max(1, workers)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue[Tuple[RetentionJob, RetentionCallback]]] = None
+        self._tasks: List[asyncio.Task[None]] = []
+        self.completed = 0
+        self.dropped = 0
+
+    def _ensure_started(self) -> asyncio.Queue[Tuple[RetentionJob, RetentionCallback]]:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self._max_pending)
+            self._tasks = [loop.create_task(self._worker(self._queue)) for _ in range(self._workers)]
+        return self._queue
+
+    @property
+    def pending(self) -> int:
+        return 0 if self._queue is None else self._queue.qsize()
+
+    def submit(self, job: RetentionJob, on_done: RetentionCallback) -> bool:
+        """Schedule ``job``; return ``False`` when the queue is full."""
+
+        queue = self._ensure_started()
+        try:
+            queue.put_nowait((job, on_done))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        return True
+
+    async def _worker(self, queue: asyncio.Queue[Tuple[RetentionJob, RetentionCallback]]) -> None:
+        while True:
+            job, on_done = await queue.get()
+            try:
+                try:
+                    result = await job()
+                except Exception:  # noqa: BLE001 - retention must never surface to callers
+                    _LOGGER.exception("background semantic retention failed")
+                    result = None
+                self.completed += 1
+                try:
+                    on_done(result)
+                except Exception:  # noqa: BLE001
+                    _LOGGER.exception("semantic retention callback failed")
+            finally:
+                queue.task_done()
+
+    async def drain(self) -> None:
+        """Wait until every submitted job has completed."""
+
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Cancel the workers; pending jobs are discarded."""
+
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        if tasks and self._loop is asyncio.get_running_loop():
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._queue = None
+        self._loop = None
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent ``embed`` calls into batched embedder requests.
+
+    Texts queued within ``max_latency`` seconds of the first pending one are
+    sent together; reaching ``max_batch_size`` flushes immediately. Async
+    batch embedders are awaited directly; synchronous ones run in a worker
+    thread so the event loop is never blocked.
+    """
+
+    def __init__(
+        self,
+        batch_embedder: BatchEmbedder | AsyncBatchEmbedder,
+        *,
+        max_batch_size: int = DEFAULT_EMBEDDING_BATCH_SIZE,
+        max_latency: float = DEFAULT_EMBEDDING_BATCH_LATENCY,
+    ) -> None:
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size must be positive")
+        self._batch_embedder = batch_embedder
+        self._max_batch_size = max_batch_size
+        self._max_latency = max(0.0, max_latency)
+        self._pending: List[Tuple[str, asyncio.Future[List[float]]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set[asyncio.Task[None]] = set()
+        self.calls = 0
+
+    async def embed(self, text: str) -> List[float]:
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        futures: List[asyncio.Future[List[float]]] = []
+        for text in texts:
+            future: asyncio.Future[List[float]] = loop.create_future()
+            self._pending.append((text, future))
+            futures.append(future)
+            if len(self._pending) >= self._max_batch_size:
+                self._flush()
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self._max_latency, self._flush)
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future[List[float]]]]) -> None:
+        self.calls += 1
+        try:
+            texts = [text for text, _ in batch]
+            if inspect.iscoroutinefunction(self._batch_embedder):
+                vectors = await self._batch_embedder(texts)
+            else:
+                vectors = await asyncio.to_thread(self._batch_embedder, texts)
+            if len(vectors) != len(batch):
+                raise ValueError(
+                    f"batch embedder returned {len(vectors)} vectors for {len(batch)} texts"
+                )
+        except Exception as exc:  # noqa: BLE001 - propagate to every waiter
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result([float(value) for value in vector])
@@ -0,0 +1,321 @@
+"""Trim strategies that go beyond the sliding window (see docs/addenda/D_Trim_Design.md)."""
+
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, List, Optional, Sequence, Set, Tuple, TypeVar
+
+import numpy as np
+import numpy.typing as npt
+
+from .context_trimmer import (
+    ChatMessage,
+    SlidingWindowStrategy,
+    TrimPlan,
+    TrimStrategy,
+)
+from .memory import ConversationMessage, MemoryStore
+
+Embedder = Callable[[str], Sequence[float]]
+Summarizer = Callable[[Sequence[str]], str]
+FloatMatrix = npt.NDArray[np.float64]
+
+SUMMARY_HEADER = "[summary] Earlier conversation:"
+
+_V = TypeVar("_V")
+
+
+def content_key(texts: Sequence[str]) -> str:
+    """Stable hash of ``texts`` used to key cached embeddings and summaries."""
+
+    digest = hashlib.blake2b(digest_size=16)
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+class ContentCache(Generic[_V]):
+    """Small LRU keyed by content hash."""
+
+    def __init__(self, max_entries: int) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, _V]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[_V]:
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: _V) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+def _unit_text(unit: Sequence[ChatMessage]) -> str:
+    return "\n".join(
+        f"{message.get('role', '')}: {message.get('content', '')}" for message in unit
+    )
+
+
+def _normalize_rows(vectors: FloatMatrix) -> FloatMatrix:
+    norms: FloatMatrix = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    normalized: FloatMatrix = vectors / norms
+    return normalized
+
+
+def kmeans(
+    vectors: FloatMatrix, k: int, *, iterations: int = 25
+) -> Tuple[npt.NDArray[np.intp], FloatMatrix]:
+    """Cluster rows of ``vectors`` with Lloyd's algorithm.
+
+    Initial centroids are picked by deterministic farthest-point seeding so
+    the same history always yields the same clusters (and summary cache keys).
+    Returns ``(labels, centroids)``.
+    """
+
+    count = vectors.shape[0]
+    k = max(1, min(k, count))
+    sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+    seeds = [0]
+    min_dist = sq_norms - 2.0 * vectors @ vectors[0] + sq_norms[0]
+    for _ in range(1, k):
+        candidate = int(np.argmax(min_dist))
+        seeds.append(candidate)
+        dist = sq_norms - 2.0 * vectors @ vectors[candidate] + sq_norms[candidate]
+        min_dist = np.minimum(min_dist, dist)
+    centroids = vectors[seeds].copy()
+
+    labels = np.full(count, -1, dtype=np.intp)
+    for _ in range(max(1, iterations)):
+        distances = (
+            sq_norms[:, None]
+            - 2.0 * vectors @ centroids.T
+            + np.einsum("ij,ij->i", centroids, centroids)[None, :]
+        )
+        new_labels = np.argmin(distances, axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        sizes = np.bincount(labels, minlength=k)
+        filled = sizes > 0
+        centroids[filled] = sums[filled] / sizes[filled, None]
+    return labels, centroids
+
+
+class SemanticClusteringStrategy(TrimStrategy):
+    """Summarize clusters of dropped turns instead of discarding them.
+
+    Units that the sliding window would drop are embedded, grouped with
+    k-means and replaced by one summary message. ``summary_ratio`` of the
+    budget is reserved for that message. Without a ``summarizer`` the unit
+    closest to each cluster centroid is used as an extractive summary.
+    """
+
+    name = "semantic_clustering"
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        summarizer: Optional[Summarizer] = None,
+        *,
+        max_clusters: int = 4,
+        summary_ratio: float = 0.25,
+        max_summary_chars: int = 280,
+        cache_size: int = 512,
+    ) -> None:
+        if not 0.0 < summary_ratio < 1.0:
+            raise ValueError("summary_ratio must be between 0 and 1")
+        self._embedder = embedder
+        self._summarizer = summarizer
+        self._max_clusters = max(1, max_clusters)
+        self._summary_ratio = summary_ratio
+        self._max_summary_chars = max_summary_chars
+        self.summary_cache: ContentCache[str] = ContentCache(cache_size)
+        self.embedding_cache: ContentCache[Tuple[float, ...]] = ContentCache(cache_size * 8)
+
+    def _embed(self, texts: Sequence[str]) -> FloatMatrix:
+        rows: List[Tuple[float, ...]] = []
+        for text in texts:
+            key = content_key((text,))
+            vector = self.embedding_cache.get(key)
+            if vector is None:
+                vector = tuple(float(v) for v in self._embedder(text))
+                self.embedding_cache.put(key, vector)
+            rows.append(vector)
+        return _normalize_rows(np.asarray(rows, dtype=np.float64))
+
+    def _summarize(self, texts: Sequence[str], representative: str) -> str:
+        key = content_key(texts)
+        cached = self.summary_cache.get(key)
+        if cached is not None:
+            return cached
+        if self._summarizer is not None:
+            summary = self._summarizer(texts).strip()
+        else:
+            summary = " ".join(representative.split())
+        if len(summary) > self._max_summary_chars:
+            summary = summary[: self._max_summary_chars - 1].rstrip() + "…"
+        self.summary_cache.put(key, summary)
+        return summary
+
+    def _cluster_summaries(self, texts: Sequence[str]) -> List[Tuple[int, int, str]]:
+        """Return ``(first_member, size, summary)`` per cluster."""
+
+        vectors = self._embed(texts)
+        labels, centroids = kmeans(vectors, self._max_clusters)
+        clusters: List[Tuple[int, int, str]] = []
+        for label in np.unique(labels):
+            members = [int(i) for i in np.flatnonzero(labels == label)]
+            scores = vectors[members] @ centroids[label]
+            representative = members[int(np.argmax(scores))]
+            summary = self._summarize([texts[i] for i in members], texts[representative])
+            clusters.append((members[0], len(members), summary))
+        clusters.sort()
+        return clusters
+
+    def _summary_message(
+        self, plan: TrimPlan, clusters: List[Tuple[int, int, str]], reserve: int
+    ) -> Optional[ChatMessage]:
+        remaining = list(clusters)
+        while remaining:
+            content = "\n".join([SUMMARY_HEADER] + [f"- {text}" for _, _, text in remaining])
+            if plan.count(content) <= reserve:
+                return {"role": "assistant", "content": content}
+            smallest = min(remaining, key=lambda cluster: (cluster[1], -cluster[0]))
+            remaining.remove(smallest)
+        return None
+
+    def select(self, plan: TrimPlan, budget: int) -> List[ChatMessage]:
+        window = SlidingWindowStrategy()
+        full_start = plan.window_start(budget)
+        if all(plan.forced[i] for i in range(full_start)):
+            return window.select(plan, budget)
+
+        reserve = int(budget * self._summary_ratio)
+        start = plan.window_start(budget - reserve)
+        dropped = [i for i in range(start) if not plan.forced[i]]
+        texts = [_unit_text(plan.units[i]) for i in dropped]
+        summary = self._summary_message(plan, self._cluster_summaries(texts), reserve)
+        if summary is None:
+            return window.select(plan, budget)
+        kept = [
+            message
+            for index, unit in enumerate(plan.units)
+            if plan.is_kept(index, start)
+            for message in unit
+        ]
+        return [summary] + kept
+
+
+async def recall_messages(
+    store: MemoryStore,
+    query_embedding: Sequence[float],
+    *,
+    limit: int = 8,
+    threshold: float = 0.75,
+    conversation_id: Optional[str] = None,
+) -> List[ConversationMessage]:
+    """Fetch the stored messages most similar to ``query_embedding``.
+
+    Results keep the similarity order of ``search_similar``. When
+    ``conversation_id`` is given, only that conversation is searched.
+    """
+
+    embeddings = store.embeddings
+    if embeddings is None or limit <= 0:
+        return []
+    fetch_limit = limit if conversation_id is None else limit * 4
+    records = await embeddings.search_similar(
+        query_embedding, limit=fetch_limit, threshold=threshold
+    )
+    wanted = [
+        record
+        for record in records
+        if conversation_id is None or record.conversation_id == conversation_id
+    ][:limit]
+    if not wanted:
+        return []
+
+    pending: Dict[str, Set[str]] = {}
+    for record in wanted:
+        pending.setdefault(record.conversation_id, set()).add(record.message_id)
+    found: Dict[Tuple[str, str], ConversationMessage] = {}
+    for conv_id, message_ids in pending.items():
+        # Recalled turns are usually recent; stop paging once all are found.
+        async for message in store.messages.iter_messages(conv_id, newest_first=True):
+            if message.id in message_ids:
+                found[(conv_id, message.id)] = message
+                message_ids.discard(message.id)
+                if not message_ids:
+                    break
+    return [
+        found[key]
+        for key in ((record.conversation_id, record.message_id) for record in wanted)
+        if key in found
+    ]
+
+
+class MemoryHybridStrategy(TrimStrategy):
+    """Keep a short recent window and fill the rest with recalled memory.
+
+    ``recalled`` holds earlier messages in descending relevance (see
+    :func:`recall_messages`). After forced units and at most ``recent_units``
+    recent units, the most relevant recalled messages that still fit the
+    budget are inserted, oldest first, ahead of the recent window.
+    """
+
+    name = "memory_hybrid"
+
+    def __init__(
+        self, recalled: Sequence[ConversationMessage], *, recent_units: int = 4
+    ) -> None:
+        self._recalled = list(recalled)
+        self._recent_units = max(0, recent_units)
+
+    def select(self, plan: TrimPlan, budget: int) -> List[ChatMessage]:
+        start = plan.window_start(budget)
+        window = [i for i in range(start, len(plan.units)) if not plan.forced[i]]
+        if len(window) > self._recent_units:
+            start = window[len(window) - self._recent_units - 1] + 1
+
+        kept_indices = [i for i in range(len(plan.units)) if plan.is_kept(i, start)]
+        remaining = budget - sum(plan.unit_tokens[i] for i in kept_indices)
+        seen = {
+            str(message.get("content", ""))
+            for i in kept_indices
+            for message in plan.units[i]
+        }
+        chosen: List[ConversationMessage] = []
+        for message in self._recalled:
+            if message.content in seen:
+                continue
+            tokens = plan.count(message.content)
+            if tokens > remaining:
+                continue
+            chosen.append(message)
+            seen.add(message.content)
+            remaining -= tokens
+        chosen.sort(key=lambda message: message.created_at)
+
+        recalled: List[ChatMessage] = [
+            {"role": message.role.value, "content": message.content} for message in chosen
+        ]
+        return recalled + [message for i in kept_indices for message in plan.units[i]]
@@ -0,0 +1,302 @@
+"""Chat persistence and session rehydration in :mod:`src.app`."""
+
+from __future__ import annotations
+
+import os
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from importlib import import_module
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Sequence
+
+import pytest
+
+from core_ext.memory import (
+    ConversationMessage,
+    ConversationMetadata,
+    MessageType,
+    create_in_memory_store,
+)
+
+
+@dataclass
+class _DummyMessage:
+    content: str
+
+
+class _StubUserSession:
+    def __init__(self) -> None:
+        self._store: Dict[str, Any] = {}
+
+    def get(self, key: str) -> Any:
+        return self._store.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        self._store[key] = value
+
+
+class _StubOutboundMessage:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+    async def send(self) -> None:
+        return None
+
+
+class _StubStep:
+    def __init__(self, name: str, *, type: str, show_input: bool) -> None:  # noqa: A002 - Chainlit signature
+        self.input: str | None = None
+        self.output: str | None = None
+
+    async def __aenter__(self) -> "_StubStep":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    async def stream_token(self, token: str) -> None:
+        return None
+
+
+class _StubProvider:
+    async def stream(self, model: str, messages: List[Dict[str, Any]], temperature: float) -> AsyncIterator[str]:
+        yield "reply"
+
+
+@pytest.fixture()
+def app_module(tmp_path) -> Iterator[Any]:
+    """Load ``src.app`` with isolated Chainlit state."""
+
+    app_root = tmp_path / "app"
+    app_root.mkdir()
+    previous_root = os.environ.get("CHAINLIT_APP_ROOT")
+    os.environ["CHAINLIT_APP_ROOT"] = str(app_root)
+    project_root = Path(__file__).resolve().parents[2]
+    added_paths: list[str] = []
+    for path in [project_root, project_root / "src"]:
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+            added_paths.append(str(path))
+    for module_name in [name for name in sys.modules if name.startswith("chainlit")]:
+        sys.modules.pop(module_name, None)
+    sys.modules.pop("src.app", None)
+    module = import_module("src.app")
+    yield module
+    for module_name in [name for name in sys.modules if name.startswith("chainlit")]:
+        sys.modules.pop(module_name, None)
+    sys.modules.pop("src.app", None)
+    for path in added_paths:
+        if path in sys.path:
+            sys.path.remove(path)
+    if previous_root is None:
+        os.environ.pop("CHAINLIT_APP_ROOT", None)
+    else:
+        os.environ["CHAINLIT_APP_ROOT"] = previous_root
+
+
+@pytest.fixture()
+def chat(app_module, monkeypatch: pytest.MonkeyPatch) -> Iterator[Dict[str, Any]]:
+    session = _StubUserSession()
+    for key, value in {
+        "model": "gpt-5-main",
+        "chain": "single",
+        "trim_tokens": 512,
+        "min_turns": 0,
+        "system": "system prompt",
+        "show_debug": False,
+        "history": [],
+    }.items():
+        session.set(key, value)
+    trim_inputs: List[List[Dict[str, Any]]] = []
+
+    def _fake_trim(history: Sequence[Dict[str, Any]], *_args: Any, **_kwargs: Any):
+        trim_inputs.append([dict(entry) for entry in history])
+        return list(history), {"compress_ratio": 1.0, "semantic_retention": None}
+
+    async def _no_retention(*_args: Any, **_kwargs: Any) -> None:
+        return None
+
+    store = create_in_memory_store()
+    monkeypatch.setattr(app_module.cl, "user_session", session)
+    monkeypatch.setattr(app_module.cl, "Message", _StubOutboundMessage)
+    monkeypatch.setattr(app_module.cl, "Step", _StubStep)
+    monkeypatch.setattr(app_module, "analyze_intent", lambda _text: "")
+    monkeypatch.setattr(app_module, "trim_messages", _fake_trim)
+    monkeypatch.setattr(app_module, "_ensure_semantic_retention", _no_retention)
+    monkeypatch.setattr(app_module, "get_provider", lambda model: _StubProvider())
+    monkeypatch.setattr(app_module, "get_chain_steps", lambda chain_id: ["final"])
+    monkeypatch.setattr(app_module, "_conversation_id", lambda: "thread-1")
+    monkeypatch.setattr(app_module, "create_memory_store", lambda: store)
+    monkeypatch.setenv("MEMORY_STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("MEMORY_PERSIST_CHAT", "1")
+    monkeypatch.setenv("MEMORY_WRITE_BEHIND_INTERVAL_SECONDS", "60")
+    monkeypatch.setattr(app_module, "_CHAT_MEMORY", None)
+    yield {"session": session, "store": store, "trim_inputs": trim_inputs}
+
+
+@pytest.mark.asyncio
+async def test_on_message_buffers_turns_and_shutdown_flushes_them(app_module, chat) -> None:
+    await app_module.on_message(_DummyMessage("hello"))
+
+    memory = app_module._CHAT_MEMORY
+    assert memory is not None
+    assert memory.buffer.pending_conversations == 1
+    assert await chat["store"].get_full_conversation("thread-1") is None
+
+    await app_module.on_app_shutdown()
+
+    assert app_module._CHAT_MEMORY is None
+    result = await chat["store"].get_full_conversation("thread-1")
+    assert result is not None
+    conversation, messages = result
+    assert conversation.model == "gpt-5-main"
+    assert [(m.role, m.content) for m in messages] == [
+        (MessageType.USER, "hello"),
+        (MessageType.ASSISTANT, "reply"),
+    ]
+    snapshot = app_module.METRICS_REGISTRY.snapshot()
+    assert snapshot["memory_write_queue_depth"] == 0
+    assert snapshot["memory_write_flushes_total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_rehydrates_window_from_store_and_buffer(app_module, chat, monkeypatch) -> None:
+    monkeypatch.setenv("MEMORY_REHYDRATE_MESSAGES", "3")
+    store = chat["store"]
+    stored = [
+        ConversationMessage(
+            id=f"m-{index}",
+            conversation_id="thread-1",
+            role=MessageType.USER if index % 2 == 0 else MessageType.ASSISTANT,
+            content=f"turn {index}",
+        )
+        for index in range(4)
+    ]
+    await store.save_conversation_with_messages(ConversationMetadata(id="thread-1"), stored)
+    memory = app_module._chat_memory()
+    memory.buffer.enqueue(
+        ConversationMetadata(id="thread-1"),
+        [ConversationMessage(id="m-4", conversation_id="thread-1", role=MessageType.USER, content="turn 4")],
+    )
+    chat["session"].set("history", None)
+    chat["session"].set("memory_rehydrate", True)
+
+    await app_module.on_message(_DummyMessage("again"))
+
+    assert [entry["content"] for entry in chat["trim_inputs"][0]] == [
+        "system prompt",
+        "turn 2",
+        "turn 3",
+        "turn 4",
+        "again",
+    ]
+    assert chat["session"].get("memory_rehydrate") is False
+    await app_module.on_app_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_persistence_is_opt_in(app_module, chat, monkeypatch) -> None:
+    monkeypatch.delenv("MEMORY_PERSIST_CHAT")
+
+    await app_module.on_message(_DummyMessage("hello"))
+
+    assert app_module._CHAT_MEMORY is None
+    assert await chat["store"].get_full_conversation("thread-1") is None
+
+
+@pytest.mark.asyncio
+async def test_in_process_backend_is_refused_for_chat_persistence(app_module, chat, monkeypatch) -> None:
+    monkeypatch.delenv("MEMORY_STORAGE_BACKEND")
+
+    await app_module.on_message(_DummyMessage("hello"))
+
+    assert app_module._CHAT_MEMORY is None
+
+
+@pytest.mark.asyncio
+async def test_user_turn_keeps_last_stored_metrics(app_module, chat) -> None:
+    memory = app_module._chat_memory()
+    first = app_module._conversation_metadata(
+        "thread-1", model="m", chain="single", metrics={"output_tokens": 42, "compress_ratio": 0.5}
+    )
+    second = app_module._conversation_metadata("thread-1", model="m", chain="single", metrics={})
+
+    assert (first.token_count, first.compress_ratio) == (42, 0.5)
+    assert (second.token_count, second.compress_ratio) == (42, 0.5)
+    assert second.created_at == first.created_at
+    await memory.close()
+
+
+@pytest.mark.asyncio
+async def test_memory_hybrid_strategy_uses_recalled_turns(app_module, chat, monkeypatch) -> None:
+    calls: List[Sequence[str]] = []
+
+    async def _embed(texts: Sequence[str]) -> List[List[float]]:
+        calls.append(list(texts))
+        return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setenv("TRIM_STRATEGY", "memory_hybrid")
+    monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "stub")
+    monkeypatch.setattr(app_module, "get_async_batch_embedder", lambda provider: _embed)
+    memory = app_module._chat_memory()
+    old = ConversationMessage(
+        id="m-old", conversation_id="thread-1", role=MessageType.USER, content="remember me"
+    )
+    await memory.store.save_conversation_with_messages(ConversationMetadata(id="thread-1"), [old])
+    await memory.store.save_message_embeddings([old], _embed, "stub")
+
+    assert app_module._resolve_trim_strategy() is None
+    strategy = await app_module._resolve_memory_strategy(memory, "thread-1", "what did I say?")
+
+    assert isinstance(strategy, app_module.MemoryHybridStrategy)
+    assert [message.id for message in strategy._recalled] == ["m-old"]
+    assert calls[-1] == ["what did I say?"]
+    assert await app_module._resolve_memory_strategy(memory, None, "query") is None
+    await app_module.on_app_shutdown()
+
+
+@pytest.mark.asyncio
+async def test_retention_sweeps_are_recorded_in_metrics(app_module, chat, monkeypatch) -> None:
+    monkeypatch.setenv("MEMORY_CONVERSATION_TTL_DAYS", "1")
+    monkeypatch.setattr(app_module, "METRICS_REGISTRY", app_module.MetricsRegistry())
+    await chat["store"].save_conversation_with_messages(
+        ConversationMetadata(
+            id="stale", created_at=datetime(2000, 1, 1), updated_at=datetime(2000, 1, 1)
+        ),
+        [],
+    )
+    memory = app_module._chat_memory()
+    assert memory.sweeper is not None
+
+    await memory.sweeper.sweep()
+
+    snapshot = app_module.METRICS_REGISTRY.snapshot()
+    assert snapshot["memory_retention_sweeps_total"] >= 1
+    assert snapshot["memory_retention_conversations_deleted_total"] == 1
+    await app_module.on_app_shutdown()
+
+
+def test_export_prometheus_reports_memory_write_metrics(app_module) -> None:
+    registry = app_module.MetricsRegistry()
+    registry.observe_memory_writes(queue_depth=5, flushes=3, failures=1, flush_latency_ms=2.5)
+
+    lines = registry.export_prometheus().strip().splitlines()
+
+    assert "memory_write_queue_depth 5" in lines
+    assert "memory_write_flushes_total 3" in lines
+    assert "memory_write_failures_total 1" in lines
+    assert "memory_write_flush_latency_ms 2.5" in lines
+
+
+def test_export_prometheus_reports_retention_metrics(app_module) -> None:
+    registry = app_module.MetricsRegistry()
+    registry.observe_retention_sweep(conversations_deleted=2, embeddings_deleted=5, duration_ms=1.5)
+    registry.observe_retention_sweep(conversations_deleted=1, embeddings_deleted=0, duration_ms=0.5)
+
+    lines = registry.export_prometheus().strip().splitlines()
+
+    assert "memory_retention_sweeps_total 2" in lines
+    assert "memory_retention_conversations_deleted_total 3" in lines
+    assert "memory_retention_embeddings_deleted_total 5" in lines
+    assert "memory_retention_sweep_duration_ms 0.5" in lines
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import math
 import os
@@ -166,6 +167,7 @@ async def test_on_message_computes_semantic_retention(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(trimmed_messages), dict(metrics)
 
@@ -181,7 +183,7 @@ async def test_on_message_computes_semantic_retention(
 
     calls: List[Dict[str, Any]] = []
 
-    def fake_compute(before, after):
+    async def fake_compute(before, after):
         calls.append({"before": list(before), "after": list(after)})
         return 0.8
 
@@ -189,7 +191,7 @@ async def test_on_message_computes_semantic_retention(
         return func(*args, **kwargs)
 
     monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "stub")
-    monkeypatch.setattr(app_module, "compute_semantic_retention", fake_compute)
+    monkeypatch.setattr(app_module, "compute_semantic_retention_async", fake_compute)
     monkeypatch.setattr(app_module.asyncio, "to_thread", immediate_to_thread)
 
     provider = _StubProvider(["hi"])
@@ -218,6 +220,112 @@ async def test_on_message_computes_semantic_retention(
     assert payload["semantic_retention"] == pytest.approx(0.8)
 
 
+@pytest.mark.anyio
+async def test_on_message_defers_semantic_retention_in_async_mode(
+    monkeypatch, caplog, app_module, stub_chainlit
+):
+    metrics = {
+        "input_tokens": 120,
+        "output_tokens": 60,
+        "compress_ratio": 0.5,
+        "semantic_retention": None,
+    }
+    trimmed_messages = [
+        {"role": "system", "content": "system prompt"},
+        {"role": "user", "content": "hello"},
+    ]
+
+    def _fake_trim(history, target_tokens, model, **_kwargs: Any):
+        return list(trimmed_messages), dict(metrics)
+
+    release = asyncio.Event()
+    calls: List[Dict[str, Any]] = []
+
+    async def fake_compute(before, after):
+        calls.append({"before": list(before), "after": list(after)})
+        await release.wait()
+        return 0.8
+
+    registry = app_module.MetricsRegistry()
+    queue = app_module.RetentionQueue(4)
+    monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "stub")
+    monkeypatch.setenv("SEMANTIC_RETENTION_MODE", "async")
+    monkeypatch.setattr(app_module, "trim_messages", _fake_trim)
+    monkeypatch.setattr(app_module, "compute_semantic_retention_async", fake_compute)
+    monkeypatch.setattr(app_module, "METRICS_REGISTRY", registry)
+    monkeypatch.setattr(app_module, "_RETENTION_QUEUE", queue)
+    monkeypatch.setattr(app_module, "get_provider", lambda model: _StubProvider(["hi"]))
+    monkeypatch.setattr(app_module, "get_chain_steps", lambda chain_id: ["final"])
+
+    with caplog.at_level("INFO", logger="katamari.request"):
+        await app_module.on_message(_DummyMessage("hello"))
+        assert caplog.records == []
+        assert registry.snapshot()["compress_ratio"] == pytest.approx(0.5)
+
+        release.set()
+        await queue.drain()
+        await queue.close()
+
+    assert len(calls) == 1
+    assert calls[0]["after"] == trimmed_messages
+    assert registry.snapshot()["semantic_retention"] == pytest.approx(0.8)
+    assert app_module.cl.user_session.get("trim_metrics")["semantic_retention"] == pytest.approx(0.8)
+    assert len(caplog.records) == 1
+    payload = json.loads(caplog.records[0].msg)
+    assert payload["semantic_retention"] == pytest.approx(0.8)
+    assert payload["status"] == "success"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("finishes", [True, False])
+async def test_shutdown_drains_deferred_semantic_retention(
+    monkeypatch, caplog, app_module, stub_chainlit, finishes
+):
+    metrics = {
+        "input_tokens": 120,
+        "output_tokens": 60,
+        "compress_ratio": 0.5,
+        "semantic_retention": None,
+    }
+
+    def _fake_trim(history, target_tokens, model, **_kwargs: Any):
+        return list(history), dict(metrics)
+
+    release = asyncio.Event()
+
+    async def fake_compute(before, after):
+        if not finishes:
+            await release.wait()
+        return 0.8
+
+    registry = app_module.MetricsRegistry()
+    queue = app_module.RetentionQueue(4)
+    monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "stub")
+    monkeypatch.setenv("SEMANTIC_RETENTION_MODE", "async")
+    monkeypatch.setenv("SEMANTIC_RETENTION_SHUTDOWN_TIMEOUT_SECONDS", "0.05")
+    monkeypatch.setattr(app_module, "trim_messages", _fake_trim)
+    monkeypatch.setattr(app_module, "compute_semantic_retention_async", fake_compute)
+    monkeypatch.setattr(app_module, "METRICS_REGISTRY", registry)
+    monkeypatch.setattr(app_module, "_RETENTION_QUEUE", queue)
+    monkeypatch.setattr(app_module, "get_provider", lambda model: _StubProvider(["hi"]))
+    monkeypatch.setattr(app_module, "get_chain_steps", lambda chain_id: ["final"])
+
+    with caplog.at_level("INFO", logger="katamari.request"):
+        await app_module.on_message(_DummyMessage("hello"))
+        await app_module.on_app_shutdown()
+
+    logged = [record for record in caplog.records if record.name == "katamari.request"]
+    assert len(logged) == 1
+    payload = json.loads(logged[0].msg)
+    if finishes:
+        assert payload["semantic_retention"] == pytest.approx(0.8)
+        assert registry.snapshot()["semantic_retention"] == pytest.approx(0.8)
+    else:
+        assert payload["semantic_retention"] is None
+    assert queue.pending == 0
+    assert app_module._PENDING_RETENTION == set()
+
+
 @pytest.mark.anyio
 async def test_on_message_logs_defaults_when_trim_fails(
     monkeypatch, app_module, stub_chainlit
@@ -312,6 +420,7 @@ async def test_on_message_uses_formatter_for_trim_message_when_debug_disabled(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(trimmed_messages), dict(metrics)
 
@@ -392,6 +501,7 @@ async def test_on_message_does_not_analyze_intent_when_debug_disabled(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(history), dict(metrics)
 
@@ -439,6 +549,7 @@ async def test_on_message_does_not_analyze_intent_when_false_string(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(history), dict(metrics)
 
@@ -483,6 +594,7 @@ async def test_on_message_skips_debug_when_false_string(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(trimmed_messages), dict(metrics)
 
@@ -534,6 +646,7 @@ async def test_on_message_skips_intent_analysis_when_debug_disabled(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(history), dict(metrics)
 
@@ -578,6 +691,7 @@ async def test_on_message_emits_trim_and_streams_tokens_when_debug_enabled(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(trimmed_messages), dict(metrics)
 
@@ -698,6 +812,7 @@ async def test_on_message_converts_string_nan_semantic_retention(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(trimmed_messages), dict(metrics)
 
@@ -713,7 +828,7 @@ async def test_on_message_converts_string_nan_semantic_retention(
 
     calls: List[Dict[str, Any]] = []
 
-    def fake_compute(before, after):
+    async def fake_compute(before, after):
         calls.append({"before": list(before), "after": list(after)})
         return "nan"
 
@@ -721,7 +836,7 @@ async def test_on_message_converts_string_nan_semantic_retention(
         return func(*args, **kwargs)
 
     monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "stub")
-    monkeypatch.setattr(app_module, "compute_semantic_retention", fake_compute)
+    monkeypatch.setattr(app_module, "compute_semantic_retention_async", fake_compute)
     monkeypatch.setattr(app_module.asyncio, "to_thread", immediate_to_thread)
 
     provider = _StubProvider(["hi"])
@@ -772,6 +887,7 @@ async def test_on_message_logs_nan_semantic_retention_as_null_json(
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ):
         return list(trimmed_messages), dict(metrics)
 
@@ -787,7 +903,7 @@ async def test_on_message_logs_nan_semantic_retention_as_null_json(
 
     calls: List[Dict[str, Any]] = []
 
-    def fake_compute(before, after):
+    async def fake_compute(before, after):
         calls.append({"before": list(before), "after": list(after)})
         return math.nan
 
@@ -795,7 +911,7 @@ async def test_on_message_logs_nan_semantic_retention_as_null_json(
         return func(*args, **kwargs)
 
     monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "stub")
-    monkeypatch.setattr(app_module, "compute_semantic_retention", fake_compute)
+    monkeypatch.setattr(app_module, "compute_semantic_retention_async", fake_compute)
     monkeypatch.setattr(app_module.asyncio, "to_thread", immediate_to_thread)
 
     provider = _StubProvider(["hi"])
@@ -847,6 +963,7 @@ async def test_on_message_emits_structured_log(monkeypatch, caplog, app_module,
         *,
         min_turns: int = 0,
         priority_roles: Iterable[str] | None = None,
+        **_kwargs: Any,
     ) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
         observed_min_turns["value"] = min_turns
         return list(trimmed_messages), dict(metrics)
@@ -1020,6 +1137,7 @@ async def test_on_message_logs_retryable_error(monkeypatch, caplog, app_module,
         model: str,
         *,
         min_turns: int = 0,
+        **_kwargs: Any,
     ) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
         return list(trimmed_messages), dict(metrics)
 
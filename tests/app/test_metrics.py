@@ -83,3 +83,27 @@ def test_export_prometheus_normalizes_nan_like_strings(app_module: object) -> No
     # Find semantic_retention line
     retention_line = next((line for line in lines if line.startswith("semantic_retention")), None)
     assert retention_line == "semantic_retention NaN"
+
+
+def test_export_prometheus_reports_token_cache_counters(app_module: object) -> None:
+    registry = app_module.MetricsRegistry()  # type: ignore[attr-defined]
+
+    registry.observe_token_cache(hits=3, misses=1)
+    registry.observe_token_cache(hits=2, misses=0)
+
+    lines = registry.export_prometheus().strip().splitlines()
+
+    assert "token_cache_hits_total 5" in lines
+    assert "token_cache_misses_total 1" in lines
+
+
+def test_export_prometheus_reports_embedding_cache_hit_ratio(app_module: object) -> None:
+    registry = app_module.MetricsRegistry()  # type: ignore[attr-defined]
+
+    registry.observe_embedding_cache(hits=3, misses=1)
+
+    lines = registry.export_prometheus().strip().splitlines()
+
+    assert "embedding_cache_hits_total 3" in lines
+    assert "embedding_cache_misses_total 1" in lines
+    assert "embedding_cache_hit_ratio 0.75" in lines
@@ -62,11 +62,11 @@ async def test_ensure_semantic_retention_swallow_compute_errors(
 
     calls: List[Dict[str, Any]] = []
 
-    def _boom(*args: object, **kwargs: object) -> None:
+    async def _boom(*args: object, **kwargs: object) -> None:
         calls.append({"args": args, "kwargs": kwargs})
         raise RuntimeError("boom")
 
-    monkeypatch.setattr(app_module, "compute_semantic_retention", _boom)
+    monkeypatch.setattr(app_module, "compute_semantic_retention_async", _boom)
 
     metrics: Dict[str, Any] = {}
 
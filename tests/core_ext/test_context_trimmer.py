@@ -3,7 +3,8 @@ from typing import Dict, List
 
 import pytest
 
-from src.core_ext.context_trimmer import _TokenCounter, trim_messages
+from src.core_ext import context_trimmer
+from src.core_ext.context_trimmer import TokenCountCache, _TokenCounter, trim_messages
 
 
 tiktoken = pytest.importorskip("tiktoken")
@@ -227,3 +228,179 @@ def test_trim_messages_priority_roles_survive_midstream_over_budget() -> None:
     assert developer_message in trimmed
     assert assistant_message not in trimmed
     assert trimmed[-1] == {"role": "user", "content": "latest"}
+
+
+def test_trim_messages_token_cache_only_counts_new_messages() -> None:
+    cache = TokenCountCache()
+    messages: List[Dict[str, str]] = [
+        {"role": "system", "content": "System"},
+        {"role": "user", "content": "first question"},
+        {"role": "assistant", "content": "first answer"},
+    ]
+
+    _, first_metrics = trim_messages(messages, 4096, "gpt-4o", token_cache=cache)
+    assert first_metrics["token_cache_hits"] == 0
+    assert first_metrics["token_cache_misses"] == 3
+
+    follow_up = [dict(m) for m in messages] + [{"role": "user", "content": "second"}]
+    _, second_metrics = trim_messages(follow_up, 4096, "gpt-4o", token_cache=cache)
+
+    assert second_metrics["token_cache_hits"] == 3
+    assert second_metrics["token_cache_misses"] == 1
+    assert second_metrics["input_tokens"] == first_metrics["input_tokens"] + _TokenCounter(
+        "gpt-4o"
+    ).count("second")
+
+
+def test_trim_messages_with_cache_matches_uncached_result() -> None:
+    messages: List[Dict[str, str]] = [
+        {"role": "system", "content": "System"},
+        {"role": "user", "content": "x" * 200},
+        {"role": "assistant", "content": "y" * 200},
+        {"role": "user", "content": "z" * 200},
+    ]
+
+    expected = trim_messages(messages, 16, "legacy-model", min_turns=1)
+    cached = trim_messages(messages, 16, "legacy-model", min_turns=1, token_cache=TokenCountCache())
+
+    assert cached[0] == expected[0]
+    for key in ("input_tokens", "output_tokens", "compress_ratio"):
+        assert cached[1][key] == expected[1][key]
+
+
+def test_token_count_cache_evicts_least_recently_used() -> None:
+    cache = TokenCountCache(max_entries=2)
+    cache.put("enc", "a", 1)
+    cache.put("enc", "b", 2)
+    assert cache.get("enc", "a") == 1
+    cache.put("enc", "c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("enc", "b") is None
+    assert cache.get("enc", "a") == 1
+    assert cache.get("enc", "c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2}
+
+
+def test_token_count_cache_separates_encodings() -> None:
+    cache = TokenCountCache()
+    cache.put("cl100k_base", "hello", 1)
+
+    assert cache.get("o200k_base", "hello") is None
+
+
+def test_encoding_registry_loads_each_prefix_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    context_trimmer.reset_encoding_registry()
+    calls: List[str] = []
+    original_get_encoding = context_trimmer.tiktoken.get_encoding
+
+    def _counting_get_encoding(name: str):
+        calls.append(name)
+        return original_get_encoding(name)
+
+    monkeypatch.setattr(context_trimmer.tiktoken, "get_encoding", _counting_get_encoding)
+
+    resolved = context_trimmer.warm_encodings(["gpt-5-main", "gpt-5-thinking", "legacy-model"])
+    _TokenCounter("gpt-5-main-mini")
+    trim_messages([{"role": "user", "content": "hi"}], 4096, "gpt-5-thinking-pro")
+
+    assert resolved == {
+        "gpt-5-main": "o200k_base",
+        "gpt-5-thinking": "o200k_base",
+        "legacy-model": None,
+    }
+    assert calls == ["o200k_base"]
+    first = context_trimmer.get_encoding_for_model("GPT-5-main")
+    assert first is context_trimmer.get_encoding_for_model("gpt-5-thinking-nano")
+
+
+def test_count_many_uses_encode_batch_above_threshold(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(context_trimmer, "BATCH_ENCODE_THREADS", 4)
+    monkeypatch.setattr(context_trimmer, "BATCH_ENCODE_THRESHOLD", 3)
+    counter = _TokenCounter("gpt-4o")
+    encoding = counter._encoding
+    batches: List[List[str]] = []
+    original_encode_batch = encoding.encode_batch
+
+    def _recording_encode_batch(texts, **kwargs):
+        batches.append(list(texts))
+        return original_encode_batch(texts, **kwargs)
+
+    monkeypatch.setattr(encoding, "encode_batch", _recording_encode_batch)
+    cache = TokenCountCache()
+    cache.put(counter._cache_namespace, "cached", 99)
+    counter = _TokenCounter("gpt-4o", cache=cache)
+    texts = ["alpha", "beta", "alpha", "cached", "gamma delta"]
+
+    counts = counter.count_many(texts)
+
+    assert batches == [["alpha", "beta", "gamma delta"]]
+    assert counts == [len(encoding.encode(t)) if t != "cached" else 99 for t in texts]
+
+
+def test_count_many_stays_sequential_below_threshold(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(context_trimmer, "BATCH_ENCODE_THREADS", 4)
+    counter = _TokenCounter("gpt-4o")
+
+    def _unexpected(*_args, **_kwargs):
+        raise AssertionError("encode_batch should not be used for small inputs")
+
+    monkeypatch.setattr(counter._encoding, "encode_batch", _unexpected)
+
+    assert counter.count_many(["one", "two"]) == [counter.count("one"), counter.count("two")]
+
+
+def test_trim_messages_keeps_contiguous_recent_window() -> None:
+    messages: List[Dict[str, str]] = [
+        {"role": "system", "content": "System"},
+        {"role": "user", "content": "old" * 4},
+        {"role": "assistant", "content": "huge" * 1000},
+        {"role": "user", "content": "recent" * 20},
+        {"role": "assistant", "content": "answer" * 20},
+        {"role": "user", "content": "latest"},
+    ]
+
+    trimmed, metrics = trim_messages(messages, target_tokens=128, model="legacy-model")
+
+    assert trimmed == [messages[0]] + messages[3:]
+    assert metrics["output_tokens"] == sum(
+        _TokenCounter("legacy-model").count(m["content"]) for m in trimmed
+    )
+
+
+def test_trim_messages_reserves_budget_for_priority_messages() -> None:
+    developer = {"role": "developer", "content": "d" * 800}
+    messages: List[Dict[str, str]] = [
+        {"role": "system", "content": "System"},
+        developer,
+        {"role": "user", "content": "u" * 400},
+        {"role": "assistant", "content": "a" * 400},
+        {"role": "user", "content": "latest"},
+    ]
+
+    trimmed, metrics = trim_messages(
+        messages, target_tokens=305, model="legacy-model", priority_roles=("developer",)
+    )
+
+    assert trimmed == [messages[0], developer, messages[3], messages[4]]
+    assert metrics["output_tokens"] <= 305
+
+
+def test_trim_messages_long_history_window_matches_budget() -> None:
+    messages: List[Dict[str, str]] = [{"role": "system", "content": "System"}]
+    for index in range(3000):
+        messages.append({"role": "user", "content": f"question {index} " * 4})
+        messages.append({"role": "assistant", "content": f"answer {index} " * 8})
+
+    trimmed, metrics = trim_messages(messages, target_tokens=2048, model="gpt-4o", min_turns=2)
+
+    counter = _TokenCounter("gpt-4o")
+    window_start = messages.index(trimmed[1])
+    previous_tokens = sum(
+        counter.count(m["content"]) for m in messages[window_start - 2 : window_start]
+    )
+    assert trimmed[0]["role"] == "system"
+    assert trimmed[1]["role"] == "user"
+    assert trimmed[1:] == messages[window_start:]
+    assert metrics["output_tokens"] <= 2048
+    assert metrics["output_tokens"] + previous_tokens > 2048
@@ -2,11 +2,12 @@
 
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import pytest
 
 from src.core_ext.memory import (
+    ConversationCursor,
     ConversationMessage,
     ConversationMetadata,
     EmbeddingRecord,
@@ -15,7 +16,9 @@ from src.core_ext.memory import (
     InMemoryMessageStore,
     InMemoryMetadataStore,
     MemoryStore,
+    MessageStore,
     MessageType,
+    MetadataStore,
     RetryableStorageError,
     StorageError,
     create_in_memory_store,
@@ -159,6 +162,101 @@ class TestInMemoryMetadataStore:
         deleted = await store.delete_conversation("nonexistent")
         assert deleted is False
 
+    @pytest.mark.asyncio
+    async def test_list_conversations_page_walks_keyset(
+        self, store: InMemoryMetadataStore
+    ) -> None:
+        base = datetime(2025, 1, 1)
+        for index in range(5):
+            await store.save_conversation(
+                ConversationMetadata(
+                    id=f"a-{index}", user_id="user-a", updated_at=base + timedelta(minutes=index)
+                )
+            )
+        await store.save_conversation(ConversationMetadata(id="b-0", user_id="user-b", updated_at=base))
+
+        seen: list[str] = []
+        cursor = None
+        while True:
+            page = await store.list_conversations_page(user_id="user-a", limit=2, after=cursor)
+            seen.extend(c.id for c in page.conversations)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        assert seen == ["a-4", "a-3", "a-2", "a-1", "a-0"]
+        everything = await store.list_conversations_page(limit=10)
+        # Equal updated_at values fall back to id, also descending.
+        assert [c.id for c in everything.conversations] == ["a-4", "a-3", "a-2", "a-1", "b-0", "a-0"]
+        assert everything.next_cursor is None
+
+    @pytest.mark.asyncio
+    async def test_page_index_follows_updates_and_deletes(
+        self, store: InMemoryMetadataStore
+    ) -> None:
+        base = datetime(2025, 1, 1)
+        for index in range(3):
+            await store.save_conversation(
+                ConversationMetadata(
+                    id=f"conv-{index}", user_id="user-a", updated_at=base + timedelta(minutes=index)
+                )
+            )
+
+        await store.save_conversation(
+            ConversationMetadata(id="conv-0", user_id="user-a", updated_at=base + timedelta(hours=1))
+        )
+        await store.delete_conversation("conv-2")
+        await store.save_conversation(
+            ConversationMetadata(id="conv-1", user_id="user-b", updated_at=base)
+        )
+
+        page_a = await store.list_conversations_page(user_id="user-a")
+        page_b = await store.list_conversations_page(user_id="user-b")
+        assert [c.id for c in page_a.conversations] == ["conv-0"]
+        assert [c.id for c in page_b.conversations] == ["conv-1"]
+        assert [c.id for c in (await store.list_conversations_page()).conversations] == [
+            "conv-0",
+            "conv-1",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_default_page_scans_list_conversations(self) -> None:
+        backing = InMemoryMetadataStore()
+
+        class ScanOnlyStore(MetadataStore):
+            async def save_conversation(self, conversation: ConversationMetadata) -> None:
+                await backing.save_conversation(conversation)
+
+            async def get_conversation(self, conversation_id: str):
+                return await backing.get_conversation(conversation_id)
+
+            async def list_conversations(self, user_id=None, limit=100, offset=0):
+                return await backing.list_conversations(user_id, limit, offset)
+
+            async def delete_conversation(self, conversation_id: str) -> bool:
+                return await backing.delete_conversation(conversation_id)
+
+        store = ScanOnlyStore()
+        base = datetime(2025, 1, 1)
+        for index in range(4):
+            await store.save_conversation(
+                ConversationMetadata(id=f"conv-{index}", updated_at=base + timedelta(seconds=index))
+            )
+
+        first = await store.list_conversations_page(limit=3)
+        second = await store.list_conversations_page(limit=3, after=first.next_cursor)
+
+        assert [c.id for c in first.conversations] == ["conv-3", "conv-2", "conv-1"]
+        assert [c.id for c in second.conversations] == ["conv-0"]
+        assert second.next_cursor is None
+
+    def test_cursor_token_round_trip(self) -> None:
+        cursor = ConversationCursor(updated_at=datetime(2025, 1, 2, 3, 4, 5, 6), id="conv|1")
+
+        assert ConversationCursor.decode(cursor.encode()) == cursor
+        with pytest.raises(ValueError):
+            ConversationCursor.decode("not-a-cursor")
+
 
 class TestInMemoryMessageStore:
     """Tests for InMemoryMessageStore."""
@@ -208,6 +306,115 @@ class TestInMemoryMessageStore:
         assert len(messages) == 0
 
 
+    @pytest.mark.asyncio
+    async def test_save_messages_appends_in_order(self, store: InMemoryMessageStore) -> None:
+        await store.save_messages(
+            [
+                ConversationMessage(
+                    id=f"msg-{index}",
+                    conversation_id=f"conv-{index % 2}",
+                    role=MessageType.USER,
+                    content=str(index),
+                )
+                for index in range(4)
+            ]
+        )
+
+        assert [m.content for m in await store.get_messages("conv-0")] == ["0", "2"]
+        assert [m.content for m in await store.get_messages("conv-1")] == ["1", "3"]
+
+    @pytest.mark.asyncio
+    async def test_get_messages_returns_a_copy(self, store: InMemoryMessageStore) -> None:
+        await store.save_message(
+            ConversationMessage(id="msg-1", conversation_id="conv-1", role=MessageType.USER, content="x")
+        )
+
+        (await store.get_messages("conv-1")).clear()
+
+        assert len(await store.get_messages("conv-1")) == 1
+
+    @pytest.mark.asyncio
+    async def test_recent_and_iterated_messages(self, store: InMemoryMessageStore) -> None:
+        await store.save_messages(
+            [
+                ConversationMessage(
+                    id=f"msg-{index}", conversation_id="conv-1", role=MessageType.USER, content=str(index)
+                )
+                for index in range(6)
+            ]
+        )
+
+        recent = await store.get_recent_messages("conv-1", 2)
+        earlier = await store.get_recent_messages("conv-1", 3, before="msg-2")
+        forward = [m.id async for m in store.iter_messages("conv-1")]
+        backward = [m.id async for m in store.iter_messages("conv-1", newest_first=True)]
+
+        assert [m.id for m in recent] == ["msg-4", "msg-5"]
+        assert [m.id for m in earlier] == ["msg-0", "msg-1"]
+        assert await store.get_recent_messages("conv-1", 3, before="missing") == []
+        assert await store.get_recent_messages("conv-1", 0) == []
+        assert forward == [f"msg-{index}" for index in range(6)]
+        assert backward == forward[::-1]
+
+        await store.delete_messages("conv-1")
+        assert await store.get_recent_messages("conv-1", 3, before="msg-2") == []
+
+    @pytest.mark.asyncio
+    async def test_default_ranged_reads_fall_back_to_get_messages(self) -> None:
+        stored = [
+            ConversationMessage(id=f"msg-{index}", conversation_id="conv-1", role=MessageType.USER, content="x")
+            for index in range(4)
+        ]
+
+        class ListOnlyStore(MessageStore):
+            async def save_message(self, message: ConversationMessage) -> None:
+                stored.append(message)
+
+            async def get_messages(self, conversation_id: str) -> list[ConversationMessage]:
+                return list(stored)
+
+            async def delete_messages(self, conversation_id: str) -> int:
+                return 0
+
+        store = ListOnlyStore()
+
+        assert [m.id for m in await store.get_recent_messages("conv-1", 2, before="msg-3")] == [
+            "msg-1",
+            "msg-2",
+        ]
+        assert [m.id async for m in store.iter_messages("conv-1", newest_first=True)] == [
+            "msg-3",
+            "msg-2",
+            "msg-1",
+            "msg-0",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_default_save_messages_falls_back_to_save_message(self) -> None:
+        saved: list[str] = []
+
+        class LoopingStore(MessageStore):
+            async def save_message(self, message: ConversationMessage) -> None:
+                saved.append(message.id)
+
+            async def get_messages(self, conversation_id: str) -> list[ConversationMessage]:
+                return []
+
+            async def delete_messages(self, conversation_id: str) -> int:
+                return 0
+
+        await LoopingStore().save_messages(
+            [
+                ConversationMessage(
+                    id=f"msg-{index}", conversation_id="conv-1", role=MessageType.USER, content="x"
+                )
+                for index in range(3)
+            ]
+        )
+
+        assert saved == ["msg-0", "msg-1", "msg-2"]
+
+
 class TestInMemoryEmbeddingStore:
     """Tests for InMemoryEmbeddingStore."""
 
@@ -304,6 +511,37 @@ class TestMemoryStore:
         assert result_meta.id == "conv-1"
         assert len(result_messages) == 2
 
+    @pytest.mark.asyncio
+    async def test_save_conversation_with_messages_uses_one_bulk_call(self) -> None:
+        class CountingStore(InMemoryMessageStore):
+            def __init__(self) -> None:
+                super().__init__()
+                self.single_calls = 0
+                self.bulk_calls = 0
+
+            async def save_message(self, message: ConversationMessage) -> None:
+                self.single_calls += 1
+                await super().save_message(message)
+
+            async def save_messages(self, messages) -> None:
+                self.bulk_calls += 1
+                await super().save_messages(messages)
+
+        messages_store = CountingStore()
+        store = MemoryStore(InMemoryMetadataStore(), messages_store)
+        messages = [
+            ConversationMessage(
+                id=f"msg-{index}", conversation_id="conv-1", role=MessageType.USER, content="x"
+            )
+            for index in range(200)
+        ]
+
+        await store.save_conversation_with_messages(ConversationMetadata(id="conv-1"), messages)
+
+        assert messages_store.bulk_calls == 1
+        assert messages_store.single_calls == 0
+        assert len(await messages_store.get_messages("conv-1")) == 200
+
     @pytest.mark.asyncio
     async def test_delete_conversation_full(self, store: MemoryStore) -> None:
         meta = ConversationMetadata(id="conv-1")
@@ -322,6 +560,53 @@ class TestMemoryStore:
         result = await store.get_full_conversation("conv-1")
         assert result is None
 
+    @pytest.mark.asyncio
+    async def test_save_message_embeddings_uses_one_batch_call(
+        self, store: MemoryStore
+    ) -> None:
+        calls: list[list[str]] = []
+
+        async def embed(texts):
+            calls.append(list(texts))
+            return [[float(len(text)), 0.0] for text in texts]
+
+        messages = [
+            ConversationMessage(
+                id=f"msg-{index}",
+                conversation_id="conv-1",
+                role=MessageType.USER,
+                content="x" * (index + 1),
+            )
+            for index in range(3)
+        ]
+
+        records = await store.save_message_embeddings(messages, embed, "stub-model")
+
+        assert calls == [["x", "xx", "xxx"]]
+        assert [record.id for record in records] == ["emb-msg-0", "emb-msg-1", "emb-msg-2"]
+        assert store.embeddings is not None
+        saved = await store.embeddings.get_embedding("msg-2")
+        assert saved is not None
+        assert list(saved.embedding) == [3.0, 0.0]
+        assert saved.model == "stub-model"
+
+    @pytest.mark.asyncio
+    async def test_save_message_embeddings_rejects_short_batches(
+        self, store: MemoryStore
+    ) -> None:
+        async def embed(texts):
+            return [[1.0]]
+
+        messages = [
+            ConversationMessage(
+                id=f"msg-{index}", conversation_id="conv-1", role=MessageType.USER, content="hi"
+            )
+            for index in range(2)
+        ]
+
+        with pytest.raises(FatalStorageError):
+            await store.save_message_embeddings(messages, embed, "stub-model")
+
 
 class TestStorageErrors:
     """Tests for storage error types."""
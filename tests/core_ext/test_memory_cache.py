@@ -0,0 +1,185 @@
+"""Tests for the read-through conversation cache."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import List, Optional
+
+import pytest
+
+from src.core_ext.memory import (
+    CachedMemoryStore,
+    ConversationMessage,
+    ConversationMetadata,
+    InMemoryMessageStore,
+    InMemoryMetadataStore,
+    MemoryStore,
+    MessageType,
+    create_in_memory_store,
+    create_memory_store,
+)
+
+
+def _message(index: int, conversation_id: str = "conv-1") -> ConversationMessage:
+    return ConversationMessage(
+        id=f"m-{conversation_id}-{index}",
+        conversation_id=conversation_id,
+        role=MessageType.USER,
+        content=f"turn {index}",
+    )
+
+
+class _CountingMessageStore(InMemoryMessageStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reads = 0
+        self.gate: Optional[asyncio.Event] = None
+
+    async def get_messages(self, conversation_id: str) -> List[ConversationMessage]:
+        self.reads += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return await super().get_messages(conversation_id)
+
+
+def _cached(max_entries: int = 8) -> tuple[CachedMemoryStore, _CountingMessageStore]:
+    messages = _CountingMessageStore()
+    return CachedMemoryStore(MemoryStore(InMemoryMetadataStore(), messages), max_entries=max_entries), messages
+
+
+@pytest.mark.asyncio
+async def test_repeated_reads_hit_the_cache() -> None:
+    store, messages = _cached()
+    await store.save_conversation_with_messages(ConversationMetadata(id="conv-1"), [_message(0)])
+
+    first = await store.get_full_conversation("conv-1")
+    second = await store.get_full_conversation("conv-1")
+
+    assert first is not None and second is not None
+    assert [m.id for m in second[1]] == ["m-conv-1-0"]
+    second[1].append(_message(9))
+    third = await store.get_full_conversation("conv-1")
+    assert third is not None and len(third[1]) == 1
+    assert messages.reads == 1
+    assert (store.hits, store.misses, store.size) == (2, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_missing_conversations_are_not_cached() -> None:
+    store, messages = _cached()
+
+    assert await store.get_full_conversation("nope") is None
+    assert await store.get_full_conversation("nope") is None
+
+    assert messages.reads == 2
+    assert store.size == 0
+
+
+@pytest.mark.asyncio
+async def test_writes_and_deletes_invalidate() -> None:
+    store, messages = _cached()
+    await store.save_conversation_with_messages(ConversationMetadata(id="conv-1"), [_message(0)])
+    await store.get_full_conversation("conv-1")
+
+    await store.save_conversation_with_messages(ConversationMetadata(id="conv-1", token_count=3), [_message(1)])
+    updated = await store.get_full_conversation("conv-1")
+
+    assert updated is not None
+    assert updated[0].token_count == 3
+    assert [m.id for m in updated[1]] == ["m-conv-1-0", "m-conv-1-1"]
+    assert await store.delete_conversation_full("conv-1") is True
+    assert await store.get_full_conversation("conv-1") is None
+    assert messages.reads == 3
+
+
+@pytest.mark.asyncio
+async def test_writes_through_component_stores_invalidate() -> None:
+    store, messages = _cached()
+    await store.save_conversation_with_messages(ConversationMetadata(id="conv-1"), [_message(0)])
+    await store.get_full_conversation("conv-1")
+
+    await store.messages.save_messages([_message(1)])
+    after_save = await store.get_full_conversation("conv-1")
+    await store.metadata.save_conversation(ConversationMetadata(id="conv-1", token_count=7))
+    after_metadata = await store.get_full_conversation("conv-1")
+    await store.messages.delete_messages("conv-1")
+    after_delete = await store.get_full_conversation("conv-1")
+    assert await store.metadata.delete_conversation("conv-1") is True
+
+    assert after_save is not None and [m.id for m in after_save[1]] == ["m-conv-1-0", "m-conv-1-1"]
+    assert after_metadata is not None and after_metadata[0].token_count == 7
+    assert after_delete is not None and after_delete[1] == []
+    assert await store.get_full_conversation("conv-1") is None
+    assert messages.reads == 5
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_keeps_recent_conversations() -> None:
+    store, _ = _cached(max_entries=2)
+    for index in range(3):
+        await store.save_conversation_with_messages(ConversationMetadata(id=f"conv-{index}"), [])
+    await store.get_full_conversation("conv-0")
+    await store.get_full_conversation("conv-1")
+    await store.get_full_conversation("conv-0")
+    await store.get_full_conversation("conv-2")
+
+    assert store.evictions == 1
+    hits = store.hits
+    await store.get_full_conversation("conv-0")
+    assert store.hits == hits + 1
+    await store.get_full_conversation("conv-1")
+    assert store.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_read_racing_a_write_is_not_cached() -> None:
+    store, messages = _cached()
+    await store.save_conversation_with_messages(ConversationMetadata(id="conv-1"), [_message(0)])
+    messages.gate = asyncio.Event()
+
+    read = asyncio.create_task(store.get_full_conversation("conv-1"))
+    await asyncio.sleep(0)
+    messages.gate.set()
+    await store.save_conversation_with_messages(ConversationMetadata(id="conv-1"), [_message(1)])
+    await read
+    messages.gate = None
+
+    assert store.size == 0
+
+    fresh = await store.get_full_conversation("conv-1")
+    assert fresh is not None
+    assert [m.id for m in fresh[1]] == ["m-conv-1-0", "m-conv-1-1"]
+
+
+@pytest.mark.asyncio
+async def test_get_full_conversation_fetches_concurrently() -> None:
+    messages_started = asyncio.Event()
+
+    class _WaitingMetadataStore(InMemoryMetadataStore):
+        async def get_conversation(self, conversation_id: str) -> Optional[ConversationMetadata]:
+            await messages_started.wait()
+            return await super().get_conversation(conversation_id)
+
+    class _SignallingMessageStore(InMemoryMessageStore):
+        async def get_messages(self, conversation_id: str) -> List[ConversationMessage]:
+            messages_started.set()
+            return await super().get_messages(conversation_id)
+
+    store = MemoryStore(_WaitingMetadataStore(), _SignallingMessageStore())
+    await store.save_conversation_with_messages(ConversationMetadata(id="conv-1"), [_message(0)])
+
+    result = await asyncio.wait_for(store.get_full_conversation("conv-1"), timeout=1.0)
+
+    assert result is not None and len(result[1]) == 1
+
+
+def test_factory_wraps_store_when_cache_size_set(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("MEMORY_CACHE_SIZE", "16")
+
+    store = create_memory_store("memory")
+
+    assert isinstance(store, CachedMemoryStore)
+    monkeypatch.setenv("MEMORY_CACHE_SIZE", "0")
+    assert not isinstance(create_memory_store("memory"), CachedMemoryStore)
+    with pytest.raises(ValueError):
+        CachedMemoryStore(create_in_memory_store(), max_entries=0)
@@ -0,0 +1,147 @@
+"""Tests for the binary memory record codec."""
+
+from __future__ import annotations
+
+import io
+import math
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from src.core_ext.memory import (
+    CODEC_VERSION,
+    ConversationMessage,
+    ConversationMetadata,
+    EmbeddingRecord,
+    FatalStorageError,
+    MessageType,
+    decode_record,
+    encode_record,
+    read_records,
+    write_records,
+)
+from src.core_ext.memory import codec
+
+
+def _message(**overrides: object) -> ConversationMessage:
+    fields: dict[str, object] = {
+        "id": "msg-1",
+        "conversation_id": "conv-1",
+        "role": MessageType.USER,
+        "content": "こんにちは 👋",
+        "created_at": datetime(2025, 1, 2, 3, 4, 5, 678901),
+        "metadata": {"lang": "ja", "tags": ["a", 1, None]},
+    }
+    fields.update(overrides)
+    return ConversationMessage(**fields)  # type: ignore[arg-type]
+
+
+def _embedding(vector: list[float]) -> EmbeddingRecord:
+    return EmbeddingRecord(
+        id="emb-1",
+        message_id="msg-1",
+        conversation_id="conv-1",
+        embedding=vector,
+        model="text-embedding-3-small",
+        created_at=datetime(2025, 1, 1, 0, 0, 0, 1),
+    )
+
+
+def test_message_round_trip() -> None:
+    message = _message()
+
+    payload = codec.encode_message(message)
+
+    assert payload[:4] == b"KR" + bytes([CODEC_VERSION, codec.KIND_MESSAGE])
+    assert codec.decode_message(payload) == message
+    assert decode_record(payload) == message
+    assert codec.decode_message(codec.encode_message(_message(metadata={}))).metadata == {}
+
+
+def test_conversation_round_trip_keeps_optional_fields() -> None:
+    full = ConversationMetadata(
+        id="conv-1",
+        user_id="user-a",
+        model="gpt-5-main",
+        chain="reflect",
+        persona="helper",
+        created_at=datetime(1969, 12, 31, 23, 59, 59, 999999),
+        updated_at=datetime(2025, 6, 1, tzinfo=timezone(timedelta(hours=9))),
+        token_count=2**40,
+        compress_ratio=0.25,
+        semantic_retention=0.0,
+        metadata={"k": {"nested": True}},
+    )
+    sparse = ConversationMetadata(id="conv-2", created_at=datetime(2025, 1, 1), updated_at=datetime(2025, 1, 1))
+
+    decoded = codec.decode_conversation(codec.encode_conversation(full))
+
+    assert decoded == full
+    assert decoded.updated_at.tzinfo == timezone.utc
+    assert codec.decode_conversation(codec.encode_conversation(sparse)) == sparse
+    nan = ConversationMetadata(id="conv-3", semantic_retention=math.nan)
+    retention = codec.decode_conversation(codec.encode_conversation(nan)).semantic_retention
+    assert retention is not None and math.isnan(retention)
+
+
+def test_embedding_is_stored_as_raw_float32() -> None:
+    vector = [0.5, -1.25, 2.0, 0.1]
+    record = _embedding(vector)
+
+    payload = codec.encode_embedding(record)
+    decoded = codec.decode_embedding(payload)
+
+    assert payload.endswith(np.asarray(vector, dtype="<f4").tobytes())
+    assert decoded.embedding == pytest.approx(vector)
+    assert decoded.embedding[:3] == [0.5, -1.25, 2.0]
+    assert (decoded.id, decoded.model, decoded.created_at) == (record.id, record.model, record.created_at)
+    assert codec.decode_vector(codec.encode_vector(np.array([1.5, 2.5]))) == [1.5, 2.5]
+
+
+@pytest.mark.parametrize(
+    ("payload", "message"),
+    [
+        (b"KR", "truncated"),
+        (b"XX" + bytes([CODEC_VERSION, codec.KIND_MESSAGE]), "not a binary"),
+        (b"KR" + bytes([CODEC_VERSION + 1, codec.KIND_MESSAGE]), "version"),
+        (b"KR" + bytes([CODEC_VERSION, 9]), "kind"),
+    ],
+)
+def test_decode_rejects_bad_headers(payload: bytes, message: str) -> None:
+    with pytest.raises(FatalStorageError, match=message):
+        decode_record(payload)
+
+
+def test_decode_rejects_truncated_and_trailing_bytes() -> None:
+    payload = codec.encode_message(_message())
+
+    with pytest.raises(FatalStorageError):
+        codec.decode_message(payload[:-3])
+    with pytest.raises(FatalStorageError, match="trailing"):
+        codec.decode_message(payload + b"\x00")
+    with pytest.raises(FatalStorageError, match="kind"):
+        codec.decode_conversation(payload)
+
+
+def test_record_stream_round_trip() -> None:
+    records = [
+        ConversationMetadata(id="conv-1", created_at=datetime(2025, 1, 1), updated_at=datetime(2025, 1, 2)),
+        _message(),
+        _embedding([1.0, 0.0]),
+    ]
+    buffer = io.BytesIO()
+
+    assert write_records(buffer, records) == 3
+    buffer.seek(0)
+    decoded = list(read_records(buffer))
+
+    assert [type(record) for record in decoded] == [type(record) for record in records]
+    assert decoded[:2] == records[:2]
+    assert encode_record(decoded[2]) == encode_record(records[2])
+    buffer.truncate(len(buffer.getvalue()) - 1)
+    buffer.seek(0)
+    with pytest.raises(FatalStorageError, match="truncated"):
+        list(read_records(buffer))
+    with pytest.raises(TypeError):
+        encode_record("not a record")  # type: ignore[arg-type]
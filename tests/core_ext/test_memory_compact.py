@@ -0,0 +1,112 @@
+"""Tests for the slotted compact record types."""
+
+from __future__ import annotations
+
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from src.core_ext.memory import (
+    CompactConversation,
+    CompactEmbedding,
+    CompactMessage,
+    ConversationMessage,
+    ConversationMetadata,
+    EmbeddingRecord,
+    MessageType,
+)
+from src.core_ext.memory.compact import from_epoch, to_epoch
+
+
+def _message(**overrides: object) -> ConversationMessage:
+    fields: dict[str, object] = {
+        "id": "msg-1",
+        "conversation_id": "conv-1",
+        "role": MessageType.ASSISTANT,
+        "content": "hello",
+        "created_at": datetime(2025, 1, 2, 3, 4, 5, 678901),
+    }
+    fields.update(overrides)
+    return ConversationMessage(**fields)  # type: ignore[arg-type]
+
+
+def test_epoch_round_trip_keeps_microseconds_and_treats_naive_as_utc() -> None:
+    moment = datetime(2025, 3, 4, 5, 6, 7, 123456)
+
+    assert from_epoch(to_epoch(moment)) == moment
+    assert to_epoch(moment) == to_epoch(moment.replace(tzinfo=timezone.utc))
+
+
+def test_compact_message_is_slotted_and_round_trips() -> None:
+    message = _message(metadata={"lang": "ja"})
+
+    compact = CompactMessage.from_message(message)
+
+    assert not hasattr(compact, "__dict__")
+    assert isinstance(compact.created_at, float)
+    assert compact.to_message() == message
+    assert compact.to_dict() == message.to_dict()
+    assert CompactMessage.from_dict(message.to_dict()) == compact
+    assert ConversationMessage.from_dict(compact.to_dict()) == message
+
+
+def test_empty_metadata_is_not_allocated() -> None:
+    compact = CompactMessage.from_message(_message())
+
+    assert compact.metadata is None
+    assert compact.to_message().metadata == {}
+    assert compact.to_dict()["metadata"] == {}
+
+
+def test_compact_conversation_round_trips() -> None:
+    conversation = ConversationMetadata(
+        id="conv-1",
+        user_id="user-a",
+        model="gpt-5-main",
+        created_at=datetime(2025, 1, 1),
+        updated_at=datetime(2025, 1, 2, 0, 0, 0, 1),
+        token_count=12,
+        semantic_retention=0.5,
+        metadata={"tags": ["x"]},
+    )
+
+    compact = CompactConversation.from_metadata(conversation)
+
+    assert not hasattr(compact, "__dict__")
+    assert compact.to_metadata() == conversation
+    assert CompactConversation.from_dict(conversation.to_dict()).to_dict() == conversation.to_dict()
+
+
+def test_compact_embedding_stores_float32_array() -> None:
+    record = EmbeddingRecord(
+        id="emb-1",
+        message_id="msg-1",
+        conversation_id="conv-1",
+        embedding=[0.5, -1.25, 2.0],
+        model="test",
+        created_at=datetime(2025, 1, 1, 0, 0, 1),
+    )
+
+    compact = CompactEmbedding.from_record(record)
+
+    assert isinstance(compact.embedding, array) and compact.embedding.typecode == "f"
+    assert compact.vector.dtype == np.float32
+    assert compact.to_record() == record
+    assert compact.to_dict() == record.to_dict()
+    assert CompactEmbedding.from_dict(record.to_dict()).to_record() == record
+    view = compact.vector
+    compact.embedding[0] = 9.0
+    assert view[0] == 9.0
+
+
+def test_compact_embedding_accepts_numpy_vectors() -> None:
+    vector = np.array([0.1, 0.2, 0.3], dtype=np.float64)
+    record = EmbeddingRecord(
+        id="emb-1", message_id="msg-1", conversation_id="conv-1", embedding=vector, model="test"  # type: ignore[arg-type]
+    )
+
+    compact = CompactEmbedding.from_record(record)
+
+    assert compact.vector.tolist() == pytest.approx([0.1, 0.2, 0.3])
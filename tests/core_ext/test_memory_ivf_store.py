@@ -0,0 +1,169 @@
+"""Tests for the IVF approximate nearest-neighbour embedding store."""
+
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pytest
+
+from src.core_ext.memory import (
+    EmbeddingRecord,
+    FatalStorageError,
+    IVFEmbeddingStore,
+    NumpyEmbeddingStore,
+)
+from src.core_ext.memory.ivf_store import spherical_kmeans
+
+
+def _record(index: int, vector: np.ndarray, conversation_id: str = "conv-1") -> EmbeddingRecord:
+    return EmbeddingRecord(
+        id=f"emb-{index}",
+        message_id=f"msg-{index}",
+        conversation_id=conversation_id,
+        embedding=vector.tolist(),
+        model="test",
+    )
+
+
+def _clustered(count: int, dimension: int = 16, *, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(8, dimension))
+    labels = rng.integers(0, 8, size=count)
+    return (centers[labels] + 0.2 * rng.normal(size=(count, dimension))).astype(np.float32)
+
+
+async def _filled(store, vectors: np.ndarray):
+    for index, vector in enumerate(vectors):
+        await store.save_embedding(_record(index, vector, f"conv-{index % 4}"))
+    return store
+
+
+def test_spherical_kmeans_returns_unit_centroids() -> None:
+    vectors = _clustered(200)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    centroids = spherical_kmeans(vectors, 8)
+
+    assert centroids.shape == (8, 16)
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_scans_everything_until_trained() -> None:
+    store = await _filled(IVFEmbeddingStore(n_lists=4, min_train_size=100), _clustered(20))
+
+    results = await store.search_similar(_clustered(20)[3].tolist(), limit=1, threshold=0.9)
+
+    assert not store.trained
+    assert [record.id for record in results] == ["emb-3"]
+
+
+@pytest.mark.asyncio
+async def test_recall_improves_with_more_probes() -> None:
+    vectors = _clustered(600)
+    queries = _clustered(30, seed=1)
+    brute = await _filled(NumpyEmbeddingStore(), vectors)
+    store = await _filled(IVFEmbeddingStore(n_lists=16, n_probe=1, min_train_size=200), vectors)
+
+    async def _recall(n_probe: int) -> float:
+        store.n_probe = n_probe
+        hits = 0
+        for query in queries:
+            expected = await brute.search_similar(query.tolist(), limit=5, threshold=-1.0)
+            actual = await store.search_similar(query.tolist(), limit=5, threshold=-1.0)
+            hits += len({r.id for r in expected} & {r.id for r in actual})
+        return hits / (5 * len(queries))
+
+    assert store.trained
+    low = await _recall(1)
+    full = await _recall(16)
+    assert full == 1.0
+    assert low <= full
+    assert await _recall(8) >= 0.9
+
+
+@pytest.mark.asyncio
+async def test_incremental_inserts_are_searchable() -> None:
+    vectors = _clustered(300)
+    store = await _filled(IVFEmbeddingStore(n_lists=8, n_probe=2, min_train_size=100), vectors)
+    extra = np.ones(16, dtype=np.float32) * 5.0
+
+    await store.save_embedding(_record(999, extra))
+    results = await store.search_similar(extra.tolist(), limit=1, threshold=0.99)
+
+    assert [record.id for record in results] == ["emb-999"]
+
+
+@pytest.mark.asyncio
+async def test_retrains_after_growth() -> None:
+    store = IVFEmbeddingStore(n_lists=4, min_train_size=50, retrain_growth=2.0)
+    vectors = _clustered(120)
+
+    await _filled(store, vectors[:60])
+    first = store._trained_size
+    await _filled(store, vectors)
+
+    assert first == 50
+    assert store._trained_size == 100
+
+
+@pytest.mark.asyncio
+async def test_deletes_survive_compaction(tmp_path) -> None:
+    store = await _filled(
+        IVFEmbeddingStore(n_lists=4, n_probe=4, min_train_size=40, compact_ratio=0.2),
+        _clustered(80),
+    )
+
+    deleted = await store.delete_embeddings("conv-0")
+    results = await store.search_similar(_clustered(80)[1].tolist(), limit=80, threshold=-1.0)
+
+    assert deleted == 20
+    assert store.tombstones == 0
+    assert len(results) == 60
+    assert all(record.conversation_id != "conv-0" for record in results)
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_round_trip(tmp_path) -> None:
+    vectors = _clustered(200)
+    store = await _filled(IVFEmbeddingStore(n_lists=8, n_probe=3, min_train_size=100), vectors)
+    path = tmp_path / "index.npz"
+
+    store.save(path)
+    restored = IVFEmbeddingStore.load(path)
+
+    assert restored.trained
+    assert restored.n_probe == 3
+    assert len(restored) == 200
+    query = vectors[17].tolist()
+    expected = await store.search_similar(query, limit=5, threshold=-1.0)
+    actual = await restored.search_similar(query, limit=5, threshold=-1.0)
+    assert [r.id for r in actual] == [r.id for r in expected]
+    record = await restored.get_embedding("msg-17")
+    assert record is not None and record.conversation_id == "conv-1"
+
+
+@pytest.mark.asyncio
+async def test_load_rejects_unknown_versions(tmp_path) -> None:
+    store = await _filled(IVFEmbeddingStore(n_lists=4, min_train_size=1000), _clustered(20))
+    path = tmp_path / "index.npz"
+    store.save(path)
+    with np.load(path) as data:
+        arrays = {key: data[key] for key in data.files}
+    config = json.loads(str(arrays["config"]))
+    arrays["config"] = np.array(json.dumps({**config, "version": 99}))
+    np.savez(path, **arrays)
+
+    with pytest.raises(FatalStorageError):
+        IVFEmbeddingStore.load(path)
+
+
+
+def test_rejects_invalid_knobs() -> None:
+    with pytest.raises(ValueError):
+        IVFEmbeddingStore(n_lists=0)
+    with pytest.raises(ValueError):
+        IVFEmbeddingStore(n_probe=0)
+    with pytest.raises(ValueError):
+        IVFEmbeddingStore(retrain_growth=1.0)
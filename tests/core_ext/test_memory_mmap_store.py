@@ -0,0 +1,201 @@
+"""Tests for the memory-mapped embedding store."""
+
+from __future__ import annotations
+
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from src.core_ext.memory import (
+    EmbeddingRecord,
+    FatalStorageError,
+    InMemoryEmbeddingStore,
+    MmapEmbeddingStore,
+)
+
+
+def _record(message_id: str, vector: list[float], conversation_id: str = "conv-1") -> EmbeddingRecord:
+    return EmbeddingRecord(
+        id=f"emb-{message_id}",
+        message_id=message_id,
+        conversation_id=conversation_id,
+        embedding=vector,
+        model="test",
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_similar_ranks_by_cosine(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path)
+    await store.save_embedding(_record("msg-1", [1.0, 0.0, 0.0]))
+    await store.save_embedding(_record("msg-2", [0.9, 0.1, 0.0]))
+    await store.save_embedding(_record("msg-3", [0.0, 1.0, 0.0]))
+
+    results = await store.search_similar([2.0, 0.0, 0.0], limit=2, threshold=0.8)
+
+    assert [record.id for record in results] == ["emb-msg-1", "emb-msg-2"]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_get_embedding_restores_original_vector(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path)
+    record = _record("msg-1", [3.0, 4.0])
+
+    await store.save_embedding(record)
+    loaded = await store.get_embedding("msg-1")
+
+    assert loaded is not None
+    assert loaded.embedding == pytest.approx([3.0, 4.0])
+    assert loaded.created_at == record.created_at
+    assert await store.get_embedding("missing") is None
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_reopened_store_searches_without_rehydration(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path, chunk_rows=2)
+    for index in range(5):
+        await store.save_embedding(_record(f"msg-{index}", [1.0, float(index)], f"conv-{index % 2}"))
+    await store.save_embedding(_record("msg-4", [0.0, -1.0], "conv-0"))
+    await store.delete_embeddings("conv-1")
+    store.close()
+
+    reopened = MmapEmbeddingStore(tmp_path, chunk_rows=2)
+
+    assert len(reopened) == 3
+    assert await reopened.get_embedding("msg-1") is None
+    results = await reopened.search_similar([1.0, 0.0], threshold=0.1)
+    assert [record.message_id for record in results] == ["msg-0", "msg-2"]
+    await reopened.save_embedding(_record("msg-9", [0.0, -2.0]))
+    assert (await reopened.search_similar([0.0, -1.0], limit=1))[0].message_id in {"msg-4", "msg-9"}
+    assert len(reopened) == 4
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_resaving_a_message_replaces_its_vector(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path)
+    await store.save_embedding(_record("msg-1", [1.0, 0.0]))
+    await store.save_embedding(_record("msg-1", [0.0, 1.0]))
+
+    assert await store.search_similar([1.0, 0.0], threshold=0.5) == []
+    assert len(store) == 1
+    assert await store.delete_embeddings("conv-1") == 1
+    assert await store.delete_embeddings("conv-1") == 0
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_rejects_dimension_mismatch(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path)
+    await store.save_embedding(_record("msg-1", [1.0, 0.0]))
+
+    with pytest.raises(FatalStorageError):
+        await store.save_embedding(_record("msg-2", [1.0, 0.0, 0.0]))
+    with pytest.raises(FatalStorageError):
+        await store.search_similar([1.0, 0.0, 0.0])
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_matches_in_memory_store_across_search_blocks(tmp_path: Path) -> None:
+    rng = random.Random(7)
+    reference = InMemoryEmbeddingStore()
+    store = MmapEmbeddingStore(tmp_path, chunk_rows=16, search_block_rows=7)
+    for index in range(60):
+        vector = [rng.uniform(-1.0, 1.0) for _ in range(8)]
+        record = _record(f"msg-{index}", vector, f"conv-{index % 3}")
+        await reference.save_embedding(record)
+        await store.save_embedding(record)
+    await reference.delete_embeddings("conv-1")
+    await store.delete_embeddings("conv-1")
+
+    for _ in range(10):
+        query = [rng.uniform(-1.0, 1.0) for _ in range(8)]
+        expected = await reference.search_similar(query, limit=5, threshold=0.1)
+        actual = await store.search_similar(query, limit=5, threshold=0.1)
+        assert [record.id for record in actual] == [record.id for record in expected]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_compact_rewrites_files_without_dropped_rows(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path, chunk_rows=4, compact_ratio=1.0)
+    for index in range(10):
+        await store.save_embedding(_record(f"msg-{index}", [1.0, float(index)], f"conv-{index % 2}"))
+    await store.delete_embeddings("conv-1")
+    await store.save_embedding(_record("msg-0", [1.0, -1.0], "conv-0"))
+    assert store.tombstones == 6
+
+    store.compact()
+
+    assert store.tombstones == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "alive.1.u8",
+        "header.json",
+        "index.1.kr",
+        "norms.1.f32",
+        "vectors.1.f32",
+    ]
+    await store.save_embedding(_record("msg-10", [0.0, 1.0], "conv-0"))
+    store.close()
+
+    reopened = MmapEmbeddingStore(tmp_path, chunk_rows=4, compact_ratio=1.0)
+    loaded = await reopened.get_embedding("msg-0")
+    assert loaded is not None and loaded.embedding == pytest.approx([1.0, -1.0])
+    assert len(reopened) == 6
+    assert await reopened.get_embedding("msg-1") is None
+    results = await reopened.search_similar([0.0, 1.0], limit=1)
+    assert [record.message_id for record in results] == ["msg-10"]
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_deletes_compact_automatically_past_ratio(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path, chunk_rows=4, compact_ratio=0.5)
+    for index in range(8):
+        await store.save_embedding(_record(f"msg-{index}", [1.0, 0.0], f"conv-{index % 4}"))
+
+    await store.delete_embeddings("conv-0")
+    assert store.tombstones == 2
+    await store.delete_embeddings("conv-1")
+    await store.delete_embeddings("conv-2")
+
+    assert store.tombstones == 0
+    assert len(store) == 2
+    assert {record.message_id for record in await store.search_similar([1.0, 0.0])} == {"msg-3", "msg-7"}
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_rejects_unknown_versions(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path)
+    await store.save_embedding(_record("msg-1", [1.0, 0.0]))
+    store.close()
+    header = json.loads((tmp_path / "header.json").read_text())
+    (tmp_path / "header.json").write_text(json.dumps({**header, "version": 99}))
+
+    with pytest.raises(FatalStorageError):
+        MmapEmbeddingStore(tmp_path)
+
+
+@pytest.mark.asyncio
+async def test_torn_index_tail_is_truncated(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path)
+    await store.save_embedding(_record("msg-1", [1.0, 0.0]))
+    await store.save_embedding(_record("msg-2", [0.0, 1.0]))
+    store.close()
+    index = tmp_path / "index.kr"
+    index.write_bytes(index.read_bytes()[:-3])
+
+    reopened = MmapEmbeddingStore(tmp_path)
+    assert len(reopened) == 1
+    await reopened.save_embedding(_record("msg-3", [0.0, 1.0]))
+    reopened.close()
+
+    again = MmapEmbeddingStore(tmp_path)
+    assert [record.message_id for record in await again.search_similar([0.0, 1.0])] == ["msg-3"]
+    again.close()
@@ -0,0 +1,120 @@
+"""Tests for the NumPy-backed embedding store."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from src.core_ext.memory import (
+    EmbeddingRecord,
+    FatalStorageError,
+    InMemoryEmbeddingStore,
+    NumpyEmbeddingStore,
+)
+
+
+def _record(message_id: str, vector: list[float], conversation_id: str = "conv-1") -> EmbeddingRecord:
+    return EmbeddingRecord(
+        id=f"emb-{message_id}",
+        message_id=message_id,
+        conversation_id=conversation_id,
+        embedding=vector,
+        model="test",
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_similar_ranks_by_cosine() -> None:
+    store = NumpyEmbeddingStore()
+    await store.save_embedding(_record("msg-1", [1.0, 0.0, 0.0]))
+    await store.save_embedding(_record("msg-2", [0.9, 0.1, 0.0]))
+    await store.save_embedding(_record("msg-3", [0.0, 1.0, 0.0]))
+
+    results = await store.search_similar([2.0, 0.0, 0.0], limit=2, threshold=0.8)
+
+    assert [record.id for record in results] == ["emb-msg-1", "emb-msg-2"]
+
+
+@pytest.mark.asyncio
+async def test_get_embedding_returns_saved_record() -> None:
+    store = NumpyEmbeddingStore()
+    record = _record("msg-1", [0.1, 0.2, 0.3])
+
+    await store.save_embedding(record)
+
+    assert await store.get_embedding("msg-1") is record
+    assert await store.get_embedding("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_matrix_grows_in_chunks() -> None:
+    store = NumpyEmbeddingStore(chunk_size=4)
+
+    for index in range(5):
+        await store.save_embedding(_record(f"msg-{index}", [1.0, float(index)]))
+
+    assert store.capacity == 8
+    assert len(store) == 5
+
+
+@pytest.mark.asyncio
+async def test_resaving_a_message_replaces_its_vector() -> None:
+    store = NumpyEmbeddingStore(compact_ratio=1.0)
+    await store.save_embedding(_record("msg-1", [1.0, 0.0]))
+    await store.save_embedding(_record("msg-1", [0.0, 1.0]))
+
+    results = await store.search_similar([1.0, 0.0], threshold=0.5)
+
+    assert results == []
+    assert store.tombstones == 1
+    assert len(store) == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_embeddings_tombstones_and_compacts() -> None:
+    store = NumpyEmbeddingStore(chunk_size=2, compact_ratio=0.5)
+    for index in range(3):
+        await store.save_embedding(_record(f"a-{index}", [1.0, 0.0], "conv-a"))
+    await store.save_embedding(_record("b-0", [1.0, 0.1], "conv-b"))
+
+    deleted = await store.delete_embeddings("conv-a")
+
+    assert deleted == 3
+    assert store.tombstones == 0
+    assert store.capacity == 2
+    assert await store.get_embedding("a-0") is None
+    results = await store.search_similar([1.0, 0.0], threshold=0.5)
+    assert [record.message_id for record in results] == ["b-0"]
+    assert await store.delete_embeddings("conv-a") == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_dimension_mismatch() -> None:
+    store = NumpyEmbeddingStore()
+    await store.save_embedding(_record("msg-1", [1.0, 0.0]))
+
+    with pytest.raises(FatalStorageError):
+        await store.save_embedding(_record("msg-2", [1.0, 0.0, 0.0]))
+    with pytest.raises(FatalStorageError):
+        await store.search_similar([1.0, 0.0, 0.0])
+
+
+@pytest.mark.asyncio
+async def test_matches_in_memory_store_results() -> None:
+    rng = random.Random(7)
+    reference = InMemoryEmbeddingStore()
+    store = NumpyEmbeddingStore(chunk_size=16)
+    for index in range(60):
+        vector = [rng.uniform(-1.0, 1.0) for _ in range(8)]
+        record = _record(f"msg-{index}", vector, f"conv-{index % 3}")
+        await reference.save_embedding(record)
+        await store.save_embedding(record)
+    await reference.delete_embeddings("conv-1")
+    await store.delete_embeddings("conv-1")
+
+    for _ in range(10):
+        query = [rng.uniform(-1.0, 1.0) for _ in range(8)]
+        expected = await reference.search_similar(query, limit=5, threshold=0.1)
+        actual = await store.search_similar(query, limit=5, threshold=0.1)
+        assert [record.id for record in actual] == [record.id for record in expected]
@@ -0,0 +1,278 @@
+"""Tests for the SQLite memory storage backend."""
+
+from __future__ import annotations
+
+import random
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from src.core_ext.memory import (
+    ConversationMessage,
+    ConversationMetadata,
+    EmbeddingRecord,
+    FatalStorageError,
+    InMemoryEmbeddingStore,
+    MemoryStore,
+    MessageType,
+    RetryableStorageError,
+    SQLiteDatabase,
+    SQLiteEmbeddingStore,
+    SQLiteMessageStore,
+    SQLiteMetadataStore,
+    create_memory_store,
+    create_sqlite_store,
+)
+
+
+def _message(message_id: str, conversation_id: str = "conv-1", content: str = "hi") -> ConversationMessage:
+    return ConversationMessage(
+        id=message_id,
+        conversation_id=conversation_id,
+        role=MessageType.USER,
+        content=content,
+        metadata={"lang": "ja"},
+    )
+
+
+def _embedding(message_id: str, vector: list[float], conversation_id: str = "conv-1") -> EmbeddingRecord:
+    return EmbeddingRecord(
+        id=f"emb-{message_id}",
+        message_id=message_id,
+        conversation_id=conversation_id,
+        embedding=vector,
+        model="test",
+    )
+
+
+@pytest.mark.asyncio
+async def test_database_uses_wal_and_indexes(tmp_path: Path) -> None:
+    database = SQLiteDatabase(tmp_path / "memory.sqlite")
+
+    rows = await database.fetchall("SELECT name FROM sqlite_master WHERE type = 'index'")
+    indexes = {row[0] for row in rows}
+
+    assert database.journal_mode == "wal"
+    assert {
+        "idx_conversations_user_updated",
+        "idx_conversations_updated",
+        "idx_messages_conversation_id",
+        "idx_embeddings_conversation_id",
+    } <= indexes
+    database.close()
+
+
+@pytest.mark.asyncio
+async def test_metadata_round_trip_and_listing(tmp_path: Path) -> None:
+    store = SQLiteMetadataStore(SQLiteDatabase(tmp_path / "memory.sqlite"))
+    conversation = ConversationMetadata(
+        id="conv-1",
+        user_id="user-a",
+        model="gpt-4o",
+        created_at=datetime(2025, 1, 1, 12, 0),
+        token_count=42,
+        semantic_retention=0.9,
+        metadata={"tags": ["x"]},
+    )
+    await store.save_conversation(conversation)
+    await store.save_conversation(ConversationMetadata(id="conv-2", user_id="user-b"))
+    await store.save_conversation(ConversationMetadata(id="conv-3", user_id="user-a"))
+    conversation.token_count = 50
+    await store.save_conversation(conversation)
+
+    loaded = await store.get_conversation("conv-1")
+
+    assert loaded is not None
+    assert loaded.to_dict() == conversation.to_dict()
+    assert [c.id for c in await store.list_conversations()] == ["conv-1", "conv-2", "conv-3"]
+    assert [c.id for c in await store.list_conversations(user_id="user-a")] == ["conv-1", "conv-3"]
+    assert [c.id for c in await store.list_conversations(limit=1, offset=1)] == ["conv-2"]
+    assert await store.delete_conversation("conv-1") is True
+    assert await store.delete_conversation("conv-1") is False
+    assert await store.get_conversation("conv-1") is None
+
+
+@pytest.mark.asyncio
+async def test_list_conversations_page_uses_updated_at_keyset(tmp_path: Path) -> None:
+    store = SQLiteMetadataStore(SQLiteDatabase(tmp_path / "memory.sqlite"))
+    base = datetime(2025, 1, 1)
+    for index in range(5):
+        await store.save_conversation(
+            ConversationMetadata(
+                id=f"a-{index}",
+                user_id="user-a",
+                # A whole-second timestamp must still sort before fractional ones.
+                updated_at=base + timedelta(seconds=index, microseconds=0 if index == 2 else 500),
+            )
+        )
+    await store.save_conversation(ConversationMetadata(id="b-0", user_id="user-b", updated_at=base))
+
+    first = await store.list_conversations_page(user_id="user-a", limit=3)
+    second = await store.list_conversations_page(user_id="user-a", limit=3, after=first.next_cursor)
+    everything = await store.list_conversations_page(limit=10)
+
+    assert [c.id for c in first.conversations] == ["a-4", "a-3", "a-2"]
+    assert [c.id for c in second.conversations] == ["a-1", "a-0"]
+    assert second.next_cursor is None
+    assert [c.id for c in everything.conversations][-2:] == ["a-0", "b-0"]
+
+
+@pytest.mark.asyncio
+async def test_messages_keep_insertion_order_and_batch_insert(tmp_path: Path) -> None:
+    store = SQLiteMessageStore(SQLiteDatabase(tmp_path / "memory.sqlite"))
+    await store.save_message(_message("m-1", content="first"))
+    await store.save_messages([_message("m-2"), _message("m-3"), _message("x-1", "conv-2")])
+    await store.save_message(_message("m-1", content="edited"))
+
+    messages = await store.get_messages("conv-1")
+
+    assert [m.id for m in messages] == ["m-1", "m-2", "m-3"]
+    assert messages[0].content == "edited"
+    assert messages[0].metadata == {"lang": "ja"}
+    assert await store.delete_messages("conv-1") == 3
+    assert await store.get_messages("conv-1") == []
+    assert len(await store.get_messages("conv-2")) == 1
+
+
+@pytest.mark.asyncio
+async def test_recent_messages_and_paged_iteration(tmp_path: Path) -> None:
+    store = SQLiteMessageStore(SQLiteDatabase(tmp_path / "memory.sqlite"))
+    await store.save_messages([_message(f"m-{index}") for index in range(7)])
+    await store.save_message(_message("other", "conv-2"))
+
+    recent = await store.get_recent_messages("conv-1", 3)
+    earlier = await store.get_recent_messages("conv-1", 2, before="m-3")
+    forward = [m.id async for m in store.iter_messages("conv-1", batch_size=3)]
+    backward = [m.id async for m in store.iter_messages("conv-1", batch_size=2, newest_first=True)]
+
+    assert [m.id for m in recent] == ["m-4", "m-5", "m-6"]
+    assert [m.id for m in earlier] == ["m-1", "m-2"]
+    assert await store.get_recent_messages("conv-1", 2, before="other") == []
+    assert forward == [f"m-{index}" for index in range(7)]
+    assert backward == forward[::-1]
+
+
+@pytest.mark.asyncio
+async def test_embeddings_round_trip_as_float32_blobs(tmp_path: Path) -> None:
+    store = SQLiteEmbeddingStore(SQLiteDatabase(tmp_path / "memory.sqlite"))
+    await store.save_embedding(_embedding("m-1", [1.0, 0.0, 0.0]))
+    await store.save_embeddings(
+        [_embedding("m-2", [0.9, 0.1, 0.0]), _embedding("m-3", [0.0, 1.0, 0.0], "conv-2")]
+    )
+    await store.save_embedding(_embedding("m-4", [1.0, 0.0]))
+
+    loaded = await store.get_embedding("m-2")
+    results = await store.search_similar([2.0, 0.0, 0.0], limit=5, threshold=0.8)
+
+    assert loaded is not None
+    assert loaded.embedding == pytest.approx([0.9, 0.1, 0.0])
+    assert [record.message_id for record in results] == ["m-1", "m-2"]
+    assert await store.delete_embeddings("conv-1") == 3
+    assert await store.get_embedding("m-1") is None
+
+
+@pytest.mark.asyncio
+async def test_search_matches_in_memory_store_across_pages(tmp_path: Path) -> None:
+    rng = random.Random(11)
+    reference = InMemoryEmbeddingStore()
+    store = SQLiteEmbeddingStore(SQLiteDatabase(tmp_path / "memory.sqlite"), scan_batch_size=7)
+    for index in range(50):
+        record = _embedding(f"m-{index}", [rng.uniform(-1.0, 1.0) for _ in range(6)])
+        await reference.save_embedding(record)
+        await store.save_embedding(record)
+
+    for _ in range(10):
+        query = [rng.uniform(-1.0, 1.0) for _ in range(6)]
+        expected = await reference.search_similar(query, limit=5, threshold=0.1)
+        actual = await store.search_similar(query, limit=5, threshold=0.1)
+        assert [r.id for r in actual] == [r.id for r in expected]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_survives_reopen(tmp_path: Path) -> None:
+    path = tmp_path / "memory.sqlite"
+    store = create_sqlite_store(path)
+    await store.save_conversation_with_messages(
+        ConversationMetadata(id="conv-1", user_id="user-a"),
+        [_message("m-1"), _message("m-2")],
+    )
+
+    reopened = create_sqlite_store(path)
+    result = await reopened.get_full_conversation("conv-1")
+
+    assert result is not None
+    assert [m.id for m in result[1]] == ["m-1", "m-2"]
+    assert await reopened.delete_conversation_full("conv-1") is True
+    assert await reopened.get_full_conversation("conv-1") is None
+
+
+@pytest.mark.asyncio
+async def test_save_conversation_with_messages_is_atomic(tmp_path: Path) -> None:
+    store = create_sqlite_store(tmp_path / "memory.sqlite")
+    broken = _message("m-2")
+    broken.content = None  # type: ignore[assignment]
+
+    with pytest.raises(FatalStorageError):
+        await store.save_conversation_with_messages(
+            ConversationMetadata(id="conv-1"), [_message("m-1"), broken]
+        )
+
+    assert await store.metadata.get_conversation("conv-1") is None
+    assert await store.messages.get_messages("conv-1") == []
+
+
+@pytest.mark.asyncio
+async def test_statements_run_on_the_database_thread(tmp_path: Path) -> None:
+    database = SQLiteDatabase(tmp_path / "memory.sqlite")
+    store = SQLiteMessageStore(database)
+    await store.save_message(
+        ConversationMessage(
+            id="m-1",
+            conversation_id="conv-1",
+            role=MessageType.USER,
+            content="hi",
+            created_at=datetime(2025, 1, 1, 12, 0, 0),
+        )
+    )
+
+    worker = await database.run(lambda conn: threading.current_thread())
+    row = await database.fetchone("SELECT created_at FROM messages WHERE id = ?", ("m-1",))
+
+    assert worker is not threading.current_thread()
+    assert row[0] == "2025-01-01T12:00:00.000000"
+    database.close()
+
+
+@pytest.mark.asyncio
+async def test_locked_database_raises_retryable_error(tmp_path: Path) -> None:
+    path = tmp_path / "memory.sqlite"
+    database = SQLiteDatabase(path, timeout=0.01)
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    try:
+        with pytest.raises(RetryableStorageError):
+            await database.write(lambda conn: conn.execute("DELETE FROM messages"))
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+        database.close()
+
+
+def test_create_memory_store_reads_backend_from_env(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setenv("MEMORY_STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("MEMORY_SQLITE_PATH", str(tmp_path / "env.sqlite"))
+
+    store = create_memory_store()
+
+    assert isinstance(store, MemoryStore)
+    assert isinstance(store.metadata, SQLiteMetadataStore)
+    assert (tmp_path / "env.sqlite").exists()
+    assert not isinstance(create_memory_store("memory").metadata, SQLiteMetadataStore)
+    with pytest.raises(ValueError):
+        create_memory_store("redis")
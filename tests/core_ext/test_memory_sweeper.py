@@ -0,0 +1,288 @@
+"""Tests for the TTL retention sweeper and the store expiry primitives."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import pytest
+
+from src.core_ext.memory import (
+    ConversationMessage,
+    ConversationMetadata,
+    EmbeddingRecord,
+    EmbeddingStore,
+    IVFEmbeddingStore,
+    InMemoryEmbeddingStore,
+    InMemoryMessageStore,
+    InMemoryMetadataStore,
+    MemoryStore,
+    MessageType,
+    MmapEmbeddingStore,
+    NumpyEmbeddingStore,
+    RetentionSweeper,
+    SQLiteDatabase,
+    SQLiteEmbeddingStore,
+    SweepResult,
+    create_in_memory_store,
+    create_retention_sweeper,
+    create_sqlite_store,
+)
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+def _message(message_id: str, conversation_id: str) -> ConversationMessage:
+    return ConversationMessage(
+        id=message_id, conversation_id=conversation_id, role=MessageType.USER, content="hi"
+    )
+
+
+def _embedding(message_id: str, conversation_id: str, age: timedelta) -> EmbeddingRecord:
+    return EmbeddingRecord(
+        id=f"emb-{message_id}",
+        message_id=message_id,
+        conversation_id=conversation_id,
+        embedding=[1.0, 0.0],
+        model="test",
+        created_at=NOW - age,
+    )
+
+
+async def _seed(store: MemoryStore, ages_in_days: List[int]) -> None:
+    for index, age in enumerate(ages_in_days):
+        conversation_id = f"conv-{index}"
+        await store.save_conversation_with_messages(
+            ConversationMetadata(id=conversation_id, updated_at=NOW - timedelta(days=age)),
+            [_message(f"m-{index}", conversation_id)],
+        )
+        assert store.embeddings is not None
+        await store.embeddings.save_embedding(
+            _embedding(f"m-{index}", conversation_id, timedelta(days=age))
+        )
+
+
+@pytest.mark.asyncio
+async def test_sweep_deletes_expired_conversations_with_their_data() -> None:
+    store = create_in_memory_store()
+    await _seed(store, [40, 31, 29, 1])
+    results: List[SweepResult] = []
+    sweeper = RetentionSweeper(
+        store,
+        conversation_ttl=timedelta(days=30),
+        batch_delay=0,
+        clock=lambda: NOW,
+        on_sweep=results.append,
+    )
+
+    result = await sweeper.sweep()
+
+    assert result.conversations_deleted == 2
+    assert result.complete is True
+    assert [c.id for c in await store.metadata.list_conversations()] == ["conv-2", "conv-3"]
+    assert await store.messages.get_messages("conv-0") == []
+    assert store.embeddings is not None
+    assert await store.embeddings.get_embedding("m-1") is None
+    assert await store.embeddings.get_embedding("m-2") is not None
+    assert results == [result]
+    assert (sweeper.sweeps, sweeper.conversations_deleted) == (1, 2)
+    assert sweeper.last_duration == result.duration_seconds >= 0
+
+
+@pytest.mark.asyncio
+async def test_embedding_ttl_keeps_live_conversations() -> None:
+    store = create_in_memory_store()
+    await _seed(store, [100, 95, 10])
+    sweeper = RetentionSweeper(
+        store, embedding_ttl=timedelta(days=90), batch_size=1, batch_delay=0, clock=lambda: NOW
+    )
+
+    result = await sweeper.sweep()
+
+    assert result.embeddings_deleted == 2
+    assert result.conversations_deleted == 0
+    assert len(await store.metadata.list_conversations()) == 3
+    assert store.embeddings is not None
+    assert await store.embeddings.get_embedding("m-2") is not None
+
+
+@pytest.mark.asyncio
+async def test_max_batches_spreads_backlog_over_passes() -> None:
+    store = create_in_memory_store()
+    await _seed(store, [50] * 7)
+    sleeps: List[float] = []
+    sweeper = RetentionSweeper(
+        store,
+        conversation_ttl=timedelta(days=30),
+        batch_size=2,
+        batch_delay=0.25,
+        max_batches=2,
+        clock=lambda: NOW,
+    )
+    original_sleep = asyncio.sleep
+
+    async def _record_sleep(delay: float) -> None:
+        sleeps.append(delay)
+        await original_sleep(0)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(asyncio, "sleep", _record_sleep)
+        first = await sweeper.sweep()
+        second = await sweeper.sweep()
+
+    assert (first.conversations_deleted, first.batches, first.complete) == (4, 2, False)
+    assert (second.conversations_deleted, second.complete) == (3, True)
+    assert sleeps == [0.25, 0.25, 0.25]
+    assert sweeper.conversations_deleted == 7
+
+
+class _LegacyEmbeddingStore(EmbeddingStore):
+    async def save_embedding(self, record: EmbeddingRecord) -> None:
+        return None
+
+    async def get_embedding(self, message_id: str) -> Optional[EmbeddingRecord]:
+        return None
+
+    async def search_similar(
+        self, embedding: List[float], limit: int = 10, threshold: float = 0.8
+    ) -> List[EmbeddingRecord]:
+        return []
+
+    async def delete_embeddings(self, conversation_id: str) -> int:
+        return 0
+
+
+@pytest.mark.asyncio
+async def test_sweeper_skips_stores_without_embedding_expiry(caplog: pytest.LogCaptureFixture) -> None:
+    embeddings = _LegacyEmbeddingStore()
+    store = MemoryStore(InMemoryMetadataStore(), InMemoryMessageStore(), embeddings)
+    sweeper = RetentionSweeper(store, embedding_ttl=timedelta(days=1), clock=lambda: NOW)
+
+    with caplog.at_level("WARNING", logger="katamari.memory"):
+        first = await sweeper.sweep()
+        second = await sweeper.sweep()
+
+    assert first.embeddings_deleted == second.embeddings_deleted == 0
+    assert sweeper.failures == 0
+    assert [record.getMessage() for record in caplog.records] == [
+        "_LegacyEmbeddingStore cannot expire embeddings; skipping"
+    ]
+    with pytest.raises(NotImplementedError, match="MEMORY_EMBEDDING_TTL_DAYS"):
+        await embeddings.delete_embeddings_before(NOW)
+
+
+class _FailingMetadataStore(InMemoryMetadataStore):
+    async def list_conversation_ids_before(self, cutoff: datetime, limit: int = 100) -> List[str]:
+        raise RuntimeError("database unavailable")
+
+
+@pytest.mark.asyncio
+async def test_background_task_survives_failed_passes() -> None:
+    store = MemoryStore(_FailingMetadataStore(), InMemoryMessageStore())
+    sweeper = RetentionSweeper(store, conversation_ttl=timedelta(days=1), interval=0.01)
+
+    sweeper.start()
+    await asyncio.sleep(0.05)
+    assert sweeper.running
+    await sweeper.stop()
+
+    assert not sweeper.running
+    assert sweeper.failures >= 2
+    assert sweeper.sweeps == 0
+
+
+def test_create_retention_sweeper_reads_env(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = create_in_memory_store()
+    monkeypatch.delenv("MEMORY_CONVERSATION_TTL_DAYS", raising=False)
+    monkeypatch.setenv("MEMORY_EMBEDDING_TTL_DAYS", "0")
+    assert create_retention_sweeper(store) is None
+
+    monkeypatch.setenv("MEMORY_CONVERSATION_TTL_DAYS", "30")
+    monkeypatch.setenv("MEMORY_SWEEP_BATCH_SIZE", "25")
+    sweeper = create_retention_sweeper(store)
+
+    assert sweeper is not None
+    assert sweeper._conversation_ttl == timedelta(days=30)
+    assert sweeper._embedding_ttl is None
+    assert sweeper._batch_size == 25
+
+
+def _sqlite_embeddings(tmp_path: Path) -> EmbeddingStore:
+    return SQLiteEmbeddingStore(SQLiteDatabase(tmp_path / "memory.sqlite"))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "factory",
+    [
+        lambda _: InMemoryEmbeddingStore(),
+        lambda _: NumpyEmbeddingStore(chunk_size=2),
+        lambda _: IVFEmbeddingStore(n_lists=2),
+        lambda tmp_path: MmapEmbeddingStore(tmp_path / "mmap", chunk_rows=2),
+        _sqlite_embeddings,
+    ],
+    ids=["memory", "numpy", "ivf", "mmap", "sqlite"],
+)
+async def test_delete_embeddings_before_removes_oldest_first(
+    tmp_path: Path, factory: Callable[[Path], EmbeddingStore]
+) -> None:
+    store = factory(tmp_path)
+    for index, age in enumerate([5, 50, 40, 1, 60]):
+        await store.save_embedding(_embedding(f"m-{index}", f"conv-{index % 2}", timedelta(days=age)))
+
+    first = await store.delete_embeddings_before(NOW - timedelta(days=30), limit=2)
+    survivor = await store.get_embedding("m-2")
+    second = await store.delete_embeddings_before(NOW - timedelta(days=30), limit=2)
+    remaining: List[Optional[EmbeddingRecord]] = [
+        await store.get_embedding(f"m-{index}") for index in range(5)
+    ]
+
+    assert (first, second) == (2, 1)
+    assert survivor is not None
+    assert [record is not None for record in remaining] == [True, False, False, True, False]
+    assert [r.message_id for r in await store.search_similar([1.0, 0.0], threshold=0.5)] == ["m-0", "m-3"]
+    assert await store.delete_embeddings("conv-1") == 1
+
+
+@pytest.mark.asyncio
+async def test_mmap_expiry_survives_reopen(tmp_path: Path) -> None:
+    store = MmapEmbeddingStore(tmp_path)
+    await store.save_embedding(_embedding("old", "conv-1", timedelta(days=100)))
+    await store.save_embedding(_embedding("new", "conv-1", timedelta(days=1)))
+    assert await store.delete_embeddings_before(NOW - timedelta(days=30)) == 1
+    store.close()
+
+    reopened = MmapEmbeddingStore(tmp_path)
+
+    assert len(reopened) == 1
+    assert await reopened.get_embedding("old") is None
+    assert await reopened.get_embedding("new") is not None
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_sweeps_through_indexes(tmp_path: Path) -> None:
+    store = create_sqlite_store(tmp_path / "memory.sqlite")
+    await _seed(store, [40, 31, 29, 1])
+    sweeper = RetentionSweeper(
+        store,
+        conversation_ttl=timedelta(days=30),
+        embedding_ttl=timedelta(days=20),
+        batch_size=1,
+        batch_delay=0,
+        clock=lambda: NOW,
+    )
+
+    assert await store.metadata.list_conversation_ids_before(NOW - timedelta(days=30)) == [
+        "conv-0",
+        "conv-1",
+    ]
+    result = await sweeper.sweep()
+
+    assert (result.conversations_deleted, result.embeddings_deleted) == (2, 1)
+    assert [c.id for c in await store.metadata.list_conversations()] == ["conv-2", "conv-3"]
+    assert store.embeddings is not None
+    assert await store.embeddings.get_embedding("m-2") is None
+    assert await store.embeddings.get_embedding("m-3") is not None
@@ -0,0 +1,158 @@
+"""Tests for the write-behind buffer in front of MemoryStore."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+import pytest
+
+from src.core_ext.memory import (
+    ConversationMessage,
+    ConversationMetadata,
+    FatalStorageError,
+    InMemoryMessageStore,
+    InMemoryMetadataStore,
+    MemoryStore,
+    MessageType,
+    RetryableStorageError,
+    WriteBehindBuffer,
+    create_in_memory_store,
+    create_write_behind_buffer,
+)
+
+
+def _message(index: int, conversation_id: str = "conv-1") -> ConversationMessage:
+    return ConversationMessage(
+        id=f"m-{conversation_id}-{index}",
+        conversation_id=conversation_id,
+        role=MessageType.USER,
+        content=f"turn {index}",
+    )
+
+
+class _FlakyStore(MemoryStore):
+    def __init__(self, errors: List[Exception]) -> None:
+        super().__init__(InMemoryMetadataStore(), InMemoryMessageStore())
+        self.errors = errors
+        self.calls = 0
+
+    async def save_conversation_with_messages(
+        self, conversation: ConversationMetadata, messages: List[ConversationMessage]
+    ) -> None:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        await super().save_conversation_with_messages(conversation, messages)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_does_not_touch_store_until_flush() -> None:
+    store = create_in_memory_store()
+    buffer = WriteBehindBuffer(store, batch_size=10, flush_interval=60)
+
+    buffer.enqueue(ConversationMetadata(id="conv-1", token_count=1), [_message(0)])
+    buffer.enqueue(ConversationMetadata(id="conv-1", token_count=2), [_message(1)])
+
+    assert buffer.pending == 3
+    assert buffer.pending_conversations == 1
+    assert [m.id for m in buffer.pending_messages("conv-1")] == ["m-conv-1-0", "m-conv-1-1"]
+    assert await store.get_full_conversation("conv-1") is None
+
+    assert await buffer.flush("conv-1") == 2
+    conversation, messages = await store.get_full_conversation("conv-1")  # type: ignore[misc]
+    assert conversation.token_count == 2
+    assert [m.content for m in messages] == ["turn 0", "turn 1"]
+    assert (buffer.pending, buffer.flushes, buffer.flushed_messages) == (0, 1, 2)
+    assert buffer.last_flush_latency >= 0.0
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_size_threshold_flushes_in_background() -> None:
+    store = create_in_memory_store()
+    buffer = WriteBehindBuffer(store, batch_size=3, flush_interval=60)
+
+    buffer.enqueue(ConversationMetadata(id="conv-1"), [_message(i) for i in range(3)])
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert buffer.pending == 0
+    assert len(await store.messages.get_messages("conv-1")) == 3
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_interval_flushes_idle_conversations() -> None:
+    store = create_in_memory_store()
+    buffer = WriteBehindBuffer(store, batch_size=100, flush_interval=0.01)
+
+    buffer.enqueue(ConversationMetadata(id="conv-1"), [_message(0)])
+    buffer.enqueue(ConversationMetadata(id="conv-2"), [_message(0, "conv-2")])
+    for _ in range(50):
+        if buffer.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+
+    assert buffer.pending == 0
+    assert buffer.flushes == 2
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_everything() -> None:
+    store = create_in_memory_store()
+    buffer = WriteBehindBuffer(store, batch_size=100, flush_interval=60)
+    for index in range(5):
+        buffer.enqueue(ConversationMetadata(id=f"conv-{index}"), [_message(index, f"conv-{index}")])
+
+    await buffer.close()
+
+    assert buffer.pending == 0
+    for index in range(5):
+        assert len(await store.messages.get_messages(f"conv-{index}")) == 1
+
+
+@pytest.mark.asyncio
+async def test_retryable_failure_requeues_ahead_of_newer_writes() -> None:
+    store = _FlakyStore([RetryableStorageError("busy")])
+    buffer = WriteBehindBuffer(store, batch_size=100, flush_interval=60)
+    buffer.enqueue(ConversationMetadata(id="conv-1", token_count=1), [_message(0)])
+
+    with pytest.raises(RetryableStorageError):
+        await buffer.flush("conv-1")
+    buffer.enqueue(ConversationMetadata(id="conv-1", token_count=5), [_message(1)])
+
+    assert buffer.failures == 1
+    assert [m.id for m in buffer.pending_messages("conv-1")] == ["m-conv-1-0", "m-conv-1-1"]
+    assert await buffer.flush() == 2
+    conversation, messages = await store.get_full_conversation("conv-1")  # type: ignore[misc]
+    assert conversation.token_count == 5
+    assert [m.content for m in messages] == ["turn 0", "turn 1"]
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_fatal_failure_drops_batch_and_close_keeps_going() -> None:
+    store = _FlakyStore([FatalStorageError("broken")])
+    buffer = WriteBehindBuffer(store, batch_size=100, flush_interval=60)
+    buffer.enqueue(ConversationMetadata(id="conv-1"), [_message(0)])
+    buffer.enqueue(ConversationMetadata(id="conv-2"), [_message(0, "conv-2")])
+
+    await buffer.close()
+
+    assert buffer.failures == 1
+    assert buffer.pending == 0
+    assert len(await store.messages.get_messages("conv-2")) == 1
+
+
+def test_factory_reads_environment(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("MEMORY_WRITE_BEHIND_BATCH_SIZE", "8")
+    monkeypatch.setenv("MEMORY_WRITE_BEHIND_INTERVAL_SECONDS", "bogus")
+
+    buffer = create_write_behind_buffer(create_in_memory_store())
+
+    assert buffer._batch_size == 8
+    assert buffer._flush_interval == 1.0
+    with pytest.raises(ValueError):
+        WriteBehindBuffer(create_in_memory_store(), batch_size=0)
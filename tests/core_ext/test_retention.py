@@ -1,3 +1,5 @@
+import asyncio
+import threading
 import types
 import sys
 from typing import Dict, List
@@ -18,18 +20,23 @@ class _DummyGenAI(types.SimpleNamespace):
     configured_keys: List[str]
     embeddings: Dict[str, List[float]]
     requested_models: List[str]
+    batches: List[List[str]]
 
     def __init__(self) -> None:
         super().__init__()
         self.configured_keys = []
         self.embeddings = {}
         self.requested_models = []
+        self.batches = []
 
     def configure(self, api_key: str) -> None:  # type: ignore[override]
         self.configured_keys.append(api_key)
 
-    def embed_content(self, *, model: str, content: str):  # type: ignore[override]
+    def embed_content(self, *, model: str, content: str | List[str]):  # type: ignore[override]
         self.requested_models.append(model)
+        if isinstance(content, list):
+            self.batches.append(list(content))
+            return {"embedding": [self.embeddings.get(text, [1.0, 0.0]) for text in content]}
         return {"embedding": self.embeddings.get(content, [1.0, 0.0])}
 
 
@@ -385,3 +392,458 @@ def test_gemini_embedder_uses_default_model_for_blank_env(
     assert cache_entry is not None
     signature, _ = cache_entry
     assert dict(signature)["SEMANTIC_RETENTION_GEMINI_MODEL"] == "text-embedding-004"
+
+
+def test_embedding_cache_serves_repeated_texts(monkeypatch: pytest.MonkeyPatch) -> None:
+    dummy = _DummyGenAI()
+    _install_dummy_genai(monkeypatch, dummy)
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "primary-key")
+
+    embedder = retention.get_embedder("gemini")
+
+    assert embedder is not None
+    assert embedder("payload") == [1.0, 0.0]
+    assert embedder("payload") == [1.0, 0.0]
+    embedder("other")
+    assert dummy.requested_models == ["text-embedding-004", "text-embedding-004"]
+    assert retention.embedding_cache_stats() == {"hits": 1, "misses": 2, "size": 2}
+
+
+def test_embedding_cache_evicts_least_recently_used() -> None:
+    cache = retention.EmbeddingCache(max_entries=2)
+
+    cache.put("ns", "a", [1.0])
+    cache.put("ns", "b", [2.0])
+    assert cache.get("ns", "a") == [1.0]
+    cache.put("ns", "c", [3.0])
+
+    assert cache.get("ns", "b") is None
+    assert cache.get("ns", "a") == [1.0]
+    assert cache.get("other", "a") is None
+
+
+def test_embedding_cache_expires_entries_after_ttl() -> None:
+    now = [100.0]
+    cache = retention.EmbeddingCache(ttl_seconds=10, clock=lambda: now[0])
+
+    cache.put("ns", "text", [0.5])
+    now[0] = 105.0
+    assert cache.get("ns", "text") == [0.5]
+    now[0] = 111.0
+
+    assert cache.get("ns", "text") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 0}
+
+
+def test_embedding_cache_persists_to_disk(tmp_path) -> None:
+    path = tmp_path / "embeddings.sqlite"
+    first = retention.EmbeddingCache(path=path)
+    first.put("ns", "text", [0.25, -1.5])
+    first.close()
+
+    second = retention.EmbeddingCache(path=path)
+
+    assert second.get("ns", "text") == [0.25, -1.5]
+    second.close()
+
+
+def test_embedding_cache_bulk_reads_and_writes_hit_disk(tmp_path) -> None:
+    path = tmp_path / "embeddings.sqlite"
+    first = retention.EmbeddingCache(path=path)
+    first.put_many("ns", [("a", [1.0]), ("b", [2.0])])
+    first.close()
+
+    second = retention.EmbeddingCache(path=path)
+
+    assert second.get_many("ns", ["a", "missing", "b", "a"]) == {"a": [1.0], "b": [2.0]}
+    assert second.stats() == {"hits": 2, "misses": 1, "size": 2}
+    second.close()
+
+
+def test_embedding_cache_reads_environment(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    monkeypatch.setenv("SEMANTIC_RETENTION_CACHE_SIZE", "1")
+    monkeypatch.setenv("SEMANTIC_RETENTION_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+
+    cache = retention.get_embedding_cache()
+    cache.put("ns", "a", [1.0])
+    cache.put("ns", "b", [2.0])
+
+    assert cache.stats()["size"] == 1
+    assert (tmp_path / "cache.sqlite").exists()
+
+
+@pytest.mark.asyncio
+async def test_retention_queue_runs_jobs_in_background() -> None:
+    queue = retention.RetentionQueue(4)
+    results: List[object] = []
+
+    async def _succeeding() -> float:
+        return 0.5
+
+    async def _failing() -> float:
+        raise RuntimeError("embedding outage")
+
+    assert queue.submit(_succeeding, results.append)
+    assert queue.submit(_failing, results.append)
+    await queue.drain()
+    await queue.close()
+
+    assert results == [0.5, None]
+    assert queue.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_retention_queue_drops_jobs_when_full() -> None:
+    queue = retention.RetentionQueue(1)
+    results: List[object] = []
+
+    async def _job() -> float:
+        return 1.0
+
+    accepted = [queue.submit(_job, results.append) for _ in range(3)]
+    await queue.drain()
+    await queue.close()
+
+    assert accepted == [True, False, False]
+    assert queue.dropped == 2
+    assert results == [1.0]
+
+
+def test_message_retention_embeds_each_distinct_message_once() -> None:
+    embed_inputs: List[str] = []
+    vectors = {"alpha": [1.0, 0.0], "beta": [0.0, 1.0], "gamma": [1.0, 1.0]}
+
+    def _embed(text: str) -> List[float]:
+        embed_inputs.append(text)
+        return vectors[text]
+
+    before = [{"content": "alpha"}, {"content": "beta"}, {"content": None}]
+    after = [{"content": "beta"}]
+
+    result = retention.compute_message_retention(before, after, embedder=_embed)
+
+    assert embed_inputs == ["alpha", "beta"]
+    assert result == pytest.approx(0.707, abs=1e-3)
+
+
+def test_message_retention_mean_pools_normalized_vectors() -> None:
+    vectors = {"short": [2.0, 0.0], "long": [0.0, 10.0]}
+
+    result = retention.compute_message_retention(
+        [{"content": "short"}, {"content": "long"}],
+        [{"content": "short"}, {"content": "long"}],
+        embedder=lambda text: vectors[text],
+    )
+
+    assert result == pytest.approx(1.0)
+
+
+def test_semantic_retention_switches_to_per_message_method(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    embed_inputs: List[str] = []
+
+    def _embed(text: str) -> List[float]:
+        embed_inputs.append(text)
+        return [1.0, 0.0]
+
+    monkeypatch.setenv("SEMANTIC_RETENTION_METHOD", "per_message")
+
+    result = retention.compute_semantic_retention(
+        [{"content": "one"}, {"content": "two"}], [{"content": "two"}], embedder=_embed
+    )
+
+    assert result == pytest.approx(1.0)
+    assert embed_inputs == ["one", "two"]
+
+
+def test_message_retention_reuses_cached_embeddings_across_turns(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    dummy = _DummyGenAI()
+    _install_dummy_genai(monkeypatch, dummy)
+    monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "gemini")
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "primary-key")
+    history = [{"content": f"message {index}"} for index in range(5)]
+
+    retention.compute_message_retention(history, history[-2:])
+    history.append({"content": "message 5"})
+    retention.compute_message_retention(history, history[-2:])
+
+    assert dummy.batches == [[f"message {index}" for index in range(5)], ["message 5"]]
+
+
+def _counting_batch_embedder(calls: List[List[str]]):
+    def _embed_batch(texts):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    return _embed_batch
+
+
+def test_chunked_batch_embedder_respects_max_batch_size() -> None:
+    calls: List[List[str]] = []
+    embed_batch = retention.chunked_batch_embedder(_counting_batch_embedder(calls), 2)
+
+    vectors = embed_batch(["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert calls == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert [vector[0] for vector in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_batch_embedding_cache_only_embeds_missing_texts() -> None:
+    calls: List[List[str]] = []
+    cache = retention.EmbeddingCache()
+    embed_batch = retention.with_batch_embedding_cache(
+        _counting_batch_embedder(calls), cache, "stub"
+    )
+
+    embed_batch(["a", "bb"])
+    vectors = embed_batch(["bb", "ccc", "a", "ccc"])
+
+    assert calls == [["a", "bb"], ["ccc"]]
+    assert [vector[0] for vector in vectors] == [2.0, 3.0, 1.0, 3.0]
+
+
+@pytest.mark.asyncio
+async def test_async_batch_embedding_cache_moves_disk_io_off_the_loop(tmp_path) -> None:
+    threads: List[int] = []
+    writes: List[List[str]] = []
+
+    class _RecordingCache(retention.EmbeddingCache):
+        def get_many(self, namespace, texts):
+            threads.append(threading.get_ident())
+            return super().get_many(namespace, texts)
+
+        def put_many(self, namespace, items):
+            items = list(items)
+            threads.append(threading.get_ident())
+            writes.append([text for text, _ in items])
+            super().put_many(namespace, items)
+
+    async def _embed(texts):
+        return [[float(len(text))] for text in texts]
+
+    cache = _RecordingCache(path=tmp_path / "embeddings.sqlite")
+    embed_batch = retention.with_async_batch_embedding_cache(_embed, cache, "stub")
+
+    vectors = await embed_batch(["a", "bb", "a"])
+
+    assert [vector[0] for vector in vectors] == [1.0, 2.0, 1.0]
+    assert writes == [["a", "bb"]]
+    assert threads and threading.get_ident() not in threads
+    cache.close()
+
+
+def test_openai_batch_embedder_sends_texts_in_one_request(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    requests: List[object] = []
+
+    class _DummyOpenAI:
+        def __init__(self, api_key: str) -> None:
+            self.embeddings = types.SimpleNamespace(create=self._create)
+
+        def _create(self, *, model: str, input):
+            requests.append(input)
+            data = [
+                types.SimpleNamespace(index=index, embedding=[float(index)])
+                for index in range(len(input))
+            ]
+            return types.SimpleNamespace(data=list(reversed(data)))
+
+    module = types.ModuleType("openai")
+    setattr(module, "OpenAI", _DummyOpenAI)
+    monkeypatch.setitem(sys.modules, "openai", module)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("SEMANTIC_RETENTION_BATCH_SIZE", "2")
+
+    embed_batch = retention.get_batch_embedder("openai")
+
+    assert embed_batch is not None
+    assert embed_batch(["x", "y", "z"]) == [[0.0], [1.0], [0.0]]
+    assert requests == [["x", "y"], ["z"]]
+    assert retention.get_batch_embedder("openai") is embed_batch
+
+
+@pytest.mark.asyncio
+async def test_embedding_batcher_coalesces_concurrent_requests() -> None:
+    import asyncio
+
+    calls: List[List[str]] = []
+    batcher = retention.EmbeddingBatcher(
+        _counting_batch_embedder(calls), max_batch_size=8, max_latency=0.05
+    )
+
+    results = await asyncio.gather(
+        batcher.embed("a"), batcher.embed("bb"), batcher.embed_many(["ccc", "dddd"])
+    )
+
+    assert calls == [["a", "bb", "ccc", "dddd"]]
+    assert results[0] == [1.0, 1.0]
+    assert results[2] == [[3.0, 1.0], [4.0, 1.0]]
+
+
+@pytest.mark.asyncio
+async def test_embedding_batcher_flushes_at_max_batch_size() -> None:
+    calls: List[List[str]] = []
+    batcher = retention.EmbeddingBatcher(
+        _counting_batch_embedder(calls), max_batch_size=2, max_latency=10.0
+    )
+
+    vectors = await batcher.embed_many(["a", "bb", "ccc", "dddd"])
+
+    assert calls == [["a", "bb"], ["ccc", "dddd"]]
+    assert len(vectors) == 4
+
+
+@pytest.mark.asyncio
+async def test_embedding_batcher_propagates_failures() -> None:
+    def _failing(texts):
+        raise RuntimeError("quota exceeded")
+
+    batcher = retention.EmbeddingBatcher(_failing, max_latency=0.0)
+
+    with pytest.raises(RuntimeError, match="quota exceeded"):
+        await batcher.embed("a")
+
+
+def _install_dummy_async_openai(
+    monkeypatch: pytest.MonkeyPatch, requests: List[object], clients: List[object]
+) -> None:
+    class _DummyAsyncOpenAI:
+        def __init__(self, api_key: str) -> None:
+            clients.append(self)
+            self.embeddings = types.SimpleNamespace(create=self._create)
+
+        async def _create(self, *, model: str, input):
+            requests.append(list(input))
+            data = [
+                types.SimpleNamespace(index=index, embedding=[1.0, float(index)])
+                for index in range(len(input))
+            ]
+            return types.SimpleNamespace(data=data)
+
+    module = types.ModuleType("openai")
+    setattr(module, "AsyncOpenAI", _DummyAsyncOpenAI)
+    monkeypatch.setitem(sys.modules, "openai", module)
+
+
+@pytest.mark.asyncio
+async def test_async_openai_embedder_shares_one_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    requests: List[object] = []
+    clients: List[object] = []
+    _install_dummy_async_openai(monkeypatch, requests, clients)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    embed_batch = retention.get_async_batch_embedder("openai")
+    assert embed_batch is not None
+    vectors = await embed_batch(["a", "b"])
+    monkeypatch.setenv("SEMANTIC_RETENTION_OPENAI_MODEL", "text-embedding-3-small")
+    rebuilt = retention.get_async_batch_embedder("openai")
+    assert rebuilt is not None and rebuilt is not embed_batch
+    await rebuilt(["c"])
+
+    assert vectors == [[1.0, 0.0], [1.0, 1.0]]
+    assert requests == [["a", "b"], ["c"]]
+    assert len(clients) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_batch_embedder_coalesces_concurrent_callers(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    requests: List[object] = []
+    _install_dummy_async_openai(monkeypatch, requests, [])
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    embed_batch = retention.get_async_batch_embedder("openai")
+    assert embed_batch is not None
+    first, second = await asyncio.gather(embed_batch(["a"]), embed_batch(["b", "c"]))
+
+    assert first == [[1.0, 0.0]]
+    assert second == [[1.0, 1.0], [1.0, 2.0]]
+    assert requests == [["a", "b", "c"]]
+
+
+@pytest.mark.asyncio
+async def test_async_gemini_embedder_prefers_native_async_api(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    dummy = _DummyGenAI()
+    async_calls: List[List[str]] = []
+
+    async def _embed_content_async(*, model: str, content):
+        async_calls.append(list(content))
+        return {"embedding": [[0.0, 1.0] for _ in content]}
+
+    dummy.embed_content_async = _embed_content_async
+    _install_dummy_genai(monkeypatch, dummy)
+    monkeypatch.setenv("GOOGLE_GEMINI_API_KEY", "primary-key")
+
+    embed_batch = retention.get_async_batch_embedder("gemini")
+
+    assert embed_batch is not None
+    assert await embed_batch(["x", "y"]) == [[0.0, 1.0], [0.0, 1.0]]
+    assert async_calls == [["x", "y"]]
+    assert dummy.requested_models == []
+
+
+@pytest.mark.asyncio
+async def test_compute_semantic_retention_async_batches_both_sides(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    requests: List[object] = []
+    _install_dummy_async_openai(monkeypatch, requests, [])
+    monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    result = await retention.compute_semantic_retention_async(
+        [{"content": "hello"}, {"content": "world"}], [{"content": "world"}]
+    )
+
+    assert result == pytest.approx(0.707, abs=1e-3)
+    assert requests == [["hello\nworld", "world"]]
+
+
+@pytest.mark.asyncio
+async def test_compute_semantic_retention_async_per_message(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls: List[List[str]] = []
+
+    async def _embed_batch(texts):
+        calls.append(list(texts))
+        return [[1.0, 0.0] if text == "alpha" else [0.0, 1.0] for text in texts]
+
+    monkeypatch.setenv("SEMANTIC_RETENTION_METHOD", "per_message")
+
+    result = await retention.compute_semantic_retention_async(
+        [{"content": "alpha"}, {"content": "beta"}], [{"content": "beta"}], _embed_batch
+    )
+
+    assert calls == [["alpha", "beta"]]
+    assert result == pytest.approx(0.707, abs=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_compute_semantic_retention_async_disabled_provider(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setenv("SEMANTIC_RETENTION_PROVIDER", "off")
+
+    assert await retention.compute_semantic_retention_async([{"content": "a"}], [{"content": "a"}]) is None
+
+
+@pytest.mark.asyncio
+async def test_embedding_batcher_awaits_async_embedders() -> None:
+    calls: List[List[str]] = []
+
+    async def _embed_batch(texts):
+        calls.append(list(texts))
+        return [[1.0] for _ in texts]
+
+    batcher = retention.EmbeddingBatcher(_embed_batch, max_latency=0.0)
+
+    assert await batcher.embed_many(["a", "b"]) == [[1.0], [1.0]]
+    assert calls == [["a", "b"]]
@@ -0,0 +1,237 @@
+"""Tests for pluggable trim strategies."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pytest
+
+from src.core_ext.context_trimmer import trim_messages
+from src.core_ext.memory import (
+    ConversationMessage,
+    EmbeddingRecord,
+    MessageType,
+    create_in_memory_store,
+)
+from src.core_ext.trim_strategies import (
+    SUMMARY_HEADER,
+    MemoryHybridStrategy,
+    SemanticClusteringStrategy,
+    kmeans,
+    recall_messages,
+)
+
+
+def _topic_embedder(calls: List[str]):
+    def _embed(text: str) -> Sequence[float]:
+        calls.append(text)
+        if "cats" in text:
+            return [1.0, 0.0, 0.0]
+        if "rockets" in text:
+            return [0.0, 1.0, 0.0]
+        return [0.0, 0.0, 1.0]
+
+    return _embed
+
+
+def _history() -> List[Dict[str, str]]:
+    messages: List[Dict[str, str]] = [{"role": "system", "content": "System"}]
+    for index in range(3):
+        messages.append({"role": "user", "content": f"tell me about cats {index} " * 20})
+        messages.append({"role": "assistant", "content": f"cats are great {index} " * 20})
+    for index in range(3):
+        messages.append({"role": "user", "content": f"explain rockets {index} " * 20})
+        messages.append({"role": "assistant", "content": f"rockets fly {index} " * 20})
+    messages.append({"role": "user", "content": "latest question"})
+    return messages
+
+
+def test_kmeans_separates_obvious_groups() -> None:
+    vectors = np.array(
+        [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.1, 0.9], [0.95, 0.05]],
+        dtype=np.float64,
+    )
+
+    labels, centroids = kmeans(vectors, 2)
+
+    assert centroids.shape == (2, 2)
+    assert labels[0] == labels[1] == labels[4]
+    assert labels[2] == labels[3]
+    assert labels[0] != labels[2]
+
+
+def test_kmeans_caps_clusters_at_row_count() -> None:
+    labels, centroids = kmeans(np.array([[1.0, 0.0]], dtype=np.float64), 4)
+
+    assert labels.tolist() == [0]
+    assert centroids.shape == (1, 2)
+
+
+def test_clustering_strategy_replaces_dropped_turns_with_summary() -> None:
+    calls: List[str] = []
+    summaries: List[List[str]] = []
+
+    def _summarizer(texts: Sequence[str]) -> str:
+        summaries.append(list(texts))
+        return "cats" if "cats" in texts[0] else "rockets"
+
+    strategy = SemanticClusteringStrategy(_topic_embedder(calls), _summarizer, max_clusters=2)
+    messages = _history()
+
+    trimmed, metrics = trim_messages(
+        messages, target_tokens=300, model="legacy-model", min_turns=1, strategy=strategy
+    )
+
+    assert metrics["strategy"] == "semantic_clustering"
+    assert metrics["output_tokens"] <= 300
+    assert trimmed[0] == messages[0]
+    assert trimmed[1]["role"] == "assistant"
+    assert trimmed[1]["content"].startswith(SUMMARY_HEADER)
+    assert "- cats" in trimmed[1]["content"]
+    assert trimmed[-1] == messages[-1]
+    assert len(summaries) == 2
+
+
+def test_clustering_strategy_caches_summaries_and_embeddings() -> None:
+    calls: List[str] = []
+    summarizer_calls: List[int] = []
+
+    def _summarizer(texts: Sequence[str]) -> str:
+        summarizer_calls.append(len(texts))
+        return "summary"
+
+    strategy = SemanticClusteringStrategy(_topic_embedder(calls), _summarizer, max_clusters=2)
+    messages = _history()
+
+    first, _ = trim_messages(messages, 300, "legacy-model", min_turns=1, strategy=strategy)
+    embedded = len(calls)
+    summarized = len(summarizer_calls)
+    second, _ = trim_messages(messages, 300, "legacy-model", min_turns=1, strategy=strategy)
+
+    assert first == second
+    assert len(calls) == embedded
+    assert len(summarizer_calls) == summarized
+    assert strategy.summary_cache.hits >= summarized
+
+
+def test_clustering_strategy_defaults_to_extractive_summary() -> None:
+    strategy = SemanticClusteringStrategy(_topic_embedder([]), max_summary_chars=40)
+
+    trimmed, _ = trim_messages(_history(), 300, "legacy-model", min_turns=1, strategy=strategy)
+
+    summary_lines = trimmed[1]["content"].splitlines()[1:]
+    assert summary_lines
+    assert all(len(line) <= len("- ") + 40 for line in summary_lines)
+
+
+def test_clustering_strategy_keeps_history_that_fits() -> None:
+    calls: List[str] = []
+    strategy = SemanticClusteringStrategy(_topic_embedder(calls))
+    messages = _history()
+
+    trimmed, _ = trim_messages(messages, 8192, "legacy-model", strategy=strategy)
+
+    assert trimmed == messages
+    assert calls == []
+
+
+def test_clustering_strategy_rejects_invalid_ratio() -> None:
+    with pytest.raises(ValueError):
+        SemanticClusteringStrategy(_topic_embedder([]), summary_ratio=1.5)
+
+
+async def _seeded_store():
+    store = create_in_memory_store()
+    old_messages = [
+        ("m1", MessageType.USER, "my dog is named Pochi", [1.0, 0.0]),
+        ("m2", MessageType.ASSISTANT, "Pochi is a lovely name", [0.9, 0.1]),
+        ("m3", MessageType.USER, "what is the weather", [0.0, 1.0]),
+    ]
+    for index, (message_id, role, content, vector) in enumerate(old_messages):
+        await store.messages.save_message(
+            ConversationMessage(
+                id=message_id,
+                conversation_id="conv-1",
+                role=role,
+                content=content,
+                created_at=datetime(2025, 1, 1, 12, index),
+            )
+        )
+        await store.embeddings.save_embedding(
+            EmbeddingRecord(
+                id=f"emb-{message_id}",
+                message_id=message_id,
+                conversation_id="conv-1",
+                embedding=vector,
+                model="stub",
+            )
+        )
+    await store.embeddings.save_embedding(
+        EmbeddingRecord(
+            id="emb-other",
+            message_id="x1",
+            conversation_id="conv-2",
+            embedding=[1.0, 0.0],
+            model="stub",
+        )
+    )
+    return store
+
+
+@pytest.mark.asyncio
+async def test_recall_messages_returns_similar_messages_for_conversation() -> None:
+    store = await _seeded_store()
+
+    recalled = await recall_messages(store, [1.0, 0.0], limit=5, conversation_id="conv-1")
+
+    assert [message.id for message in recalled] == ["m1", "m2"]
+
+
+@pytest.mark.asyncio
+async def test_memory_hybrid_fills_budget_with_recalled_messages() -> None:
+    store = await _seeded_store()
+    recalled = await recall_messages(store, [1.0, 0.0], conversation_id="conv-1")
+    messages: List[Dict[str, str]] = [{"role": "system", "content": "System"}]
+    for index in range(10):
+        messages.append({"role": "user", "content": f"filler question {index} " * 30})
+        messages.append({"role": "assistant", "content": f"filler answer {index} " * 30})
+    messages.append({"role": "user", "content": "what is my dog called?"})
+
+    trimmed, metrics = trim_messages(
+        messages,
+        target_tokens=512,
+        model="legacy-model",
+        strategy=MemoryHybridStrategy(recalled, recent_units=2),
+    )
+
+    assert metrics["strategy"] == "memory_hybrid"
+    assert metrics["output_tokens"] <= 512
+    assert trimmed[0] == messages[0]
+    assert trimmed[1:3] == [
+        {"role": "user", "content": "my dog is named Pochi"},
+        {"role": "assistant", "content": "Pochi is a lovely name"},
+    ]
+    assert trimmed[3:] == messages[-3:]
+
+
+@pytest.mark.asyncio
+async def test_memory_hybrid_skips_recalled_messages_already_in_window() -> None:
+    store = await _seeded_store()
+    recalled = await recall_messages(store, [1.0, 0.0], conversation_id="conv-1")
+    messages: List[Dict[str, str]] = [
+        {"role": "system", "content": "System"},
+        {"role": "user", "content": "my dog is named Pochi"},
+        {"role": "assistant", "content": "ok"},
+        {"role": "user", "content": "what is my dog called?"},
+    ]
+
+    trimmed, _ = trim_messages(
+        messages, 4096, "legacy-model", strategy=MemoryHybridStrategy(recalled)
+    )
+
+    assert trimmed == [
+        messages[0],
+        {"role": "assistant", "content": "Pochi is a lovely name"},
+    ] + messages[1:]
@@ -0,0 +1,29 @@
+"""bench_ann_store が全探索との recall とレイテンシを出力することを検証する。"""
+
+from __future__ import annotations
+
+import json
+
+from scripts.perf import bench_ann_store
+
+
+def test_run_benchmark_reports_recall_per_probe() -> None:
+    result = bench_ann_store.run_benchmark(
+        600, 16, queries=10, k=5, n_lists=8, probes=(1, 8)
+    )
+
+    assert result["vectors"] == 600
+    assert [run["n_probe"] for run in result["ivf"]] == [1, 8]
+    assert result["ivf"][-1]["recall"] == 1.0
+    assert all(0.0 <= run["recall"] <= 1.0 for run in result["ivf"])
+
+
+def test_main_prints_json(capsys) -> None:
+    exit_code = bench_ann_store.main(
+        ["--vectors", "300", "--dimension", "8", "--queries", "5", "--lists", "4", "--probes", "2"]
+    )
+
+    payload = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert payload["n_lists"] == 4
+    assert payload["ivf"][0]["n_probe"] == 2
@@ -0,0 +1,27 @@
+"""bench_compact_records がメッセージ・埋め込みあたりのメモリ量を比較出力することを検証する。"""
+
+from __future__ import annotations
+
+import json
+
+from scripts.perf import bench_compact_records
+
+
+def test_run_benchmark_reports_smaller_compact_records() -> None:
+    result = bench_compact_records.run_benchmark(2000, conversations=10, embeddings=50, dimension=64)
+
+    assert result["messages"] == 2000
+    assert result["message_round_trip"] is True
+    assert 0 < result["compact_bytes_per_message"] < result["dataclass_bytes_per_message"]
+    assert 0 < result["compact_bytes_per_embedding"] < result["dataclass_bytes_per_embedding"]
+
+
+def test_main_prints_json(capsys) -> None:
+    exit_code = bench_compact_records.main(
+        ["--messages", "100", "--embeddings", "5", "--dimension", "4"]
+    )
+
+    payload = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert payload["messages"] == 100
+    assert payload["dimension"] == 4
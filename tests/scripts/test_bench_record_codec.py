@@ -0,0 +1,25 @@
+"""bench_record_codec がバイナリ形式と JSON 形式のスループット・サイズを出力することを検証する。"""
+
+from __future__ import annotations
+
+import json
+
+from scripts.perf import bench_record_codec
+
+
+def test_run_benchmark_reports_both_paths() -> None:
+    result = bench_record_codec.run_benchmark(200, 20, dimension=64)
+
+    for key in ("message_json", "message_binary", "embedding_json", "embedding_binary"):
+        assert result[key]["encode_per_s"] > 0
+        assert result[key]["decode_per_s"] > 0
+    assert result["embedding_binary"]["bytes_per_record"] < result["embedding_json"]["bytes_per_record"]
+
+
+def test_main_prints_json(capsys) -> None:
+    exit_code = bench_record_codec.main(["--messages", "10", "--embeddings", "3", "--dimension", "4"])
+
+    payload = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert payload["messages"] == 10
+    assert payload["dimension"] == 4
@@ -0,0 +1,31 @@
+"""bench_sqlite_store が挿入・取得スループットを出力することを検証する。"""
+
+from __future__ import annotations
+
+import json
+
+from scripts.perf import bench_sqlite_store
+
+
+def test_run_benchmark_reports_throughput(tmp_path) -> None:
+    result = bench_sqlite_store.run_benchmark(
+        4, 5, embeddings=30, dimension=8, path=tmp_path / "bench.sqlite"
+    )
+
+    assert result["journal_mode"] == "wal"
+    assert result["messages"] == 20
+    assert result["insert_single_per_s"] > 0
+    assert result["insert_batched_per_s"] > 0
+    assert result["fetch_messages_per_s"] > 0
+    assert result["insert_embeddings_per_s"] > 0
+
+
+def test_main_prints_json(capsys) -> None:
+    exit_code = bench_sqlite_store.main(
+        ["--conversations", "2", "--messages", "3", "--embeddings", "25", "--dimension", "4"]
+    )
+
+    payload = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert payload["messages"] == 6
+    assert payload["embeddings"] == 25
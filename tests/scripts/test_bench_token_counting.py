@@ -0,0 +1,25 @@
+"""bench_token_counting の計測結果が逐次/バッチで一致することを検証する。"""
+
+from __future__ import annotations
+
+import json
+
+from scripts.perf import bench_token_counting
+
+
+def test_run_benchmark_reports_matching_totals() -> None:
+    result = bench_token_counting.run_benchmark(200, "gpt-4o", repeat=1)
+
+    assert result["messages"] == 200
+    assert result["total_tokens"] > 0
+    assert result["sequential_ms"] >= 0
+    assert result["batched_ms"] >= 0
+
+
+def test_main_prints_json(capsys) -> None:
+    exit_code = bench_token_counting.main(["--messages", "50", "--repeat", "1"])
+
+    payload = json.loads(capsys.readouterr().out)
+    assert exit_code == 0
+    assert payload["messages"] == 50
+    assert payload["model"] == "gpt-5-main"